@@ -1,50 +1,156 @@
 import configparser
+import logging
 import os
+import threading
+import time
 
 class Config:
+    """
+    配置文件读取器
+    
+    所有实例共享一份进程级配置快照，读取只是字典查找；
+    快照最多每 check_interval 秒检查一次文件 mtime/inode/大小，发生变化才重新解析。
+    """
+    
+    # 进程级共享快照: {section: {option: value}}
+    _snapshot = {}
+    _signature = None
+    _last_check = 0.0
+    _lock = threading.Lock()
+    check_interval = 2.0
+    reload_count = 0
+    last_reload = None
+    
     def __init__(self):
-        self.config = configparser.ConfigParser()
         self.config_file = 'config.ini'
-        self.config.read(self.config_file)
-
+        self._refresh()
+    
+    def _file_signature(self):
+        """获取配置文件签名，文件不存在时返回None"""
+        try:
+            stat = os.stat(self.config_file)
+            return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        except OSError:
+            return None
+    
+    def _load_snapshot(self):
+        """解析配置文件并替换共享快照"""
+        parser = configparser.ConfigParser()
+        parser.read(self.config_file, encoding='utf-8')
+        snapshot = {}
+        for section in parser.sections():
+            values = {}
+            for option in parser.options(section):
+                try:
+                    values[option] = parser.get(section, option)
+                except configparser.InterpolationError:
+                    values[option] = parser.get(section, option, raw=True)
+            snapshot[section] = values
+        
+        Config._snapshot = snapshot
+        Config.reload_count += 1
+        Config.last_reload = time.time()
+        try:
+            Config.check_interval = float(snapshot.get('System', {}).get('config_check_interval', Config.check_interval))
+        except ValueError:
+            pass
+    
+    def _refresh(self, force=False):
+        """按检查间隔确认配置文件是否变化，变化时重新加载"""
+        now = time.monotonic()
+        if not force and Config._signature is not None and now - Config._last_check < Config.check_interval:
+            return
+        with Config._lock:
+            if not force and Config._signature is not None and now - Config._last_check < Config.check_interval:
+                return
+            Config._last_check = now
+            signature = self._file_signature()
+            if force or signature != Config._signature:
+                self._load_snapshot()
+                Config._signature = signature
+    
     def get_value(self, section, option, fallback=None):
         """获取配置值"""
+        self._refresh()
+        return Config._snapshot.get(section, {}).get(option.lower(), fallback)
+    
+    def get_int(self, section, option, fallback=None):
+        """获取整数配置值，缺失或格式错误时返回 fallback"""
+        value = self.get_value(section, option)
+        if value is None:
+            return fallback
         try:
-            # 每次读取前重新加载配置文件，确保获取最新值
-            self.config.read(self.config_file, encoding='utf-8')
-            return self.config.get(section, option)
-        except (configparser.NoSectionError, configparser.NoOptionError):
+            return int(value)
+        except ValueError:
+            logging.warning(f"配置项 [{section}] {option} 不是整数: {value}")
+            return fallback
+    
+    def get_float(self, section, option, fallback=None):
+        """获取浮点数配置值，缺失或格式错误时返回 fallback"""
+        value = self.get_value(section, option)
+        if value is None:
             return fallback
+        try:
+            return float(value)
+        except ValueError:
+            logging.warning(f"配置项 [{section}] {option} 不是数字: {value}")
+            return fallback
+    
+    def get_bool(self, section, option, fallback=None):
+        """获取布尔配置值（true/false、yes/no、on/off、1/0），缺失或格式错误时返回 fallback"""
+        value = self.get_value(section, option)
+        if value is None:
+            return fallback
+        state = configparser.ConfigParser.BOOLEAN_STATES.get(value.strip().lower())
+        if state is None:
+            logging.warning(f"配置项 [{section}] {option} 不是布尔值: {value}")
+            return fallback
+        return state
 
     def set_value(self, section, option, value):
         """设置配置值"""
+        # 以磁盘上的最新内容为基础修改，避免覆盖其他进程的写入
+        parser = configparser.ConfigParser()
+        parser.read(self.config_file, encoding='utf-8')
+        
         # 确保section存在
-        if not self.config.has_section(section):
-            self.config.add_section(section)
+        if not parser.has_section(section):
+            parser.add_section(section)
         
         # 设置值
-        self.config.set(section, option, str(value))
+        parser.set(section, option, str(value))
         
         # 保存到文件
-        self.save_config()
+        self.save_config(parser)
 
-    def save_config(self):
-        """保存配置到文件"""
+    def save_config(self, parser):
+        """保存配置到文件并立即刷新快照"""
         try:
             with open(self.config_file, 'w', encoding='utf-8') as configfile:
-                self.config.write(configfile)
+                parser.write(configfile)
         except Exception as e:
             print(f"保存配置文件失败: {e}")
             raise
+        self._refresh(force=True)
+    
+    @classmethod
+    def get_stats(cls):
+        """获取配置快照统计信息"""
+        return {
+            "reloadCount": cls.reload_count,
+            "lastReload": cls.last_reload,
+            "checkInterval": cls.check_interval,
+            "sections": len(cls._snapshot)
+        }
 
     def get_lottery_config(self):
         """获取抽奖配置"""
         return {
-            'points': int(self.get_value('Lottery', 'points', '1'))
+            'points': self.get_int('Lottery', 'points', 1)
         }
 
     def update_lottery_config(self, config_data):
         """更新抽奖配置"""
         # 只处理 lotteryPoints 参数
         if 'lotteryPoints' in config_data:
-            self.set_value('Lottery', 'points', config_data['lotteryPoints'])
\ No newline at end of file
+            self.set_value('Lottery', 'points', config_data['lotteryPoints'])
@@ -0,0 +1,158 @@
+"""
+日志配置
+
+- 根日志器只挂一个 QueueHandler，格式化与输出由 QueueListener 在后台线程完成，不阻塞事件循环
+- 支持文本与 JSON 两种格式，每条记录带当前请求的 request_id
+- 可按日志器名或 "模块.函数" 对 WARNING 以下的记录采样
+- 可关闭每个请求都会产生的认证日志（会话查找、当前用户解析等）
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Optional
+
+from Core.Common.Config import Config
+
+# 当前请求ID，由请求ID中间件设置
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# 每个已认证请求都会触发的日志位置（模块.函数）
+AUTH_CHATTER = {
+    "Session.get_session",
+    "Session.get_user_by_session",
+    "auth.get_current_user_optional",
+    "User.get_user_by_field",
+    "app.get_lottery_prizes"
+}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+class RequestContextFilter(logging.Filter):
+    """
+    为记录附加 request_id，并执行认证日志开关与采样
+    
+    挂在 QueueHandler 上，被丢弃的记录不会进入队列，也不会被格式化。
+    """
+    
+    def __init__(self, auth_chatter: bool = True, sampling: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.auth_chatter = auth_chatter
+        self.sampling = sampling or {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            location = f"{record.module}.{record.funcName}"
+            if not self.auth_chatter and location in AUTH_CHATTER:
+                return False
+            rate = self.sampling.get(record.name, self.sampling.get(location))
+            if rate is not None and random.random() >= rate:
+                return False
+        record.request_id = request_id_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "requestId": getattr(record, "request_id", "-"),
+            "location": f"{record.module}.{record.funcName}:{record.lineno}",
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+class _PreformattedQueueHandler(logging.handlers.QueueHandler):
+    """
+    只合并消息参数，不在调用线程中格式化整条记录
+    
+    标准 QueueHandler.prepare 会调用 format()，把格式化开销留在事件循环上；
+    这里只计算 message 并清理 args，格式化交给监听线程中的输出处理器。
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # 异常对象不能跨线程安全复用，提前格式化为文本
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """解析 "名称:比例, 名称:比例" 形式的采样配置"""
+    sampling = {}
+    for item in (value or "").split(","):
+        if ":" not in item:
+            continue
+        name, rate = item.rsplit(":", 1)
+        try:
+            sampling[name.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            logging.warning(f"无效的日志采样配置: {item}")
+    return sampling
+
+def setup_logging():
+    """按 [Logging] 配置初始化根日志器"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    
+    config = Config()
+    level = (config.get_value('Logging', 'level', 'INFO') or 'INFO').strip().upper()
+    log_format = (config.get_value('Logging', 'format', 'text') or 'text').strip().lower()
+    use_queue = config.get_bool('Logging', 'queue', True)
+    context_filter = RequestContextFilter(
+        auth_chatter=config.get_bool('Logging', 'auth_chatter', True),
+        sampling=parse_sampling(config.get_value('Logging', 'sampling', ''))
+    )
+    
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+    
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level, logging.INFO))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    
+    if use_queue:
+        handler = _PreformattedQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        _queue_handler = handler
+    else:
+        handler = output
+    handler.addFilter(context_filter)
+    root.addHandler(handler)
+
+def stop_logging():
+    """
+    停止后台日志线程并输出队列中剩余的记录
+    
+    根日志器改为直接挂输出处理器，之后（如关闭流程中）的记录在调用线程中同步输出，不会进入已无人消费的队列。
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for output in _listener.handlers:
+        for record_filter in _queue_handler.filters:
+            output.addFilter(record_filter)
+        root.addHandler(output)
+    root.removeHandler(_queue_handler)
+    _listener.stop()
+    _listener = None
+    _queue_handler = None
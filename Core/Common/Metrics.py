@@ -0,0 +1,155 @@
+"""
+进程内指标注册表与 Prometheus 文本格式输出
+
+不依赖 prometheus_client：计数器、仪表与直方图只在事件循环线程中更新，
+应用级指标（缓存、会话、准入控制、连接池等）通过采集函数在抓取时读取。
+多 worker 部署时每个进程各自输出，由 Prometheus 按实例区分。
+"""
+import bisect
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 采集函数返回的样本: (指标名, 类型, 说明, [(标签字典, 值)])
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    """只增计数器"""
+    
+    type = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+    
+    def inc(self, *labelvalues, amount: float = 1.0):
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+    
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for labelvalues, value in self._values.items():
+            yield self.name, dict(zip(self.labelnames, labelvalues)), value
+
+class Gauge(Counter):
+    """可增可减的仪表"""
+    
+    type = "gauge"
+    
+    def dec(self, *labelvalues, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+    
+    def set(self, *labelvalues, value: float):
+        self._values[labelvalues] = value
+
+class Histogram:
+    """累积分桶直方图"""
+    
+    type = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各桶计数..., 总和, 总数]
+        self._values: Dict[tuple, list] = {}
+    
+    def observe(self, *labelvalues, value: float):
+        item = self._values.get(labelvalues)
+        if item is None:
+            item = self._values[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            item[index] += 1
+        item[-2] += value
+        item[-1] += 1
+    
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        for labelvalues, item in self._values.items():
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets, item):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, item[-1]
+            yield f"{self.name}_sum", labels, item[-2]
+            yield f"{self.name}_count", labels, item[-1]
+
+class MetricsRegistry:
+    """指标注册表"""
+    
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], List[Sample]]] = []
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Optional[Sequence[float]] = None) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets or DEFAULT_BUCKETS)
+        self._metrics.append(metric)
+        return metric
+    
+    def register_collector(self, collector: Callable[[], List[Sample]]):
+        """注册抓取时调用的采集函数"""
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# 全局指标注册表
+registry = MetricsRegistry()
+
+# HTTP 请求指标，由请求指标中间件更新
+http_requests_total = registry.counter(
+    "welcome_http_requests_total", "HTTP 请求数", ("route", "method", "status")
+)
+http_requests_in_flight = registry.gauge(
+    "welcome_http_requests_in_flight", "正在处理的 HTTP 请求数"
+)
+http_request_duration_seconds = registry.histogram(
+    "welcome_http_request_duration_seconds", "HTTP 请求处理耗时（秒）", ("route", "method")
+)
+
+# 抽奖指标
+lottery_draws_total = registry.counter(
+    "welcome_lottery_draws_total", "抽奖次数", ("result",)
+)
@@ -1,24 +1,71 @@
+import asyncio
 import logging
+import time
+from datetime import datetime
 from typing import Optional, Dict, Any
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
 
 import Core.MongoDB.MongoDB as MongoDB
+from Core.Common.Config import Config
+
+# 版本文档的 key，每次设置变更时自增，各 worker 轮询该文档判断是否需要重新加载
+VERSION_KEY = "__version__"
 
 class SystemSettings:
+    """
+    系统设置服务
+    
+    设置保存在 system_settings 集合中，每个进程持有一份内存缓存：
+    - 请求路径只读取缓存，不访问 MongoDB
+    - 写入时自增版本文档，并在设置文档上记录对应版本
+    - 后台任务每 sync_interval 秒读取一次版本文档，版本变化时只加载更新过的设置
+    
+    写入分两步（先递增版本号，再写设置文档），并发写入时设置文档可能晚于更大的版本号出现。
+    因此同步水位 _version 只推进到实际读到的设置的最大版本，且不超过上一次同步看到的版本号：
+    已递增版本号但尚未写入的设置在下一次同步时仍会被加载（前提是两步写入在一个同步间隔内完成）。
+    """
+    
+    # 系统设置集合索引
+    # - key 唯一索引：按 key 读写设置
+    # - version 索引：同步时只加载版本号更新的设置
+    INDEXES = [
+        IndexModel([("key", ASCENDING)], name="key_unique", unique=True),
+        IndexModel([("version", ASCENDING)], name="version")
+    ]
+    
     def __init__(self):
         self.collection_name = "system_settings"
+        # 已解析的集合句柄及其所属的连接代数，重连后自动重新解析
+        self._collection = None
+        self._collection_generation = -1
+        self._cache: Dict[str, Any] = {}
+        self._version = 0
+        # 上一次同步（或全量加载）时版本文档的版本号
+        self._seen_version = 0
+        self._last_sync: Optional[float] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self.sync_count = 0
+        self.reload_count = 0
+        
+        config = Config()
+        self.sync_interval = config.get_float('Settings', 'sync_interval', 2.0)
         
     async def _get_collection(self):
         """获取系统设置集合"""
+        if self._collection is not None and self._collection_generation == MongoDB.mongodb_instance.generation:
+            return self._collection
         try:
             database = await MongoDB.get_mongodb_database()
-            return database[self.collection_name]
+            self._collection = database[self.collection_name]
+            self._collection_generation = MongoDB.mongodb_instance.generation
+            return self._collection
         except Exception as e:
             logging.error(f"获取系统设置集合失败: {e}")
             raise
     
     async def get_setting(self, key: str) -> Optional[Any]:
-        """获取系统设置值"""
+        """从数据库读取系统设置值（不经过缓存）"""
         try:
             collection = await self._get_collection()
             setting = await collection.find_one({"key": key})
@@ -31,44 +78,145 @@ class SystemSettings:
             logging.error(f"获取系统设置时发生错误: {e}")
             return None
     
+    def get_cached(self, key: str, default: Any = None) -> Any:
+        """从进程内缓存读取系统设置值"""
+        return self._cache.get(key, default)
+    
     async def set_setting(self, key: str, value: Any) -> bool:
-        """设置系统配置值"""
+        """设置系统配置值，并递增全局设置版本"""
         try:
             collection = await self._get_collection()
             
+            version_doc = await collection.find_one_and_update(
+                {"key": VERSION_KEY},
+                {"$inc": {"version": 1}},
+                upsert=True,
+                return_document=True
+            )
+            version = version_doc["version"]
+            
             result = await collection.update_one(
                 {"key": key},
                 {
                     "$set": {
                         "key": key,
                         "value": value,
-                        "updateTime": "$$NOW"
+                        "version": version,
+                        "updateTime": datetime.now()
                     }
                 },
                 upsert=True
             )
             
+            # 本进程立即生效，其他进程由版本轮询同步
+            self._cache[key] = value
+            
             return result.upserted_id is not None or result.matched_count > 0
             
         except Exception as e:
             logging.error(f"设置系统配置时发生错误: {e}")
             return False
     
-    async def get_lottery_cost(self) -> int:
-        """获取抽奖消耗积分"""
-        cost = await self.get_setting("lottery_cost")
-        return cost if cost is not None else 10  # 默认10积分
+    async def load_all(self):
+        """从数据库加载全部设置到缓存"""
+        try:
+            collection = await self._get_collection()
+            version_doc = await collection.find_one({"key": VERSION_KEY}, {"_id": 0, "version": 1})
+            version = (version_doc or {}).get("version", 0)
+            cache = {}
+            newest = 0
+            async for setting in collection.find({"key": {"$ne": VERSION_KEY}}, {"_id": 0, "key": 1, "value": 1, "version": 1}):
+                cache[setting["key"]] = setting.get("value")
+                newest = max(newest, setting.get("version", 0))
+            self._cache = cache
+            self._version = min(newest, version)
+            self._seen_version = version
+            self._last_sync = time.time()
+            self.reload_count += 1
+        except Exception as e:
+            logging.error(f"加载系统设置时发生错误: {e}")
+    
+    async def sync(self):
+        """读取版本文档，版本变化时加载更新过的设置"""
+        try:
+            collection = await self._get_collection()
+            version_doc = await collection.find_one({"key": VERSION_KEY}, {"_id": 0, "version": 1})
+            version = (version_doc or {}).get("version", 0)
+            self.sync_count += 1
+            self._last_sync = time.time()
+            if version < self._version:
+                # 版本回退（集合被重建等），全量重新加载
+                await self.load_all()
+                return
+            if version == self._version:
+                return
+            
+            newest = self._version
+            changed = 0
+            async for setting in collection.find(
+                {"version": {"$gt": self._version}, "key": {"$ne": VERSION_KEY}},
+                {"_id": 0, "key": 1, "value": 1, "version": 1}
+            ):
+                self._cache[setting["key"]] = setting.get("value")
+                newest = max(newest, setting.get("version", 0))
+                changed += 1
+            # 不直接采用版本文档的版本号：其他写入方可能已递增版本号但还没写入设置文档
+            self._version = max(self._version, min(newest, self._seen_version))
+            self._seen_version = version
+            if changed:
+                logging.info(f"系统设置已同步 {changed} 项（版本 {version}）")
+        except Exception as e:
+            logging.error(f"同步系统设置时发生错误: {e}")
+    
+    async def _sync_loop(self):
+        """后台定期同步系统设置"""
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+    
+    async def start_sync(self):
+        """加载设置并启动后台同步"""
+        await self.load_all()
+        if self._sync_task is None and self.sync_interval > 0:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+            logging.info(f"系统设置同步已启动，间隔 {self.sync_interval} 秒")
+    
+    async def stop_sync(self):
+        """停止后台同步"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取设置缓存统计信息"""
+        return {
+            "version": self._version,
+            "keys": len(self._cache),
+            "lastSync": self._last_sync,
+            "syncInterval": self.sync_interval,
+            "syncCount": self.sync_count,
+            "reloadCount": self.reload_count
+        }
+    
+    def get_lottery_cost(self) -> int:
+        """获取抽奖消耗积分（读取缓存）"""
+        cost = self.get_cached("lottery_cost")
+        return cost if cost is not None else Config().get_lottery_config()['points']
     
     async def set_lottery_cost(self, cost: int) -> bool:
         """设置抽奖消耗积分"""
         return await self.set_setting("lottery_cost", cost)
     
     async def initialize_default_settings(self):
-        """初始化默认系统设置"""
+        """初始化默认系统设置（已存在的设置不会被覆盖）"""
         try:
-            # 默认设置列表
+            # 默认设置列表，抽奖消耗以 config.ini 中的 [Lottery] points 作为初始值
             default_settings = [
-                {"key": "lottery_cost", "value": 10, "description": "抽奖消耗积分"},
+                {"key": "lottery_cost", "value": Config().get_lottery_config()['points'], "description": "抽奖消耗积分"},
                 {"key": "system_name", "value": "NISA Welcome System", "description": "系统名称"},
                 {"key": "welcome_message", "value": "欢迎来到NISA社团迎新系统", "description": "欢迎信息"}
             ]
@@ -76,11 +224,11 @@ class SystemSettings:
             collection = await self._get_collection()
             
             for setting in default_settings:
-                # 检查设置是否已存在
-                existing = await collection.find_one({"key": setting["key"]})
-                if not existing:
-                    setting["createTime"] = "$$NOW"
-                    await collection.insert_one(setting)
+                await collection.update_one(
+                    {"key": setting["key"]},
+                    {"$setOnInsert": {**setting, "version": 0, "createTime": datetime.now()}},
+                    upsert=True
+                )
                     
             logging.info("默认系统设置初始化完成")
             
@@ -88,4 +236,4 @@ class SystemSettings:
             logging.error(f"初始化默认系统设置时发生错误: {e}")
 
 # 全局系统设置管理器实例
-system_settings = SystemSettings()
\ No newline at end of file
+system_settings = SystemSettings()
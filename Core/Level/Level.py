@@ -2,19 +2,37 @@ import asyncio
 import logging
 from typing import Optional, Dict, List, Any
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from pymongo.errors import DuplicateKeyError
 
 import Core.MongoDB.MongoDB as MongoDB
 
 class Level:
+    # 关卡集合索引
+    # - isActive 索引：读取启用的关卡、按状态统计
+    # - name 索引：新增/编辑关卡时检查重名、按名称查找关卡
+    # - createdAt 索引：关卡列表按创建时间排序分页
+    INDEXES = [
+        IndexModel([("isActive", ASCENDING)], name="isActive"),
+        IndexModel([("name", ASCENDING)], name="name"),
+        IndexModel([("createdAt", DESCENDING)], name="createdAt")
+    ]
+    
     def __init__(self):
         self.collection_name = "level"
+        # 已解析的集合句柄及其所属的连接代数，重连后自动重新解析
+        self._collection = None
+        self._collection_generation = -1
     
     async def _get_collection(self):
         """获取关卡集合"""
+        if self._collection is not None and self._collection_generation == MongoDB.mongodb_instance.generation:
+            return self._collection
         try:
             database = await MongoDB.get_mongodb_database()
-            return database[self.collection_name]
+            self._collection = database[self.collection_name]
+            self._collection_generation = MongoDB.mongodb_instance.generation
+            return self._collection
         except Exception as e:
             logging.error(f"获取关卡集合失败: {e}")
             raise
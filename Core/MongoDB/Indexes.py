@@ -0,0 +1,126 @@
+"""
+索引声明与维护工具
+
+各管理器类通过 INDEXES 类属性声明所需索引（LEGACY_INDEXES 列出需要删除的旧索引名），
+启动时由 ensure_all_indexes 统一创建；report_indexes 对比声明与实际索引，
+并借助 $indexStats 找出自统计开始以来未被使用过的索引。
+
+命令行用法:
+    python -m Core.MongoDB.Indexes            # 输出缺失/多余/未使用的索引
+    python -m Core.MongoDB.Indexes --ensure   # 先创建缺失索引再输出报告
+"""
+import argparse
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List
+
+from pymongo import IndexModel
+
+import Core.MongoDB.MongoDB as MongoDB
+
+def get_index_managers() -> List[Any]:
+    """返回声明了索引的管理器实例"""
+    from Core.User.User import User
+    from Core.User.Session import session_manager
+    from Core.Prize.Prize import Prize
+    from Core.Prize.Counters import prize_counters
+    from Core.Level.Level import Level
+    from Core.Common.SystemSettings import system_settings
+    
+    return [User(), session_manager, Prize(), prize_counters, Level(), system_settings]
+
+def get_index_specs() -> Dict[str, List[IndexModel]]:
+    """收集各管理器声明的索引: {集合名: [IndexModel]}"""
+    return {manager.collection_name: manager.INDEXES for manager in get_index_managers()}
+
+async def ensure_collection_indexes(collection, indexes: List[IndexModel], legacy: List[str] = ()) -> List[str]:
+    """
+    为单个集合创建声明的索引，并删除 legacy 中列出的旧索引
+    
+    逐个创建，某个索引失败（如存量数据违反唯一约束）不影响其他索引。
+    旧索引在声明的索引全部创建成功后才删除，替换索引建不起来时查询仍可使用旧索引
+    （因此替换索引的键不能与旧索引完全相同）。
+    
+    Returns:
+        List[str]: 创建失败的索引名
+    """
+    failed = []
+    for index in indexes:
+        try:
+            await collection.create_indexes([index])
+        except Exception as e:
+            failed.append(index.document["name"])
+            logging.error(f"创建索引 {collection.name}.{index.document['name']} 失败: {e}")
+    
+    if legacy and failed:
+        logging.warning(f"{collection.name} 有索引创建失败，暂不删除旧索引: {', '.join(legacy)}")
+        return failed
+    existing = await collection.index_information() if legacy else {}
+    for name in legacy:
+        if name in existing:
+            await collection.drop_index(name)
+            logging.info(f"已删除旧索引 {collection.name}.{name}")
+    return failed
+
+async def ensure_all_indexes() -> Dict[str, List[str]]:
+    """为所有管理器集合创建声明的索引，返回各集合创建失败的索引名"""
+    result = {}
+    for manager in get_index_managers():
+        try:
+            collection = await manager._get_collection()
+            result[manager.collection_name] = await ensure_collection_indexes(
+                collection, manager.INDEXES, getattr(manager, "LEGACY_INDEXES", [])
+            )
+        except Exception as e:
+            logging.error(f"创建 {manager.collection_name} 集合索引时发生错误: {e}")
+            result[manager.collection_name] = [index.document["name"] for index in manager.INDEXES]
+    logging.info("集合索引已就绪")
+    return result
+
+async def report_indexes() -> Dict[str, Dict[str, Any]]:
+    """
+    对比声明的索引与实际索引
+    
+    Returns:
+        Dict: {集合名: {"missing": [...], "undeclared": [...], "unused": [...], "usage": {索引名: 使用次数}}}
+        unused 只统计声明过的非 _id 索引，使用次数自 mongod 启动或索引创建以来累计
+    """
+    database = await MongoDB.get_mongodb_database()
+    report = {}
+    for collection_name, indexes in get_index_specs().items():
+        collection = database[collection_name]
+        declared = [index.document["name"] for index in indexes]
+        existing = await collection.index_information()
+        
+        usage = {}
+        try:
+            async for stat in collection.aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]["ops"]
+        except Exception as e:
+            logging.warning(f"读取 {collection_name} 索引使用统计失败: {e}")
+        
+        report[collection_name] = {
+            "missing": [name for name in declared if name not in existing],
+            "undeclared": [name for name in existing if name != "_id_" and name not in declared],
+            "unused": [name for name in declared if name in existing and usage.get(name) == 0],
+            "usage": usage
+        }
+    return report
+
+async def main():
+    parser = argparse.ArgumentParser(description="检查集合索引")
+    parser.add_argument("--ensure", action="store_true", help="先创建缺失的索引")
+    args = parser.parse_args()
+    
+    if args.ensure:
+        await ensure_all_indexes()
+    report = await report_indexes()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    
+    # 存在缺失索引时以非零状态码退出，便于在部署脚本中检查
+    if any(item["missing"] for item in report.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,24 @@
 import asyncio
+import importlib.util
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 
 from Core.Common.Config import Config
+from Core.MongoDB.Monitoring import pool_monitor, command_monitor
+
+# 压缩算法 -> 所需的第三方模块（zlib 为标准库）
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
 
 class MongoDB:
     _instance: Optional['MongoDB'] = None
     _client: Optional[AsyncIOMotorClient] = None
     _database: Optional[AsyncIOMotorDatabase] = None
+    # 仅在建立/重建连接时持有，已连接时的读取路径不加锁
     _lock = asyncio.Lock()
+    # 连接代数：每次建立或断开连接时递增，管理器据此判断缓存的集合句柄是否仍然有效
+    generation = 0
     
     def __new__(cls):
         if cls._instance is None:
@@ -30,13 +38,58 @@ class MongoDB:
             config = Config()
             self.clientString = config.get_value('MongoDB', 'ConnectionString')
             self.dbName = config.get_value('MongoDB', 'DatabaseName')
+            self.client_options = self.load_client_options(config)
             logging.info(f"MongoDB配置加载成功: 数据库名 = {self.dbName}")
         except Exception as e:
             logging.error(f"加载MongoDB配置失败: {e}")
             raise
     
+    def load_client_options(self, config: Config) -> Dict[str, Any]:
+        """从 [MongoDB] 配置段加载客户端参数"""
+        options = {
+            "maxPoolSize": config.get_int('MongoDB', 'max_pool_size', 100),
+            "minPoolSize": config.get_int('MongoDB', 'min_pool_size', 5),
+            "maxIdleTimeMS": config.get_int('MongoDB', 'max_idle_time_ms', 30000),
+            "waitQueueTimeoutMS": config.get_int('MongoDB', 'wait_queue_timeout_ms', 2000),
+            "serverSelectionTimeoutMS": config.get_int('MongoDB', 'server_selection_timeout_ms', 5000),
+            "connectTimeoutMS": config.get_int('MongoDB', 'connect_timeout_ms', 10000),
+            "readPreference": (config.get_value('MongoDB', 'read_preference', 'primary') or 'primary').strip()
+        }
+        
+        # 0 表示不限制
+        socket_timeout = config.get_int('MongoDB', 'socket_timeout_ms', 0)
+        if socket_timeout:
+            options["socketTimeoutMS"] = socket_timeout
+        
+        # 单次操作的默认时限（客户端超时，覆盖服务器选择、取连接与执行）
+        timeout = config.get_int('MongoDB', 'timeout_ms', 0)
+        if timeout:
+            options["timeoutMS"] = timeout
+        
+        # 按配置顺序协商压缩算法，跳过未安装依赖的算法
+        compressors = []
+        for name in (config.get_value('MongoDB', 'compressors', '') or '').split(','):
+            name = name.strip().lower()
+            if not name:
+                continue
+            module = COMPRESSOR_MODULES.get(name)
+            if module is None or importlib.util.find_spec(module) is None:
+                logging.warning(f"MongoDB压缩算法 {name} 不可用，已忽略")
+                continue
+            compressors.append(name)
+        if compressors:
+            options["compressors"] = ",".join(compressors)
+            if "zlib" in compressors:
+                options["zlibCompressionLevel"] = config.get_int('MongoDB', 'zlib_compression_level', 6)
+        
+        return options
+    
     async def connect(self) -> bool:
         """异步连接到MongoDB"""
+        # 快速路径：已连接时无需加锁
+        if self._database is not None and self._initialized:
+            return True
+        
         async with self._lock:
             if self._client is not None and self._initialized:
                 return True
@@ -45,12 +98,8 @@ class MongoDB:
                 # 创建异步客户端
                 self._client = AsyncIOMotorClient(
                     self.clientString,
-                    serverSelectionTimeoutMS=5000,  # 5秒超时
-                    connectTimeoutMS=10000,         # 10秒连接超时
-                    socketTimeoutMS=0,              # 无限制socket超时
-                    maxPoolSize=10,                 # 最大连接池大小
-                    minPoolSize=5,                 # 最小连接池大小
-                    maxIdleTimeMS=30000            # 连接最大空闲时间
+                    event_listeners=[pool_monitor, command_monitor],
+                    **self.client_options
                 )
                 
                 # 测试连接
@@ -60,34 +109,43 @@ class MongoDB:
                 self._database = self._client[self.dbName]
                 
                 self._initialized = True
+                MongoDB.generation += 1
                 logging.info("MongoDB连接成功")
                 return True
                 
             except (ConnectionFailure, ServerSelectionTimeoutError) as e:
                 logging.error(f"MongoDB连接失败: {e}")
-                await self.disconnect()
+                self._close()
                 return False
             except Exception as e:
                 logging.error(f"MongoDB连接时发生未知错误: {e}")
-                await self.disconnect()
+                self._close()
                 return False
     
+    def _close(self):
+        """关闭客户端（调用方需持有锁，asyncio.Lock 不可重入）"""
+        if self._client:
+            self._client.close()
+            self._client = None
+            self._database = None
+            self._initialized = False
+            MongoDB.generation += 1
+            logging.info("MongoDB连接已断开")
+    
     async def disconnect(self):
         """断开MongoDB连接"""
         async with self._lock:
-            if self._client:
-                self._client.close()
-                self._client = None
-                self._database = None
-                self._initialized = False
-                logging.info("MongoDB连接已断开")
+            self._close()
 
 # 全局MongoDB实例
 mongodb_instance = MongoDB()
 
 async def get_mongodb_database() -> AsyncIOMotorDatabase:
-    """获取MongoDB数据库实例"""
+    """获取MongoDB数据库实例（已连接时不加锁，断开后自动重新连接）"""
     db = mongodb_instance
+    database = db._database
+    if database is not None:
+        return database
     if not await db.connect():
         raise ConnectionError("MongoDB连接失败")
     return db._database
@@ -0,0 +1,214 @@
+"""
+MongoDB 连接池与命令监控
+
+通过 pymongo 的 CMAP / 命令监听器收集：
+- 连接池：当前连接数、使用中连接数、取连接等待时间、取连接失败次数
+- 命令：按命令名统计次数、总耗时、最大耗时与失败次数
+- 请求：通过 contextvar 记录当前请求发出的命令数、总耗时与最慢命令，并按路由汇总
+
+监听器在 MongoDB.connect 创建客户端时注册，统计结果由 /api/admin/system/stats 输出。
+Motor 在线程池中执行命令时会复制调用方的上下文，因此监听器回调能取到发起请求的 contextvar。
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """连接池监听器"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 旧版本 pymongo 的事件没有 duration 字段，取连接在同一线程内完成，用线程局部变量计时
+        self._local = threading.local()
+        self.total_connections = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.pool_clears = 0
+    
+    def _checkout_duration(self, event) -> float:
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            return duration
+        start = getattr(self._local, "checkout_start", None)
+        return time.perf_counter() - start if start is not None else 0.0
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        with self._lock:
+            self.total_connections += 1
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        with self._lock:
+            self.total_connections -= 1
+    
+    def connection_check_out_started(self, event):
+        self._local.checkout_start = time.perf_counter()
+    
+    def connection_check_out_failed(self, event):
+        wait = self._checkout_duration(event)
+        with self._lock:
+            self.checkout_failures += 1
+            self.max_wait = max(self.max_wait, wait)
+    
+    def connection_checked_out(self, event):
+        wait = self._checkout_duration(event)
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+    
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        with self._lock:
+            return {
+                "connections": self.total_connections,
+                "inUse": self.in_use,
+                "maxInUse": self.max_in_use,
+                "checkouts": self.checkouts,
+                "checkoutFailures": self.checkout_failures,
+                "avgCheckoutWaitMs": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "maxCheckoutWaitMs": round(self.max_wait * 1000, 3),
+                "poolClears": self.pool_clears
+            }
+
+class RequestDbStats:
+    """单个请求的数据库访问统计"""
+    
+    __slots__ = ("ops", "total", "slowest", "slowest_command", "_lock")
+    
+    def __init__(self):
+        self.ops = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_command = ""
+        self._lock = threading.Lock()
+    
+    def record(self, name: str, duration: float):
+        with self._lock:
+            self.ops += 1
+            self.total += duration
+            if duration > self.slowest:
+                self.slowest = duration
+                self.slowest_command = name
+
+# 当前请求的数据库访问统计，由请求中间件设置
+current_request_db: ContextVar[Optional[RequestDbStats]] = ContextVar("current_request_db", default=None)
+
+class RouteDbStats:
+    """按路由汇总的数据库访问统计"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 路由 -> [请求数, 命令总数, 数据库总耗时(秒), 单请求最大命令数, 单请求最大数据库耗时(秒)]
+        self._routes: Dict[str, list] = {}
+    
+    def record(self, route: str, stats: RequestDbStats):
+        with self._lock:
+            item = self._routes.get(route)
+            if item is None:
+                item = self._routes[route] = [0, 0, 0.0, 0, 0.0]
+            item[0] += 1
+            item[1] += stats.ops
+            item[2] += stats.total
+            item[3] = max(item[3], stats.ops)
+            item[4] = max(item[4], stats.total)
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取各路由的数据库访问统计，按平均命令数降序（N+1 查询排在前面）"""
+        with self._lock:
+            items = [
+                (route, {
+                    "requests": requests,
+                    "avgOps": round(ops / requests, 2),
+                    "maxOps": max_ops,
+                    "avgDbMs": round(total / requests * 1000, 3),
+                    "maxDbMs": round(max_total * 1000, 3)
+                })
+                for route, (requests, ops, total, max_ops, max_total) in self._routes.items()
+            ]
+        items.sort(key=lambda item: item[1]["avgOps"], reverse=True)
+        return dict(items)
+
+class CommandMonitor(monitoring.CommandListener):
+    """命令监听器，按命令名统计耗时"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 命令名 -> [次数, 总耗时(秒), 最大耗时(秒), 失败次数]
+        self._commands: Dict[str, list] = {}
+    
+    def _record(self, name: str, duration: float, failed: bool):
+        request_stats = current_request_db.get()
+        if request_stats is not None:
+            request_stats.record(name, duration)
+        with self._lock:
+            item = self._commands.get(name)
+            if item is None:
+                item = self._commands[name] = [0, 0.0, 0.0, 0]
+            item[0] += 1
+            item[1] += duration
+            item[2] = max(item[2], duration)
+            item[3] += failed
+    
+    def started(self, event):
+        pass
+    
+    def succeeded(self, event):
+        self._record(event.command_name, event.duration_micros / 1e6, False)
+    
+    def failed(self, event):
+        self._record(event.command_name, event.duration_micros / 1e6, True)
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取命令耗时统计信息"""
+        with self._lock:
+            return {
+                name: {
+                    "count": count,
+                    "avgMs": round(total / count * 1000, 3) if count else 0.0,
+                    "maxMs": round(maximum * 1000, 3),
+                    "failed": failed
+                }
+                for name, (count, total, maximum, failed) in sorted(self._commands.items())
+            }
+
+# 全局监听器实例
+pool_monitor = PoolMonitor()
+command_monitor = CommandMonitor()
+route_db_stats = RouteDbStats()
+
+def get_mongodb_stats() -> Dict[str, Any]:
+    """获取连接池、命令与各路由的数据库访问统计信息"""
+    return {
+        "pool": pool_monitor.stats(),
+        "commands": command_monitor.stats(),
+        "routes": route_db_stats.stats()
+    }
@@ -0,0 +1,323 @@
+import logging
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+import Core.MongoDB.MongoDB as MongoDB
+
+class PrizeCounters:
+    """
+    奖品分片计数器
+    
+    热门奖品的库存（total）与抽中数（drawn_count）可以拆分到 prize_counter 集合的 K 个分片文档中，
+    抽奖时随机选择分片写入，避免所有抽奖请求争用同一个奖品文档。奖品文档上记录：
+    - counterShards：分片数（不小于 2 时抽奖写入分片）
+    - counterGeneration：当前分片代数，抽奖只写入当前代且未冻结（folded）的分片
+    - foldedShards：已累加回奖品文档、尚待删除的分片ID
+    有效值 = 奖品文档上的值 + 计入的分片之和；计入的分片为当前代或已冻结、且不在 foldedShards 中的分片。
+    
+    调整分片数的每一步只修改一个文档，任一步中断后有效值仍然准确，重新调用 set_shards 即可继续：
+    - 拆分：先写入下一代分片（此时不计入），再用一次条件更新把奖品文档上的库存减去移入的数量并切换到新一代
+    - 合并：先让抽奖改写奖品文档，再逐个冻结分片（按当前值条件更新，冻结后抽奖不再修改它），
+      把冻结时的值累加到奖品文档并记入 foldedShards，最后删除分片
+    普通奖品拆分时库存全部移入分片；默认奖品库存表示无限，只拆分 drawn_count。
+    """
+    
+    # 分片计数器集合索引
+    # - prizeId + generation + shard 唯一索引：按分片扣减与按奖品汇总
+    INDEXES = [
+        IndexModel([("prizeId", ASCENDING), ("generation", ASCENDING), ("shard", ASCENDING)], name="prizeId_generation_shard_unique", unique=True)
+    ]
+    LEGACY_INDEXES = ["prizeId_shard_unique"]
+    
+    # 单个奖品的最大分片数
+    MAX_SHARDS = 64
+    # 拆分时奖品库存被并发抽奖修改后的重试次数
+    SPLIT_ATTEMPTS = 5
+    
+    def __init__(self):
+        self.collection_name = "prize_counter"
+        # 已解析的集合句柄及其所属的连接代数，重连后自动重新解析
+        self._collection = None
+        self._collection_generation = -1
+    
+    async def _get_collection(self):
+        """获取分片计数器集合"""
+        if self._collection is not None and self._collection_generation == MongoDB.mongodb_instance.generation:
+            return self._collection
+        try:
+            database = await MongoDB.get_mongodb_database()
+            self._collection = database[self.collection_name]
+            self._collection_generation = MongoDB.mongodb_instance.generation
+            return self._collection
+        except Exception as e:
+            logging.error(f"获取分片计数器集合失败: {e}")
+            raise
+    
+    async def get_collection(self):
+        """获取分片计数器集合（公共方法，用于外部调用）"""
+        return await self._get_collection()
+    
+    @staticmethod
+    def shard_count(prize: Dict[str, Any]) -> int:
+        """奖品的分片数，未分片返回0"""
+        shards = prize.get("counterShards") or 0
+        return shards if shards > 1 else 0
+    
+    @staticmethod
+    def split(total: int, shards: int) -> List[int]:
+        """把库存尽量均匀地分到各分片"""
+        base, extra = divmod(max(0, total), shards)
+        return [base + (1 if i < extra else 0) for i in range(shards)]
+    
+    @staticmethod
+    def _prize_id(prize: Dict[str, Any]) -> ObjectId:
+        return ObjectId(prize["_id"]) if isinstance(prize["_id"], str) else prize["_id"]
+    
+    def _live(self, prize: Dict[str, Any]) -> Dict[str, Any]:
+        """抽奖可以写入的分片：当前代且未冻结"""
+        return {"prizeId": self._prize_id(prize), "generation": prize.get("counterGeneration", 0), "folded": {"$ne": True}}
+    
+    @staticmethod
+    def _counted(prize: Dict[str, Any], shard: Dict[str, Any]) -> bool:
+        """分片是否计入奖品的有效值（下一代未生效的分片与已累加回奖品文档的分片不计入）"""
+        if shard["_id"] in prize.get("foldedShards", []):
+            return False
+        return shard.get("folded", False) or shard.get("generation", 0) == prize.get("counterGeneration", 0)
+    
+    async def get_sums(self, prizes: Iterable[Dict[str, Any]]) -> Dict[Any, Dict[str, int]]:
+        """按奖品汇总计入的分片: {奖品ID: {"total", "drawn_count"}}，prizes 需包含 counterGeneration 与 foldedShards"""
+        tracked = {self._prize_id(prize): prize for prize in prizes if "counterGeneration" in prize}
+        if not tracked:
+            return {}
+        collection = await self._get_collection()
+        sums = {}
+        async for shard in collection.find(
+            {"prizeId": {"$in": list(tracked)}},
+            {"prizeId": 1, "generation": 1, "folded": 1, "total": 1, "drawn_count": 1}
+        ):
+            if not self._counted(tracked[shard["prizeId"]], shard):
+                continue
+            counted = sums.setdefault(shard["prizeId"], {"total": 0, "drawn_count": 0})
+            counted["total"] += shard.get("total", 0)
+            counted["drawn_count"] += shard.get("drawn_count", 0)
+        return sums
+    
+    async def get_totals(self, prize_collection) -> Dict[str, int]:
+        """
+        全部分片奖品的分片之和: {"total", "drawn_count", "available"}（available 只累计汇总后仍有库存的奖品）
+    
+        只统计仍存在且分片过的奖品，已删除奖品遗留的分片不计入。
+        """
+        try:
+            prizes = await prize_collection.find(
+                {"counterGeneration": {"$exists": True}},
+                {"counterGeneration": 1, "foldedShards": 1}
+            ).to_list(None)
+            sums = await self.get_sums(prizes)
+        except Exception as e:
+            logging.error(f"汇总分片计数器时发生错误: {e}")
+            sums = {}
+        return {
+            "total": sum(s["total"] for s in sums.values()),
+            "drawn_count": sum(s["drawn_count"] for s in sums.values()),
+            "available": sum(s["total"] for s in sums.values() if s["total"] > 0)
+        }
+    
+    async def overlay(self, prizes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """把分片计数累加到奖品文档的 total / drawn_count 上（原地修改，未分片过的奖品不变）"""
+        sums = await self.get_sums(prizes)
+        for prize in prizes:
+            if "counterGeneration" not in prize:
+                continue
+            counted = sums.get(self._prize_id(prize), {})
+            prize["total"] = prize.get("total", 0) + counted.get("total", 0)
+            prize["drawn_count"] = prize.get("drawn_count", 0) + counted.get("drawn_count", 0)
+        return prizes
+    
+    async def take(self, prize_collection, prize: Dict[str, Any], count: int) -> Tuple[int, bool]:
+        """
+        从分片扣减最多 count 个库存
+    
+        先在随机分片上按 total >= count 条件扣减；失败时读取全部有库存的分片，按随机顺序逐个扣减；
+        分片不足时再从奖品文档上扣减（分片冻结后归还的库存会写到奖品文档上）。
+    
+        Returns:
+            Tuple: (实际扣减数量, 是否已无库存)
+        """
+        collection = await self._get_collection()
+        query = self._live(prize)
+        shard = await collection.find_one_and_update(
+            {**query, "shard": random.randrange(self.shard_count(prize)), "total": {"$gte": count}},
+            {"$inc": {"total": -count, "drawn_count": count}},
+            projection={"_id": 0, "total": 1}
+        )
+        if shard is not None:
+            return count, False
+    
+        candidates = await collection.find({**query, "total": {"$gt": 0}}, {"_id": 1, "total": 1}).to_list(None)
+        random.shuffle(candidates)
+        granted = 0
+        for candidate in candidates:
+            need = min(count - granted, candidate["total"])
+            if need <= 0:
+                break
+            taken = await collection.find_one_and_update(
+                {"_id": candidate["_id"], "folded": {"$ne": True}, "total": {"$gte": need}},
+                {"$inc": {"total": -need, "drawn_count": need}},
+                projection={"_id": 0, "total": 1}
+            )
+            if taken is not None:
+                granted += need
+        remaining = sum(c["total"] for c in candidates) - granted
+    
+        if granted < count:
+            prize_id = self._prize_id(prize)
+            base = await prize_collection.find_one({"_id": prize_id}, {"_id": 0, "total": 1})
+            need = min(count - granted, (base or {}).get("total", 0))
+            if need > 0:
+                taken = await prize_collection.find_one_and_update(
+                    {"_id": prize_id, "total": {"$gte": need}},
+                    {"$inc": {"total": -need, "drawn_count": need}},
+                    projection={"_id": 0, "total": 1},
+                    return_document=True
+                )
+                if taken is not None:
+                    granted += need
+                    remaining += taken.get("total", 0)
+        return granted, remaining <= 0
+    
+    def _shard_increment(self, prize: Dict[str, Any], total: int, drawn: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """随机分片上的计数增量: (查询条件, 更新内容)"""
+        return (
+            {**self._live(prize), "shard": random.randrange(self.shard_count(prize))},
+            {"$inc": {"total": total, "drawn_count": drawn}}
+        )
+    
+    async def add(self, prize_collection, prize: Dict[str, Any], total: int = 0, drawn: int = 0):
+        """在随机分片上累加库存与抽中数（归还库存、默认奖品计数），分片已冻结或已删除时累加到奖品文档"""
+        collection = await self._get_collection()
+        query, update = self._shard_increment(prize, total, drawn)
+        result = await collection.update_one(query, update)
+        if result.matched_count == 0:
+            await prize_collection.update_one({"_id": self._prize_id(prize)}, update)
+    
+    async def set_total(self, prize_collection, prize: Dict[str, Any], total: int) -> bool:
+        """把分片奖品的有效库存设置为 total（重新分配到各分片，奖品文档上的库存置为0，抽中数不变）"""
+        try:
+            collection = await self._get_collection()
+            query = self._live(prize)
+            shards = self.shard_count(prize)
+            result = await collection.bulk_write([
+                UpdateOne({**query, "shard": i}, {"$set": {"total": part}})
+                for i, part in enumerate(self.split(total, shards))
+            ], ordered=False)
+            if result.matched_count < shards:
+                logging.error(f"奖品 {prize['_id']} 的分片正在调整，设置库存失败")
+                return False
+            await prize_collection.update_one({"_id": self._prize_id(prize)}, {"$set": {"total": 0}})
+            return True
+        except Exception as e:
+            logging.error(f"设置分片库存时发生错误: {e}")
+            return False
+    
+    async def _freeze(self, collection, shard: Dict[str, Any]) -> Dict[str, int]:
+        """按当前值条件冻结分片并返回冻结时的值（冻结后抽奖不再修改该分片）"""
+        while shard is not None and not shard.get("folded"):
+            result = await collection.update_one(
+                {"_id": shard["_id"], "total": shard.get("total", 0), "drawn_count": shard.get("drawn_count", 0)},
+                {"$set": {"folded": True}}
+            )
+            if result.matched_count:
+                break
+            # 冻结前有抽奖修改了该分片，重新读取
+            shard = await collection.find_one({"_id": shard["_id"]})
+        shard = shard or {}
+        return {"total": shard.get("total", 0), "drawn_count": shard.get("drawn_count", 0)}
+    
+    async def _merge(self, prize_collection, prize: Dict[str, Any]):
+        """把全部分片合并回奖品文档"""
+        collection = await self._get_collection()
+        prize_id = prize["_id"]
+        # 重新加载的奖品池改为直接写奖品文档
+        await prize_collection.update_one({"_id": prize_id}, {"$unset": {"counterShards": ""}})
+    
+        for shard in await collection.find({"prizeId": prize_id}).to_list(None):
+            if self._counted(prize, shard):
+                values = await self._freeze(collection, shard)
+                await prize_collection.update_one(
+                    {"_id": prize_id, "foldedShards": {"$ne": shard["_id"]}},
+                    {"$inc": values, "$push": {"foldedShards": shard["_id"]}}
+                )
+            # 已累加的分片与未生效的下一代分片直接删除
+            await collection.delete_one({"_id": shard["_id"]})
+        await prize_collection.update_one({"_id": prize_id}, {"$set": {"foldedShards": []}})
+    
+    async def _split(self, prize_collection, prize_id: ObjectId, shards: int) -> bool:
+        """把奖品文档上的库存拆分到下一代分片"""
+        collection = await self._get_collection()
+        for _ in range(self.SPLIT_ATTEMPTS):
+            prize = await prize_collection.find_one({"_id": prize_id}, {"total": 1, "isDefault": 1, "counterGeneration": 1})
+            if not prize:
+                return False
+            generation = prize.get("counterGeneration", 0) + 1
+            moved = 0 if prize.get("isDefault") else max(0, prize.get("total", 0))
+    
+            # 下一代分片在奖品文档切换前不计入也不会被抽奖写入，先清理之前中断留下的同代分片
+            await collection.delete_many({"prizeId": prize_id, "generation": generation})
+            await collection.insert_many([
+                {"prizeId": prize_id, "generation": generation, "shard": i, "total": part, "drawn_count": 0, "folded": False}
+                for i, part in enumerate(self.split(moved, shards))
+            ])
+    
+            # 库存未被并发抽奖修改时，一次更新同时移出库存并切换到新一代
+            current = {"_id": prize_id, "total": prize.get("total", 0)}
+            current["counterGeneration"] = prize["counterGeneration"] if "counterGeneration" in prize else {"$exists": False}
+            result = await prize_collection.update_one(
+                current,
+                {"$inc": {"total": -moved}, "$set": {"counterShards": shards, "counterGeneration": generation}}
+            )
+            if result.matched_count:
+                return True
+        logging.error(f"奖品 {prize_id} 的库存持续变化，拆分分片失败")
+        return False
+    
+    async def set_shards(self, prize_collection, prize_id: ObjectId, shards: int) -> Optional[Dict[str, int]]:
+        """
+        调整奖品的分片数（0 或 1 表示合并回奖品文档）
+    
+        先把现有分片合并回奖品文档，再按新的分片数拆分。调整期间抽奖可能短暂抽不到该奖品，但不会丢失库存与计数；
+        中途失败时有效值不变，重新调用即可完成调整。
+    
+        Returns:
+            Dict: 调整后的有效 total / drawn_count，奖品不存在或失败时返回None
+        """
+        try:
+            projection = {"total": 1, "drawn_count": 1, "counterGeneration": 1, "foldedShards": 1}
+            prize = await prize_collection.find_one({"_id": prize_id}, projection)
+            if not prize:
+                return None
+            if "counterGeneration" in prize:
+                await self._merge(prize_collection, prize)
+            if shards > 1 and not await self._split(prize_collection, prize_id, shards):
+                return None
+    
+            prize = await prize_collection.find_one({"_id": prize_id}, projection)
+            await self.overlay([prize])
+            logging.info(f"奖品 {prize_id} 的计数分片已调整为 {shards if shards > 1 else 0}")
+            return {"total": prize.get("total", 0), "drawn_count": prize.get("drawn_count", 0)}
+        except Exception as e:
+            logging.error(f"调整奖品分片时发生错误: {e}")
+            return None
+    
+    async def delete(self, prize_id: ObjectId):
+        """删除奖品的全部分片"""
+        try:
+            collection = await self._get_collection()
+            await collection.delete_many({"prizeId": prize_id})
+        except Exception as e:
+            logging.error(f"删除奖品分片时发生错误: {e}")
+
+# 全局分片计数器实例
+prize_counters = PrizeCounters()
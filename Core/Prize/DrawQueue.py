@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from Core.Common.Config import Config
+from Core.Prize.Counters import prize_counters
+from Core.Prize.Lottery import LotteryService, PoolSnapshot, build_draw_history, build_prize_record, insufficient_points_result, lottery_service, user_not_found_result
+
+# 核对批量扣分结果的最大尝试次数
+CHECK_ATTEMPTS = 2
+
+class DrawRequest:
+    """排队中的一次抽奖请求"""
+    
+    __slots__ = ("stu_id", "cost", "count", "future")
+    
+    def __init__(self, stu_id: str, cost: int, count: int, future: asyncio.Future):
+        self.stu_id = stu_id
+        self.cost = cost
+        self.count = count
+        self.future = future
+
+class DrawQueue:
+    """
+    抽奖组提交队列（[Lottery] mode = queue 时启用）
+    
+    抽奖请求进入进程内队列，由单个后台任务把 window_ms 毫秒内到达的请求合并为一批提交：
+    - 一次查询预检整批用户的积分，积分不足或用户不存在的请求直接失败，不参与抽样与库存预留
+    - 对整批结果一次抽样，按奖品汇总后每个奖品只做一次库存预留
+    - 所有用户的条件扣分与记录追加合并为一次 bulk_write，再用一次查询确认各用户是否扣分成功及剩余积分
+    - 默认奖品的 drawn_count 与扣分失败时的库存归还合并为一次 bulk_write（分片奖品每个奖品写一次随机分片）
+    热门奖品（尤其是每次都会命中的“谢谢惠顾”）从每次抽奖一次写入变为每批一次写入。
+    预留库存后任一步出错都会归还未扣分请求的预留：无法确认扣分结果时与直接模式相同，归还整批预留后以异常结束各请求。
+    同一用户在一批中最多出现一次，其余请求顺延到下一批。每个请求的 Future 以各自的结果完成，结果格式与 LotteryService.draw_many 相同。
+    """
+    
+    def __init__(self, service: LotteryService):
+        self.service = service
+        self._queue: Optional[asyncio.Queue] = None
+        self._carry: Deque[DrawRequest] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self.batch_count = 0
+        self.request_count = 0
+        self.max_batch_seen = 0
+        self.load_config()
+    
+    def load_config(self):
+        """从 [Lottery] 配置段加载队列参数"""
+        config = Config()
+        self.mode = (config.get_value('Lottery', 'mode', 'direct') or 'direct').strip().lower()
+        self.window = config.get_float('Lottery', 'queue_window_ms', 5.0) / 1000
+        self.max_batch = max(1, config.get_int('Lottery', 'queue_max_batch', 200))
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def start(self):
+        """启动后台提交任务（mode 不是 queue 时不启动）"""
+        if self.mode != "queue" or self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"抽奖组提交队列已启动，合并窗口 {self.window * 1000:.0f}ms，单批上限 {self.max_batch}")
+    
+    async def stop(self):
+        """停止后台任务，未提交的请求以异常结束"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        pending = list(self._carry)
+        self._carry.clear()
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for request in pending:
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("抽奖队列已停止"))
+    
+    async def draw_many(self, stu_id: str, cost: int, count: int) -> Dict[str, Any]:
+        """连续抽奖 count 次：队列运行时排队合并提交，否则直接执行"""
+        if not self.running:
+            return await self.service.draw_many(stu_id, cost, count)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(DrawRequest(stu_id, cost, count, future))
+        return await future
+    
+    async def draw(self, stu_id: str, cost: int) -> Dict[str, Any]:
+        """抽奖一次，结果格式与 LotteryService.draw 相同"""
+        result = await self.draw_many(stu_id, cost, 1)
+        if not result["success"]:
+            return result
+        prize = result["prizes"][0]
+        return {"success": True, "prize": prize, "isDefault": prize.get("isDefault", False), "remainingPoints": result["remainingPoints"]}
+    
+    async def _next(self, timeout: Optional[float]) -> Optional[DrawRequest]:
+        """取下一个请求（优先取上一批顺延的请求），超时返回None"""
+        if self._carry:
+            return self._carry.popleft()
+        if timeout is None:
+            return await self._queue.get()
+        if timeout <= 0:
+            return self._queue.get_nowait() if not self._queue.empty() else None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+    
+    async def _collect(self) -> List[DrawRequest]:
+        """收集一批请求：第一个请求到达后再等待 window 秒或直到达到单批上限"""
+        loop = asyncio.get_running_loop()
+        first = await self._next(None)
+        batch = [first]
+        seen = {first.stu_id}
+        deferred = []
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            request = await self._next(deadline - loop.time())
+            if request is None:
+                break
+            if request.stu_id in seen:
+                deferred.append(request)
+            else:
+                seen.add(request.stu_id)
+                batch.append(request)
+        # 顺延的请求保持原有顺序排在下一批最前面
+        self._carry.extendleft(reversed(deferred))
+        return batch
+    
+    async def _run(self):
+        """后台任务：循环收集并提交"""
+        while True:
+            batch = await self._collect()
+            try:
+                await self._commit(batch)
+            except asyncio.CancelledError:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(RuntimeError("抽奖队列已停止"))
+                raise
+            except Exception as e:
+                logging.error(f"抽奖批量提交失败: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+    
+    async def _commit(self, batch: List[DrawRequest]):
+        """提交一批抽奖请求并完成各自的 Future"""
+        start = time.perf_counter()
+        self.batch_count += 1
+        self.request_count += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        service = self.service
+    
+        def finish(request: DrawRequest, result: Dict[str, Any]):
+            if not request.future.done():
+                request.future.set_result(result)
+    
+        snapshot = await service.pool.get_snapshot()
+        if snapshot.error:
+            logging.error(f"抽奖失败：{snapshot.error}")
+            for request in batch:
+                finish(request, {"success": False, "status": 400, "reason": "pool_error", "message": snapshot.error})
+            return
+    
+        # 1. 整批一次预检积分，再对通过的请求一次抽样，按奖品汇总预留库存
+        rejected = await service.check_points({r.stu_id: r.cost * r.count for r in batch})
+        for request in batch:
+            if request.stu_id in rejected:
+                finish(request, rejected[request.stu_id])
+        batch = [request for request in batch if request.stu_id not in rejected]
+        if not batch:
+            return
+        outcomes, reserved, failure = await service.sample_and_reserve(snapshot, sum(r.count for r in batch))
+        if failure:
+            for request in batch:
+                finish(request, failure)
+            return
+        slices = []
+        offset = 0
+        for request in batch:
+            slices.append(outcomes[offset:offset + request.count])
+            offset += request.count
+    
+        # 2. 全部用户的条件扣分合并为一次 bulk_write
+        try:
+            charged, existing = await self._charge(batch, slices)
+        except Exception:
+            # 无法确认哪些用户已扣分，与直接模式扣分出错时相同，归还全部预留后整批失败
+            await service.release_all(snapshot, reserved)
+            raise
+    
+        # 3. 默认奖品计数与未扣分请求的库存归还
+        released = Counter()
+        defaults = Counter()
+        prize_by_id = {}
+        for request, prizes in zip(batch, slices):
+            for prize in prizes:
+                prize_by_id[prize["_id"]] = prize
+                if prize.get("isDefault", False):
+                    if request.stu_id in charged:
+                        defaults[prize["_id"]] += 1
+                elif request.stu_id not in charged:
+                    released[prize["_id"]] += 1
+        await self._settle(snapshot, prize_by_id, released, defaults)
+    
+        # 4. 完成各请求
+        for request, prizes in zip(batch, slices):
+            if request.stu_id in charged:
+                service.draw_count += request.count
+                finish(request, {"success": True, "prizes": prizes, "remainingPoints": charged[request.stu_id]})
+            elif request.stu_id in existing:
+                finish(request, insufficient_points_result(request.cost * request.count))
+            else:
+                finish(request, user_not_found_result())
+    
+        logging.debug(f"抽奖批量提交完成: {len(batch)} 个请求，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+    
+    async def _charge(self, batch: List[DrawRequest], slices: List[List[Dict[str, Any]]]) -> Tuple[Dict[str, int], Set[str]]:
+        """
+        全部用户的条件扣分与记录追加合并为一次 bulk_write，再用一次查询确认结果
+    
+        Returns:
+            Tuple: ({已扣分的学号: 剩余积分}, 存在的学号)
+        """
+        now = datetime.now()
+        operations = []
+        marker_ids = {}
+        for request, prizes in zip(batch, slices):
+            history = [build_draw_history(prize, request.cost, request.stu_id, now) for prize in prizes]
+            marker_ids[request.stu_id] = history[0]["recordId"]
+            operations.append(UpdateOne(
+                {"stuId": request.stu_id, "points": {"$gte": request.cost * request.count}},
+                {
+                    "$inc": {"points": -request.cost * request.count},
+                    "$push": {
+                        "prizes": {"$each": [build_prize_record(prize, now) for prize in prizes]},
+                        "pointHistory": {"$each": history}
+                    }
+                }
+            ))
+    
+        user_collection = await self.service.user_manager.get_collection()
+        try:
+            await user_collection.bulk_write(operations, ordered=False)
+        except Exception:
+            # 无法确认哪些扣分已生效，先核对再决定是否归还
+            logging.exception("抽奖批量扣分出现错误，按实际写入结果处理")
+    
+        # 一次查询确认各用户是否扣分成功（历史中是否存在本批的记录）及剩余积分，查询出错时重试一次
+        for attempt in range(CHECK_ATTEMPTS):
+            charged: Dict[str, int] = {}
+            existing: Set[str] = set()
+            try:
+                async for user in user_collection.find(
+                    {"stuId": {"$in": list(marker_ids)}},
+                    {"_id": 0, "stuId": 1, "points": 1, "pointHistory": {"$elemMatch": {"recordId": {"$in": list(marker_ids.values())}}}}
+                ):
+                    existing.add(user["stuId"])
+                    if user.get("pointHistory"):
+                        charged[user["stuId"]] = user.get("points", 0)
+                return charged, existing
+            except Exception as e:
+                if attempt + 1 == CHECK_ATTEMPTS:
+                    raise
+                logging.error(f"核对抽奖批量扣分结果失败，重试: {e}")
+    
+    async def _settle(self, snapshot: PoolSnapshot, prize_by_id: Dict[Any, Dict[str, Any]], released: Counter, defaults: Counter):
+        """
+        写入默认奖品的抽中数并归还未扣分请求预留的库存
+    
+        未分片奖品合并为一次 bulk_write，分片奖品逐个写入随机分片（分片冻结时需改写奖品文档）；
+        批量写入失败的部分逐个重试，单个奖品仍写入失败时记录日志，不影响已扣分请求的结果。
+        """
+        service = self.service
+        changes = [(prize_id, count, -count) for prize_id, count in released.items()]
+        changes += [(prize_id, 0, count) for prize_id, count in defaults.items()]
+        if not changes:
+            return
+        batched = [change for change in changes if not prize_counters.shard_count(prize_by_id[change[0]])]
+        single = [change for change in changes if prize_counters.shard_count(prize_by_id[change[0]])]
+        if batched:
+            try:
+                prize_collection = await service.pool.get_collection()
+                await prize_collection.bulk_write(
+                    [UpdateOne({"_id": prize_id}, {"$inc": {"total": total, "drawn_count": drawn}}) for prize_id, total, drawn in batched],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                logging.error(f"抽奖批量更新奖品计数部分失败，逐个重试 {len(failed)} 项: {e}")
+                single += [change for index, change in enumerate(batched) if index in failed]
+            except Exception as e:
+                # 未确认写入（如连接中断），按未写入处理逐个重试
+                logging.error(f"抽奖批量更新奖品计数失败，逐个重试: {e}")
+                single += batched
+    
+        results = await asyncio.gather(
+            *(self._apply(prize_by_id[prize_id], total, drawn) for prize_id, total, drawn in single),
+            return_exceptions=True
+        )
+        for (prize_id, total, drawn), result in zip(single, results):
+            if isinstance(result, BaseException):
+                logging.error(f"更新奖品计数失败，奖品 {prize_id} 库存少计 {total}，抽中数少计 {drawn}: {result}")
+        service.compensations += len(released)
+        if any(prize_id in snapshot.depleted for prize_id in released):
+            await service.pool.invalidate()
+    
+    async def _apply(self, prize: Dict[str, Any], total: int, drawn: int):
+        """单独写入一个奖品的库存与抽中数变化"""
+        prize_collection = await self.service.pool.get_collection()
+        if prize_counters.shard_count(prize):
+            await prize_counters.add(prize_collection, prize, total=total, drawn=drawn)
+        else:
+            await prize_collection.update_one({"_id": prize["_id"]}, {"$inc": {"total": total, "drawn_count": drawn}})
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息"""
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "queued": (self._queue.qsize() if self._queue is not None else 0) + len(self._carry),
+            "batches": self.batch_count,
+            "requests": self.request_count,
+            "avgBatch": round(self.request_count / self.batch_count, 2) if self.batch_count else 0,
+            "maxBatch": self.max_batch_seen
+        }
+
+# 全局抽奖队列实例
+draw_queue = DrawQueue(lottery_service)
@@ -0,0 +1,548 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+
+import Core.MongoDB.MongoDB as MongoDB
+from Core.Common.SystemSettings import system_settings
+from Core.Prize.Counters import prize_counters
+from Core.User.User import User
+
+# 奖品池版本设置的 key，奖品变更时写入新值以通知各 worker 重新加载
+POOL_VERSION_KEY = "prize_pool_version"
+
+# 快照中有奖品被排除时，先拒绝采样的次数
+REJECTION_ATTEMPTS = 8
+
+# 单次抽奖预留库存的最大尝试次数（每次失败说明该奖品已被抽空，改抽下一个）
+RESERVE_ATTEMPTS = 5
+
+def prize_name(prize: Dict[str, Any]) -> str:
+    """奖品名称（兼容 Name / name 两种字段）"""
+    return prize.get("Name", prize.get("name", "未知奖品"))
+
+def build_prize_record(prize: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """用户 prizes 数组中的奖品记录"""
+    return {
+        "prizeId": str(prize["_id"]),
+        "prizeName": prize_name(prize),
+        "prizePhoto": prize.get("photo", ""),
+        "drawTime": now,
+        "redeemed": False,  # 核销状态
+        "redeemedBy": None,
+        "redeemedAt": None
+    }
+
+def build_draw_history(prize: Dict[str, Any], cost: int, operator: str, now: datetime) -> Dict[str, Any]:
+    """抽奖消耗积分的历史记录"""
+    return {
+        "recordId": str(ObjectId()),
+        "type": "lottery_draw",
+        "pointsChange": -cost,  # 负数表示消耗
+        "reason": f"抽奖消耗: 获得{prize_name(prize)}",
+        "prizeId": str(prize["_id"]),
+        "prizeName": prize_name(prize),
+        "operator": operator,
+        "timestamp": now,
+        "revoked": False,
+        "revokedBy": None,
+        "revokedAt": None
+    }
+
+def user_not_found_result() -> Dict[str, Any]:
+    """抽奖失败结果：用户不存在"""
+    return {"success": False, "status": 404, "reason": "user_not_found", "message": "用户不存在"}
+
+def insufficient_points_result(cost: int) -> Dict[str, Any]:
+    """抽奖失败结果：积分不足"""
+    return {"success": False, "status": 400, "reason": "insufficient_points", "message": f"积分不足，需要 {cost} 积分"}
+
+def prize_weight(prize: Dict[str, Any]) -> float:
+    """奖品权重（百分比），缺省或为空时按0计，与数据库聚合 $sum 的口径一致"""
+    return float(prize.get("weight", 0) or 0)
+
+def select_weighted_prize(prizes: List[Dict[str, Any]], rand_value: float) -> Optional[Dict[str, Any]]:
+    """
+    按累计权重选择奖品（线性扫描，保留作为别名表的对照实现）
+    
+    Args:
+        prizes: 可抽取的奖品列表（按顺序累计 prize_weight，权重为0的奖品不会被选中）
+        rand_value: 位于 [0, 总权重] 的随机数
+    
+    Returns:
+        Dict: 选中的奖品；未命中时回退到第一个奖品，列表为空返回None
+    """
+    current_weight = 0.0
+    for prize in prizes:
+        weight = prize.get("weight", 0) or 0  # 与 prize_weight 口径一致，热路径上内联
+        current_weight += weight
+        if weight > 0 and rand_value <= current_weight:
+            return prize
+    # 理论上不会发生（浮点误差等），回退到第一个
+    return prizes[0] if prizes else None
+
+class AliasTable:
+    """
+    Vose 别名表：O(n) 构建，O(1) 按权重抽样
+    
+    权重按比例缩放到平均值为 1 后分为“不足”与“溢出”两组，每个槽位最多由两个结果组成：
+    自身（概率 prob[i]）或其别名 alias[i]。
+    """
+    
+    __slots__ = ("prob", "alias", "size")
+    
+    def __init__(self, weights: List[float]):
+        size = len(weights)
+        total = sum(weights)
+        self.size = size
+        self.prob = [1.0] * size
+        self.alias = list(range(size))
+        if size == 0 or total <= 0:
+            return
+    
+        scaled = [w * size / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # 剩余槽位（浮点误差导致）概率视为 1
+        for i in large + small:
+            self.prob[i] = 1.0
+    
+    def sample(self, rng: random.Random = random) -> int:
+        """返回抽中的下标（一次随机数同时决定槽位与槽内取舍）"""
+        r = rng.random() * self.size
+        i = int(r)
+        return i if r - i < self.prob[i] else self.alias[i]
+
+class PoolSnapshot:
+    """某一时刻的奖品池快照（只读）"""
+    
+    def __init__(self, version: Any, prizes: List[Dict[str, Any]]):
+        self.version = version
+        self.loaded_at = time.time()
+        self.error: Optional[str] = None
+        self.candidates: List[Dict[str, Any]] = []
+        self.total_weight = 0.0
+        self.table: Optional[AliasTable] = None
+        # 抽奖过程中发现库存已耗尽的奖品ID，重新加载前不再抽中
+        self.depleted: Set[Any] = set()
+    
+        if not prizes:
+            self.error = "当前没有可抽奖的奖品"
+            return
+    
+        default_prize = next((p for p in prizes if p.get("isDefault", False)), None)
+        # 只有有库存的普通奖品参与抽奖
+        candidates = [p for p in prizes if not p.get("isDefault", False) and p.get("total", 0) > 0]
+    
+        if not candidates:
+            # 没有可用的普通奖品，只能抽中默认奖品
+            if default_prize:
+                self.candidates = [default_prize]
+            else:
+                self.error = "所有奖品库存已空，且没有默认奖品"
+            return
+    
+        if default_prize:
+            candidates.append(default_prize)
+    
+        # 业务规则：权重表示百分比（0-100），整体不应超过100%
+        weights = [prize_weight(p) for p in candidates]
+        self.total_weight = sum(weights)
+        if self.total_weight > 100.0:
+            self.error = f"奖品概率总和超过100%（{self.total_weight}），请调整奖品权重后重试。"
+            return
+    
+        self.candidates = candidates
+        self.table = AliasTable(weights)
+    
+    def draw(self, rng: random.Random = random, exclude: Set[Any] = frozenset()) -> Optional[Dict[str, Any]]:
+        """
+        抽取一个奖品（调用前需确认 error 为空）
+    
+        Args:
+            rng: 随机数发生器
+            exclude: 需要跳过的奖品ID（库存已耗尽等），其概率按比例分摊给其余奖品
+    
+        Returns:
+            Dict: 选中的奖品；全部被排除时返回None
+        """
+        if self.table is None or self.total_weight <= 0:
+            # 只有默认奖品，或权重全为0时与原实现一致：选择第一个可用奖品
+            return next((p for p in self.candidates if p["_id"] not in exclude), None)
+        if not exclude:
+            return self.candidates[self.table.sample(rng)]
+    
+        # 被排除的奖品通常很少，先拒绝采样几次，仍未命中再对剩余奖品线性抽取
+        for _ in range(REJECTION_ATTEMPTS):
+            prize = self.candidates[self.table.sample(rng)]
+            if prize["_id"] not in exclude:
+                return prize
+        remaining = [p for p in self.candidates if p["_id"] not in exclude]
+        if not remaining:
+            return None
+        total_weight = sum(prize_weight(p) for p in remaining)
+        return select_weighted_prize(remaining, rng.uniform(0, total_weight))
+
+class LotteryPool:
+    """
+    抽奖奖品池
+    
+    进程内缓存激活奖品的快照与预先构建的别名表，抽奖时不读取奖品集合。
+    奖品被创建、修改、删除、启停或某个奖品库存耗尽时调用 invalidate()：
+    - 本进程立即标记失效，下一次抽奖重新加载
+    - 同时写入系统设置 prize_pool_version，其他 worker 通过系统设置同步（sync_interval 秒内）感知并重新加载
+    """
+    
+    def __init__(self):
+        self.collection_name = "prize"
+        # 已解析的集合句柄及其所属的连接代数，重连后自动重新解析
+        self._collection = None
+        self._collection_generation = -1
+        self._snapshot: Optional[PoolSnapshot] = None
+        # 本进程内的失效计数，快照记录加载时的值
+        self._epoch = 0
+        self._lock = asyncio.Lock()
+        self.reload_count = 0
+    
+    async def get_collection(self):
+        """获取奖品集合"""
+        if self._collection is not None and self._collection_generation == MongoDB.mongodb_instance.generation:
+            return self._collection
+        try:
+            database = await MongoDB.get_mongodb_database()
+            self._collection = database[self.collection_name]
+            self._collection_generation = MongoDB.mongodb_instance.generation
+            return self._collection
+        except Exception as e:
+            logging.error(f"获取奖品集合失败: {e}")
+            raise
+    
+    def _current_version(self) -> Tuple[Any, int]:
+        return system_settings.get_cached(POOL_VERSION_KEY), self._epoch
+    
+    async def get_snapshot(self) -> PoolSnapshot:
+        """获取当前奖品池快照，失效时重新加载"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._current_version():
+            return snapshot
+    
+        async with self._lock:
+            version = self._current_version()
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+    
+            # 先取版本再读奖品：加载期间发生的变更会让下一次调用再次加载
+            collection = await self.get_collection()
+            prizes = await prize_counters.overlay(await collection.find({"isActive": True}).to_list(None))
+            snapshot = PoolSnapshot(version, prizes)
+            self._snapshot = snapshot
+            self.reload_count += 1
+            logging.info(f"奖品池已加载: {len(snapshot.candidates)} 个候选奖品，总权重 {snapshot.total_weight}")
+            return snapshot
+    
+    async def mark_depleted(self, snapshot: PoolSnapshot, prize_id: Any):
+        """记录奖品库存已耗尽：当前快照立即跳过该奖品，并使奖品池失效（每个快照每个奖品只通知一次）"""
+        if prize_id in snapshot.depleted:
+            return
+        snapshot.depleted.add(prize_id)
+        await self.invalidate()
+    
+    async def invalidate(self, broadcast: bool = True):
+        """标记奖品池失效（broadcast 为 True 时通知其他 worker）"""
+        self._epoch += 1
+        if broadcast:
+            await system_settings.set_setting(POOL_VERSION_KEY, str(ObjectId()))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取奖品池统计信息"""
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "loadedAt": snapshot.loaded_at if snapshot else None,
+            "candidates": len(snapshot.candidates) if snapshot else 0,
+            "totalWeight": snapshot.total_weight if snapshot else 0,
+            "error": snapshot.error if snapshot else None,
+            "depleted": len(snapshot.depleted) if snapshot else 0,
+            "reloadCount": self.reload_count
+        }
+
+# 全局奖品池实例
+lottery_pool = LotteryPool()
+
+class LotteryService:
+    """
+    抽奖服务
+    
+    一次抽奖（或一组连抽）先按 points >= 总消耗 预检一次用户积分（只读，不足时直接失败、不占用库存），
+    之后只有两轮条件写入，不读取奖品：
+    1. 普通奖品按 total >= 抽中数 条件扣减库存，各奖品的预留并发执行；
+       库存不足时预留剩余的全部，不足的部分在本次请求内排除该奖品后重新抽样
+    2. 按 points >= 总消耗 条件扣除积分，并在同一次更新中追加全部奖品记录与积分历史
+    第 2 步失败时归还第 1 步预留的全部库存（补偿），再区分“用户不存在”与“积分不足”。
+    默认奖品（谢谢惠顾）没有库存限制，只在扣分成功后累加 drawn_count。
+    设置了计数分片（counterShards）的奖品改为在随机分片上扣减与累加，见 Core.Prize.Counters。
+    """
+    
+    def __init__(self, pool: LotteryPool):
+        self.pool = pool
+        self.user_manager = User()
+        self.draw_count = 0
+        self.reserve_conflicts = 0
+        self.compensations = 0
+    
+    async def _take(self, snapshot: PoolSnapshot, prize: Dict[str, Any], count: int) -> bool:
+        """按 total >= count 条件扣减库存，抽空时通知奖品池"""
+        collection = await self.pool.get_collection()
+        remaining = await collection.find_one_and_update(
+            {"_id": prize["_id"], "total": {"$gte": count}},
+            {"$inc": {"total": -count, "drawn_count": count}},
+            projection={"_id": 0, "total": 1},
+            return_document=True
+        )
+        if remaining is None:
+            return False
+        if remaining.get("total", 0) <= 0:
+            await self.pool.mark_depleted(snapshot, prize["_id"])
+        return True
+    
+    async def reserve(self, snapshot: PoolSnapshot, prize: Dict[str, Any], count: int = 1) -> int:
+        """
+        按库存条件预留最多 count 个普通奖品
+    
+        库存不足 count 时读取当前库存并尝试预留剩余的全部；库存为0时通知奖品池。
+    
+        Returns:
+            int: 实际预留的数量
+        """
+        if prize_counters.shard_count(prize):
+            granted, depleted = await prize_counters.take(await self.pool.get_collection(), prize, count)
+            if granted < count:
+                self.reserve_conflicts += 1
+            if depleted:
+                await self.pool.mark_depleted(snapshot, prize["_id"])
+            return granted
+        if await self._take(snapshot, prize, count):
+            return count
+        self.reserve_conflicts += 1
+        if count > 1:
+            collection = await self.pool.get_collection()
+            current = await collection.find_one({"_id": prize["_id"]}, {"_id": 0, "total": 1})
+            available = min(count - 1, (current or {}).get("total", 0))
+            if available > 0 and await self._take(snapshot, prize, available):
+                return available
+        await self.pool.mark_depleted(snapshot, prize["_id"])
+        return 0
+    
+    async def release(self, snapshot: PoolSnapshot, prize: Dict[str, Any], count: int = 1):
+        """归还预留的库存（扣分失败时的补偿）"""
+        try:
+            collection = await self.pool.get_collection()
+            if prize_counters.shard_count(prize):
+                await prize_counters.add(collection, prize, total=count, drawn=-count)
+            else:
+                await collection.update_one(
+                    {"_id": prize["_id"]},
+                    {"$inc": {"total": count, "drawn_count": -count}}
+                )
+            self.compensations += 1
+            # 预留时刚好抽空的奖品归还后重新有库存
+            if prize["_id"] in snapshot.depleted:
+                await self.pool.invalidate()
+        except Exception as e:
+            logging.error(f"归还奖品库存失败，奖品 {prize['_id']} 库存少计 {count}: {e}")
+    
+    async def release_all(self, snapshot: PoolSnapshot, reserved: Dict[Any, Tuple[Dict[str, Any], int]]):
+        """归还本次请求预留的全部库存"""
+        await asyncio.gather(*(self.release(snapshot, prize, count) for prize, count in reserved.values()))
+    
+    async def record_default_drawn(self, prize: Dict[str, Any], count: int = 1):
+        """累加默认奖品的抽中次数"""
+        collection = await self.pool.get_collection()
+        if prize_counters.shard_count(prize):
+            await prize_counters.add(collection, prize, drawn=count)
+            return
+        await collection.update_one({"_id": prize["_id"]}, {"$inc": {"drawn_count": count}})
+    
+    async def explain_charge_failure(self, stu_id: str, cost: int) -> Dict[str, Any]:
+        """扣分条件更新未命中时，区分用户不存在与积分不足"""
+        collection = await self.user_manager.get_collection()
+        user = await collection.find_one({"stuId": stu_id}, {"_id": 1})
+        if not user:
+            return user_not_found_result()
+        return insufficient_points_result(cost)
+    
+    async def check_points(self, costs: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+        """
+        预留库存前检查 points >= 消耗（一次只读查询）
+    
+        积分明显不足或用户不存在的请求直接失败，不再预留又归还库存，避免与有积分的用户争抢库存。
+        检查之后积分仍可能变化，扣分时的条件更新才是最终判定。
+    
+        Args:
+            costs: {学号: 本次需要的积分}
+    
+        Returns:
+            Dict: {学号: 失败结果}，通过检查的学号不在其中
+        """
+        collection = await self.user_manager.get_collection()
+        points: Dict[str, int] = {}
+        async for user in collection.find({"stuId": {"$in": list(costs)}}, {"_id": 0, "stuId": 1, "points": 1}):
+            points[user["stuId"]] = user.get("points", 0)
+        failures = {}
+        for stu_id, cost in costs.items():
+            if stu_id not in points:
+                failures[stu_id] = user_not_found_result()
+            elif points[stu_id] < cost:
+                failures[stu_id] = insufficient_points_result(cost)
+        return failures
+    
+    async def sample_and_reserve(self, snapshot: PoolSnapshot, count: int) -> Tuple[Optional[List[Dict[str, Any]]], Dict[Any, Tuple[Dict[str, Any], int]], Optional[Dict[str, Any]]]:
+        """
+        抽取 count 个结果并预留其中普通奖品的库存
+    
+        Returns:
+            Tuple: (抽取结果, 已预留的 {奖品ID: (奖品, 数量)}, 失败结果)；失败时已归还预留的库存
+        """
+        outcomes: List[Optional[Dict[str, Any]]] = [None] * count
+        reserved: Dict[Any, Tuple[Dict[str, Any], int]] = {}
+        excluded: Set[Any] = set()
+        pending = list(range(count))
+    
+        for _ in range(RESERVE_ATTEMPTS):
+            wanted: Dict[Any, Tuple[Dict[str, Any], List[int]]] = {}
+            for i in pending:
+                prize = snapshot.draw(exclude=snapshot.depleted | excluded)
+                if prize is None:
+                    await self.release_all(snapshot, reserved)
+                    return None, {}, {"success": False, "status": 400, "reason": "pool_error", "message": "所有奖品库存已空，且没有默认奖品"}
+                outcomes[i] = prize
+                if not prize.get("isDefault", False):
+                    wanted.setdefault(prize["_id"], (prize, []))[1].append(i)
+    
+            pending = []
+            if not wanted:
+                break
+            items = list(wanted.values())
+            results = await asyncio.gather(
+                *(self.reserve(snapshot, prize, len(indexes)) for prize, indexes in items),
+                return_exceptions=True
+            )
+            error = None
+            for (prize, indexes), granted in zip(items, results):
+                if isinstance(granted, BaseException):
+                    error = error or granted
+                    pending.extend(indexes)
+                    continue
+                if granted:
+                    held = reserved.get(prize["_id"], (prize, 0))[1]
+                    reserved[prize["_id"]] = (prize, held + granted)
+                if granted < len(indexes):
+                    # 库存不足的部分在本次请求内排除该奖品后重新抽样
+                    excluded.add(prize["_id"])
+                    pending.extend(indexes[granted:])
+            if error is not None:
+                await self.release_all(snapshot, reserved)
+                raise error
+            if not pending:
+                break
+    
+        if pending:
+            await self.release_all(snapshot, reserved)
+            return None, {}, {"success": False, "status": 409, "reason": "contention", "message": "奖品库存变化频繁，请稍后重试"}
+        return outcomes, reserved, None
+    
+    async def draw_many(self, stu_id: str, cost: int, count: int) -> Dict[str, Any]:
+        """
+        为用户连续抽奖 count 次（消耗校验对整组原子生效：积分不足时一次也不抽）
+    
+        Args:
+            stu_id: 学号
+            cost: 单次抽奖消耗积分
+            count: 抽奖次数
+    
+        Returns:
+            Dict: success 为 True 时包含 prizes（按抽取顺序）与 remainingPoints；
+                  否则包含 status（HTTP 状态码）、reason 与 message
+        """
+        snapshot = await self.pool.get_snapshot()
+        if snapshot.error:
+            logging.error(f"抽奖失败：{snapshot.error}")
+            return {"success": False, "status": 400, "reason": "pool_error", "message": snapshot.error}
+    
+        # 1. 积分预检，通过后抽取并预留库存
+        total_cost = cost * count
+        failure = (await self.check_points({stu_id: total_cost})).get(stu_id)
+        if failure:
+            return failure
+        outcomes, reserved, failure = await self.sample_and_reserve(snapshot, count)
+        if failure:
+            return failure
+    
+        # 2. 条件扣分并一次追加全部记录
+        now = datetime.now()
+        try:
+            collection = await self.user_manager.get_collection()
+            user = await collection.find_one_and_update(
+                {"stuId": stu_id, "points": {"$gte": total_cost}},
+                {
+                    "$inc": {"points": -total_cost},
+                    "$push": {
+                        "prizes": {"$each": [build_prize_record(prize, now) for prize in outcomes]},
+                        "pointHistory": {"$each": [build_draw_history(prize, cost, stu_id, now) for prize in outcomes]}
+                    }
+                },
+                projection={"_id": 0, "points": 1},
+                return_document=True
+            )
+        except Exception:
+            await self.release_all(snapshot, reserved)
+            raise
+    
+        if user is None:
+            await self.release_all(snapshot, reserved)
+            return await self.explain_charge_failure(stu_id, total_cost)
+    
+        defaults = [prize for prize in outcomes if prize.get("isDefault", False)]
+        if defaults:
+            await self.record_default_drawn(defaults[0], len(defaults))
+        self.draw_count += count
+        return {"success": True, "prizes": outcomes, "remainingPoints": user.get("points", 0)}
+    
+    async def draw(self, stu_id: str, cost: int) -> Dict[str, Any]:
+        """
+        为用户执行一次抽奖
+    
+        Returns:
+            Dict: success 为 True 时包含 prize、isDefault、remainingPoints；
+                  否则包含 status（HTTP 状态码）、reason 与 message
+        """
+        result = await self.draw_many(stu_id, cost, 1)
+        if not result["success"]:
+            return result
+        prize = result["prizes"][0]
+        return {"success": True, "prize": prize, "isDefault": prize.get("isDefault", False), "remainingPoints": result["remainingPoints"]}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取抽奖统计信息"""
+        return {
+            "draws": self.draw_count,
+            "reserveConflicts": self.reserve_conflicts,
+            "compensations": self.compensations
+        }
+
+# 全局抽奖服务实例
+lottery_service = LotteryService(lottery_pool)
@@ -3,19 +3,41 @@ import logging
 from datetime import datetime
 from typing import Optional, Dict, List, Any
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from pymongo.errors import DuplicateKeyError
 
 import Core.MongoDB.MongoDB as MongoDB
+from Core.Prize.Counters import prize_counters
 
 class Prize:
+    # 奖品集合索引
+    # - isActive 索引：抽奖时读取可抽奖品
+    # - isDefault 索引：查找默认奖品
+    # - Name 索引：新增/编辑奖品时检查重名
+    # - createdAt / createTime 索引：管理列表按创建时间倒序分页
+    INDEXES = [
+        IndexModel([("isActive", ASCENDING)], name="isActive"),
+        IndexModel([("isDefault", ASCENDING)], name="isDefault"),
+        IndexModel([("Name", ASCENDING)], name="Name"),
+        IndexModel([("createdAt", DESCENDING)], name="createdAt"),
+        IndexModel([("createTime", DESCENDING)], name="createTime")
+    ]
+    
     def __init__(self):
         self.collection_name = "prize"
+        # 已解析的集合句柄及其所属的连接代数，重连后自动重新解析
+        self._collection = None
+        self._collection_generation = -1
     
     async def _get_collection(self):
         """获取奖品集合"""
+        if self._collection is not None and self._collection_generation == MongoDB.mongodb_instance.generation:
+            return self._collection
         try:
             database = await MongoDB.get_mongodb_database()
-            return database[self.collection_name]
+            self._collection = database[self.collection_name]
+            self._collection_generation = MongoDB.mongodb_instance.generation
+            return self._collection
         except Exception as e:
             logging.error(f"获取奖品集合失败: {e}")
             raise
@@ -367,13 +389,15 @@ class Prize:
             ]
             
             result = await collection.aggregate(pipeline).to_list(1)
+            # 分片奖品的库存与抽中数保存在分片计数器中
+            counted = await prize_counters.get_totals(collection)
             
             if result:
                 stats = result[0]
                 return {
-                    "total_drawn": stats.get("total_drawn", 0),
+                    "total_drawn": stats.get("total_drawn", 0) + counted["drawn_count"],
                     "total_redeemed": stats.get("total_redeemed", 0),
-                    "total_prizes": stats.get("total_prizes", 0)
+                    "total_prizes": stats.get("total_prizes", 0) + counted["total"]
                 }
             else:
                 return {
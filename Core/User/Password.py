@@ -0,0 +1,146 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from Core.Common.Config import Config
+
+DEFAULT_LEGACY_SALT = "nisa_salt_2025"
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def legacy_sha256(password: str, salt: str) -> str:
+    """旧版密码哈希：sha256(密码 + 全局盐值)"""
+    return hashlib.sha256((password + salt).encode()).hexdigest()
+
+def compute_password_hash(password: str, params: Dict[str, int], algorithm: str, legacy_salt: str) -> str:
+    """
+    计算密码哈希（CPU密集，在线程池/进程池中执行）
+
+    存储格式:
+        pbkdf2_sha256$<迭代次数>$<盐>$<哈希>
+        scrypt$<n>$<r>$<p>$<盐>$<哈希>
+        64位十六进制：旧版 sha256
+    """
+    if algorithm == "pbkdf2_sha256":
+        salt = os.urandom(16)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params["iterations"])
+        return f"pbkdf2_sha256${params['iterations']}${_b64encode(salt)}${_b64encode(digest)}"
+    if algorithm == "scrypt":
+        salt = os.urandom(16)
+        digest = hashlib.scrypt(
+            password.encode(), salt=salt, n=params["n"], r=params["r"], p=params["p"],
+            maxmem=256 * params["n"] * params["r"] + 1024 * 1024
+        )
+        return f"scrypt${params['n']}${params['r']}${params['p']}${_b64encode(salt)}${_b64encode(digest)}"
+    return legacy_sha256(password, legacy_salt)
+
+def check_password_hash(password: str, stored: str, legacy_salt: str) -> bool:
+    """按存储格式校验密码（CPU密集，在线程池/进程池中执行）"""
+    parts = stored.split("$")
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+        iterations, salt, expected = int(parts[1]), _b64decode(parts[2]), _b64decode(parts[3])
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+        return hmac.compare_digest(digest, expected)
+    if parts[0] == "scrypt" and len(parts) == 6:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        salt, expected = _b64decode(parts[4]), _b64decode(parts[5])
+        digest = hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r + 1024 * 1024
+        )
+        return hmac.compare_digest(digest, expected)
+    return hmac.compare_digest(stored, legacy_sha256(password, legacy_salt))
+
+class PasswordHasher:
+    """
+    密码哈希服务
+
+    在有界线程池（或进程池）中执行 KDF，避免阻塞事件循环；
+    旧版 sha256 密码在登录校验成功后提示调用方按当前参数重新哈希。
+    """
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self.load_config()
+
+    def load_config(self):
+        """从配置文件加载密码哈希参数"""
+        config = Config()
+        self.algorithm = (config.get_value('Password', 'algorithm', 'pbkdf2_sha256') or 'pbkdf2_sha256').strip().lower()
+        if self.algorithm not in ("pbkdf2_sha256", "scrypt", "sha256"):
+            logging.warning(f"未知的密码哈希算法 {self.algorithm}，使用 pbkdf2_sha256")
+            self.algorithm = "pbkdf2_sha256"
+        self.params = {
+            "iterations": config.get_int('Password', 'pbkdf2_iterations', 120000),
+            "n": config.get_int('Password', 'scrypt_n', 16384),
+            "r": config.get_int('Password', 'scrypt_r', 8),
+            "p": config.get_int('Password', 'scrypt_p', 1)
+        }
+        self.workers = config.get_int('Password', 'workers', 4)
+        self.executor_type = (config.get_value('Password', 'executor', 'thread') or 'thread').strip().lower()
+        self.legacy_salt = config.get_value('System', 'salt') or DEFAULT_LEGACY_SALT
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    def shutdown(self):
+        """关闭工作池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def hash_password(self, password: str) -> str:
+        """按当前配置的算法与参数生成密码哈希"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), compute_password_hash,
+            password, self.params, self.algorithm, self.legacy_salt
+        )
+
+    async def verify_password(self, password: str, stored: str) -> Tuple[bool, bool]:
+        """
+        校验密码
+
+        Args:
+            password: 明文密码
+            stored: 数据库中存储的哈希
+
+        Returns:
+            Tuple[bool, bool]: (是否匹配, 是否需要按当前参数重新哈希)
+        """
+        if not stored:
+            return False, False
+        loop = asyncio.get_running_loop()
+        matched = await loop.run_in_executor(
+            self._get_executor(), check_password_hash, password, stored, self.legacy_salt
+        )
+        return matched, matched and self.needs_rehash(stored)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """判断已存储的哈希是否与当前算法和参数不一致"""
+        parts = stored.split("$")
+        if self.algorithm == "pbkdf2_sha256":
+            return not (parts[0] == "pbkdf2_sha256" and len(parts) == 4
+                        and int(parts[1]) == self.params["iterations"])
+        if self.algorithm == "scrypt":
+            return not (parts[0] == "scrypt" and len(parts) == 6
+                        and (int(parts[1]), int(parts[2]), int(parts[3]))
+                        == (self.params["n"], self.params["r"], self.params["p"]))
+        return len(parts) != 1
+
+# 全局密码哈希服务实例
+password_hasher = PasswordHasher()
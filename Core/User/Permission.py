@@ -114,4 +114,84 @@ class Permission:
     @classmethod
     def can_modify_points_custom(cls, user_role: str) -> bool:
         """检查是否可以自定义分发积分（超级管理员权限）"""
-        return user_role == UserRole.SUPER_ADMIN.value
\ No newline at end of file
+        return user_role == UserRole.SUPER_ADMIN.value
+
+# 功能权限位，用于会话中紧凑存储权限
+FEATURE_FLAGS = [
+    "canLottery",
+    "canModifyPoints",
+    "canViewMembers",
+    "canManageMembers",
+    "canManageLevels",
+    "canManagePrizes"
+]
+
+def get_permission_mask(permissions: dict) -> int:
+    """将权限信息中的功能开关压缩为位掩码"""
+    features = permissions.get("features", {})
+    mask = 0
+    for bit, name in enumerate(FEATURE_FLAGS):
+        if features.get(name):
+            mask |= 1 << bit
+    return mask
+
+def build_permissions_from_mask(user_role: str, mask: int) -> dict:
+    """根据角色与位掩码还原权限信息"""
+    permissions = get_user_permissions(user_role, {})
+    permissions["features"] = {name: bool(mask & (1 << bit)) for bit, name in enumerate(FEATURE_FLAGS)}
+    return permissions
+
+def get_user_permissions(user_role: str, user_info: dict) -> dict:
+    """
+    获取用户的具体权限信息
+    
+    Args:
+        user_role: 用户角色
+        user_info: 用户信息字典
+    
+    Returns:
+        dict: 用户权限信息
+    """
+    permissions = {
+        "pages": [],
+        "features": {}
+    }
+    
+    # 基础页面权限
+    if user_role == "user":
+        # 普通成员: 个人信息 + 抽奖 + 关卡查看
+        permissions["pages"] = ["info", "lottery", "levelintroduction", "login", "setpassword"]
+        permissions["features"] = {
+            "canLottery": True,
+            "canModifyPoints": False,
+            "canViewMembers": False,
+            "canManageMembers": False,
+            "canManageLevels": False,
+            "canManagePrizes": False
+        }
+    elif user_role == "admin":
+        # 管理员: 个人信息 + 分发积分
+        permissions["pages"] = ["info", "modifypoints", "login", "setpassword"]
+        permissions["features"] = {
+            "canLottery": False,
+            "canModifyPoints": True,
+            "canViewMembers": False,
+            "canManageMembers": False,
+            "canManageLevels": False,
+            "canManagePrizes": False
+        }
+            
+    elif user_role == "super_admin":
+        # 超级管理员: 个人信息 + 分发积分 + 成员管理 + 关卡管理 + 奖品管理 + 汇总看板
+        permissions["pages"] = ["info", "modifypoints", "membermanagement", "levelmanagement", 
+                               "prizemanagement", "dashboard", "login", "setpassword"]
+        permissions["features"] = {
+            "canLottery": False,
+            "canModifyPoints": True,
+            "canViewMembers": True,
+            "canManageMembers": True,
+            "canManageLevels": True,
+            "canManagePrizes": True
+        }
+    
+    return permissions
@@ -1,22 +1,222 @@
 import asyncio
+import base64
 import hashlib
+import hmac
 import logging
+import re
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import json
 
+from pymongo import ASCENDING, IndexModel
+
 import Core.MongoDB.MongoDB as MongoDB
+from Core.Common.Cache import TTLCache
+from Core.Common.Config import Config
+from Core.User.Permission import get_user_permissions, get_permission_mask, build_permissions_from_mask
+
+SIGNED_TOKEN_PREFIX = "s1."
+
+# 合法token格式：UUID 或 s1.<base64url>.<base64url>，格式不符的token不访问数据库
+UUID_TOKEN_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+SIGNED_TOKEN_PATTERN = re.compile(r"^s1\.[A-Za-z0-9_-]{16,1024}\.[A-Za-z0-9_-]{43}$")
+
+# 签名密钥的最小长度（字节）与不允许使用的示例值
+MIN_TOKEN_SECRET_BYTES = 32
+PLACEHOLDER_TOKEN_SECRETS = {"change_me", "changeme", "change-me", "secret", "your_secret", "token_secret"}
+
+def check_token_secret(name: str, secret: Optional[str]) -> Optional[bytes]:
+    """校验签名密钥，未配置、示例值或过短时返回None（后两种记录错误日志）"""
+    if not secret or not secret.strip():
+        return None
+    secret = secret.strip()
+    if secret.lower() in PLACEHOLDER_TOKEN_SECRETS:
+        logging.error(f"[Session] {name} 仍是示例值，已忽略该密钥，请改为至少 {MIN_TOKEN_SECRET_BYTES} 字节的随机字符串")
+        return None
+    encoded = secret.encode()
+    if len(encoded) < MIN_TOKEN_SECRET_BYTES:
+        logging.error(f"[Session] {name} 长度不足 {MIN_TOKEN_SECRET_BYTES} 字节，已忽略该密钥")
+        return None
+    return encoded
+
+def is_well_formed_token(token: Any) -> bool:
+    """检查token格式是否可能有效"""
+    if not isinstance(token, str):
+        return False
+    if token.startswith(SIGNED_TOKEN_PREFIX):
+        return SIGNED_TOKEN_PATTERN.match(token) is not None
+    return UUID_TOKEN_PATTERN.match(token) is not None
+
+# 解析会话主体时只读取这些字段
+PRINCIPAL_SESSION_PROJECTION = {"_id": 0, "stuId": 1, "principal": 1, "principalVersion": 1}
+PRINCIPAL_USER_PROJECTION = {"_id": 0, "stuId": 1, "role": 1, "name": 1, "principalVersion": 1}
+
+def to_millis(value: datetime) -> int:
+    """本地时间转为毫秒时间戳（签名token的 iat 与会话的 revokedBefore 均按毫秒比较，不足一毫秒的部分舍去）"""
+    return int(value.replace(microsecond=0).timestamp()) * 1000 + value.microsecond // 1000
+
+def from_millis(millis: int) -> datetime:
+    """毫秒时间戳转为本地时间"""
+    return datetime.fromtimestamp(millis // 1000).replace(microsecond=millis % 1000 * 1000)
+
+def build_principal_snapshot(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    """根据用户文档生成存储在会话中的紧凑主体快照"""
+    user_role = user_data.get("role", "user")
+    return {
+        "role": user_role,
+        "perm": get_permission_mask(get_user_permissions(user_role, user_data)),
+        "name": user_data.get("name", "")
+    }
 
 class Session:
+    # 会话集合索引
+    # - token 唯一索引：get_session 按 token 精确查找
+    # - expireTime TTL 索引：由 MongoDB 自动删除过期会话
+    #   （expireTime 以本地时间写入，TTL 监视器按 UTC 解释，东八区部署时实际删除会晚 8 小时，查询本身仍按 expireTime 过滤）
+    # - stuId 唯一索引：create_session 按学号替换会话、吊销用户会话，唯一约束保证并发登录的 upsert 不会产生重复会话
+    # - updateTime 索引：sync_revocations 增量读取变化的会话
+    INDEXES = [
+        IndexModel([("token", ASCENDING)], name="token_unique", unique=True),
+        IndexModel([("expireTime", ASCENDING)], name="expireTime_ttl", expireAfterSeconds=0),
+        IndexModel([("stuId", ASCENDING)], name="stuId_unique", unique=True),
+        IndexModel([("updateTime", ASCENDING)], name="updateTime")
+    ]
+    
     def __init__(self):
         self.collection_name = "session"
+        # 已解析的集合句柄及其所属的连接代数，重连后自动重新解析
+        self._collection = None
+        self._collection_generation = -1
+        self.load_cache_config()
+        self.load_token_config()
+        # stuId -> revokedBefore（毫秒）：签发时间早于该时间的签名token已被吊销，从 session 集合同步
+        self._revocations: Dict[str, int] = {}
+        self._last_revocation_sync: Optional[datetime] = None
+        self._revocation_task: Optional[asyncio.Task] = None
+        self._sweeper_task: Optional[asyncio.Task] = None
+    
+    def load_cache_config(self):
+        """从配置文件加载会话主体缓存参数"""
+        config = Config()
+        cache_size = config.get_int('Session', 'principal_cache_size', 4096)
+        cache_ttl = config.get_float('Session', 'principal_cache_ttl', 30.0)
+        # token -> 用户主体信息（stuId/role/points/permissions）
+        self.principal_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        
+        negative_size = config.get_int('Session', 'negative_cache_size', 10000)
+        negative_ttl = config.get_float('Session', 'negative_cache_ttl', 10.0)
+        # sha256(token) -> True：近期确认无效的token，避免重复查询数据库
+        self.negative_cache = TTLCache(maxsize=negative_size, ttl=negative_ttl)
+        self.rejected_malformed = 0
+        self.rejected_cached = 0
+        self.rejected_lookup = 0
+    
+    def load_token_config(self):
+        """
+        从配置文件加载会话token模式
         
+        token_mode = uuid   随机UUID，每次请求查询session集合（默认）
+        token_mode = signed HMAC签名token，验签即可确认身份，吊销通过同步的吊销表处理
+        """
+        config = Config()
+        self.token_mode = (config.get_value('Session', 'token_mode', 'uuid') or 'uuid').strip().lower()
+        self.token_key_id = (config.get_value('Session', 'token_key_id', 'k1') or 'k1').strip()
+        self.revocation_sync_interval = config.get_float('Session', 'revocation_sync_interval', 5.0)
+        # 过期会话清理间隔（秒），0 表示只依赖 MongoDB TTL 索引
+        self.sweeper_interval = config.get_float('Session', 'sweeper_interval', 0.0)
+        
+        # key id -> 密钥，支持保留上一把密钥用于轮换
+        self._token_keys: Dict[str, bytes] = {}
+        secret = check_token_secret('token_secret', config.get_value('Session', 'token_secret'))
+        if secret:
+            self._token_keys[self.token_key_id] = secret
+        previous_key_id = config.get_value('Session', 'previous_token_key_id')
+        previous_secret = check_token_secret('previous_token_secret', config.get_value('Session', 'previous_token_secret'))
+        if previous_key_id and previous_secret:
+            self._token_keys[previous_key_id.strip()] = previous_secret
+        
+        if self.token_mode == "signed" and self.token_key_id not in self._token_keys:
+            logging.warning("未配置可用的 [Session] token_secret，签名会话已降级为UUID模式")
+            self.token_mode = "uuid"
+    
+    @property
+    def signed_tokens_enabled(self) -> bool:
+        """是否签发签名token"""
+        return self.token_mode == "signed"
+    
+    @staticmethod
+    def _b64encode(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+    
+    @staticmethod
+    def _b64decode(data: str) -> bytes:
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    
+    def _sign(self, key_id: str, payload: str) -> str:
+        digest = hmac.new(self._token_keys[key_id], payload.encode("ascii"), hashlib.sha256).digest()
+        return self._b64encode(digest)
+    
+    def _issue_signed_token(self, stu_id: str, role: str, name: str, issued_at: datetime, expire_time: datetime, jti: str) -> str:
+        """签发签名token：s1.<payload>.<signature>，iat 为毫秒时间戳"""
+        payload = {
+            "sub": stu_id,
+            "role": role,
+            "name": name,
+            "iat": to_millis(issued_at),
+            "exp": int(expire_time.timestamp()),
+            "kid": self.token_key_id,
+            "jti": jti
+        }
+        encoded = self._b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        return f"{SIGNED_TOKEN_PREFIX}{encoded}.{self._sign(self.token_key_id, encoded)}"
+    
+    def _verify_signed_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """验证签名token，校验签名、过期时间与吊销表，通过时返回载荷"""
+        try:
+            encoded, signature = token[len(SIGNED_TOKEN_PREFIX):].split(".", 1)
+            payload = json.loads(self._b64decode(encoded))
+            key_id = payload.get("kid")
+            if key_id not in self._token_keys:
+                return None
+            if not hmac.compare_digest(signature, self._sign(key_id, encoded)):
+                return None
+            if payload.get("exp", 0) <= time.time():
+                return None
+            
+            # 只按吊销时间判断：其他进程新签发的token在同步前也能通过，早于吊销时间签发的token一律拒绝
+            revoked_before = self._revocations.get(payload.get("sub"))
+            if revoked_before is not None and payload.get("iat", 0) < revoked_before:
+                return None
+            return payload
+        except Exception:
+            return None
+        
+    def _revocation_time(self, stu_id: str) -> datetime:
+        """
+        登出、吊销时写入的 revokedBefore
+        
+        取当前毫秒的下一毫秒，且晚于本进程已知的吊销时间（登录时签发时间可能被推迟到该时间），
+        保证此刻之前签发的token全部失效。
+        """
+        now = datetime.now()
+        millis = to_millis(now) + 1
+        return from_millis(max(millis, self._revocations.get(stu_id, 0) + 1))
+    
+    def _revoke_before(self, stu_id: str, millis: int):
+        """记录吊销时间（只前移不后退，同步读到的旧值不会覆盖更新的吊销）"""
+        self._revocations[stu_id] = max(self._revocations.get(stu_id, 0), millis)
+    
     async def _get_collection(self):
         """获取会话集合"""
+        if self._collection is not None and self._collection_generation == MongoDB.mongodb_instance.generation:
+            return self._collection
         try:
             database = await MongoDB.get_mongodb_database()
-            return database[self.collection_name]
+            self._collection = database[self.collection_name]
+            self._collection_generation = MongoDB.mongodb_instance.generation
+            return self._collection
         except Exception as e:
             logging.error(f"获取会话集合失败: {e}")
             raise
@@ -35,41 +235,65 @@ class Session:
         try:
             collection = await self._get_collection()
             
-            # 生成会话token
-            token = str(uuid.uuid4())
+            stu_id = user_data.get("stuId")
+            role = user_data.get("role", "user")
             
-            # 计算过期时间
-            expire_time = datetime.now() + timedelta(hours=expire_hours)
+            # 计算过期时间（签发时间截断到毫秒，与 MongoDB 中保存的 revokedBefore 精度一致）
+            now = datetime.now()
+            now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+            # 不早于本进程已知的吊销时间：登出后在同一毫秒内重新登录时，新token不会被判为已吊销
+            revoked_before = self._revocations.get(stu_id)
+            if revoked_before is not None and to_millis(now) < revoked_before:
+                now = from_millis(revoked_before)
+            expire_time = now + timedelta(hours=expire_hours)
+            
+            # 生成会话token
+            jti = uuid.uuid4().hex
+            if self.signed_tokens_enabled:
+                token = self._issue_signed_token(stu_id, role, user_data.get("name", ""), now, expire_time, jti)
+            else:
+                token = str(uuid.uuid4())
             
             session_data = {
                 "token": token,
+                "jti": jti,
                 "userId": user_data.get("_id"),
-                "stuId": user_data.get("stuId"),
-                "role": user_data.get("role", "user"),
-                "createTime": datetime.now(),
+                "stuId": stu_id,
+                "role": role,
+                "principal": build_principal_snapshot(user_data),
+                "principalVersion": user_data.get("principalVersion", 0),
+                "createTime": now,
+                "updateTime": now,
                 "expireTime": expire_time,
+                # 一个学号只保留一个会话：本次登录之前签发的token全部失效
+                "revokedBefore": now,
                 "active": True
             }
             
-            # 先删除该用户的旧会话
-            await collection.delete_many({"stuId": user_data.get("stuId")})
+            # 以学号为键替换旧会话（不存在则插入），一次往返完成
+            await collection.replace_one({"stuId": stu_id}, session_data, upsert=True)
             
-            # 创建新会话
-            await collection.insert_one(session_data)
+            # 旧的签名token在本进程立即失效，其他进程由吊销表同步
+            self._revoke_before(stu_id, to_millis(now))
+            self.invalidate_user(stu_id)
             
-            logging.info(f"会话创建成功，用户: {user_data.get('stuId')}, token: {token}")
+            logging.info(f"会话创建成功，用户: {stu_id}, token: {token[:10]}...")
             return token
             
         except Exception as e:
             logging.error(f"创建会话时发生错误: {e}")
             return ""
     
-    async def get_session(self, token: str) -> Optional[Dict[str, Any]]:
-        """根据token获取会话信息"""
+    async def get_session(self, token: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        根据token获取会话信息，可指定投影只读取部分字段
+        
+        未找到有效会话时返回None；数据库错误记录日志后向上抛出，调用方不能把它当作“token无效”。
+        """
         try:
             # 确保token是字符串类型，而不是Cookie对象
             if not isinstance(token, str) or not token:
-                logging.warning(f"Invalid token provided: {type(token)}, value: {token}")
+                logging.debug(f"Invalid token provided: {type(token)}")
                 return None
                 
             collection = await self._get_collection()
@@ -80,28 +304,36 @@ class Session:
                 "token": token,
                 "active": True,
                 "expireTime": {"$gt": datetime.now()}
-            })
+            }, projection)
             
             if session:
-                session['_id'] = str(session['_id'])
+                if '_id' in session:
+                    session['_id'] = str(session['_id'])
                 logging.info(f"✅ 找到有效会话: 用户={session.get('stuId')}, 角色={session.get('role')}")
                 return session
             else:
-                logging.warning(f"❌ 未找到有效会话或会话已过期: {token[:10]}...")
+                logging.debug(f"❌ 未找到有效会话或会话已过期: {token[:10]}...")
                 return None
             
         except Exception as e:
             logging.error(f"获取会话时发生错误: {e}")
-            return None
+            raise
     
     async def delete_session(self, token: str) -> bool:
         """删除会话（登出）"""
+        self.principal_cache.pop(token)
+        revoked_before = datetime.now()
+        if isinstance(token, str) and token.startswith(SIGNED_TOKEN_PREFIX):
+            payload = self._verify_signed_token(token)
+            if payload:
+                revoked_before = self._revocation_time(payload["sub"])
+                self._revoke_before(payload["sub"], to_millis(revoked_before))
         try:
             collection = await self._get_collection()
             
             result = await collection.update_one(
                 {"token": token},
-                {"$set": {"active": False}}
+                {"$set": {"active": False, "revokedBefore": revoked_before, "updateTime": datetime.now()}}
             )
             
             return result.matched_count > 0
@@ -110,42 +342,235 @@ class Session:
             logging.error(f"删除会话时发生错误: {e}")
             return False
     
-    async def get_user_by_session(self, token: str) -> Optional[Dict[str, Any]]:
-        """根据session token获取用户信息"""
+    async def revoke_user_sessions(self, stu_id: str) -> int:
+        """
+        吊销指定用户的全部会话（角色降级、密码重置、删除成员时使用）
+        
+        Args:
+            stu_id: 用户学号
+            
+        Returns:
+            int: 被吊销的会话数量
+        """
+        if not stu_id:
+            return 0
+        self.invalidate_user(stu_id)
+        revoked_before = self._revocation_time(stu_id)
+        self._revoke_before(stu_id, to_millis(revoked_before))
         try:
-            session = await self.get_session(token)
-            if session:
-                # 从数据库获取最新的用户信息
-                from Core.User.User import User
-                user_manager = User()
-                user_collection = await user_manager.get_collection()
-                user_data = await user_collection.find_one({"stuId": session["stuId"]})
-                
-                if user_data:
-                    # 导入权限生成函数
-                    import sys
-                    import os
-                    
-                    # 添加项目根目录到路径
-                    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-                    if project_root not in sys.path:
-                        sys.path.append(project_root)
-                    
-                    from app import get_user_permissions
-                    
-                    user_role = user_data.get("role", "user")
-                    permissions = get_user_permissions(user_role, user_data)
-                    
-                    return {
-                        "stuId": user_data["stuId"],
-                        "role": user_role,
-                        "points": user_data.get("points", 0),
-                        "permissions": permissions
-                    }
+            collection = await self._get_collection()
+            result = await collection.update_many(
+                {"stuId": stu_id, "active": True},
+                {"$set": {"active": False, "revokedBefore": revoked_before, "updateTime": datetime.now()}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logging.error(f"吊销用户会话时发生错误: {e}")
+            return 0
+    
+    async def sync_revocations(self):
+        """
+        从 session 集合增量同步各学号的吊销时间（revokedBefore）到本进程吊销表
+        
+        首次同步加载全部未过期会话，之后只读取 updateTime 变化的记录。
+        登录、登出与吊销都会写入 revokedBefore，同步前其他进程仍接受该时间之前签发的旧token。
+        签发时间与吊销时间来自各进程的本地时钟，多台主机部署时需保持时钟同步。
+        """
+        try:
+            collection = await self._get_collection()
+            now = datetime.now()
+            query: Dict[str, Any] = {"expireTime": {"$gt": now}}
+            if self._last_revocation_sync is not None:
+                # 回退少许时间，容忍多进程之间的时钟与写入延迟
+                query["updateTime"] = {"$gte": self._last_revocation_sync - timedelta(seconds=2)}
+            
+            cursor = collection.find(query, {"_id": 0, "stuId": 1, "revokedBefore": 1, "updateTime": 1})
+            async for session in cursor.sort("updateTime", 1):
+                if session.get("revokedBefore") is not None:
+                    self._revoke_before(session["stuId"], to_millis(session["revokedBefore"]))
+            self._last_revocation_sync = now
+        except Exception as e:
+            logging.error(f"同步会话吊销表时发生错误: {e}")
+    
+    async def _revocation_sync_loop(self):
+        """后台定期同步吊销表"""
+        while True:
+            await self.sync_revocations()
+            await asyncio.sleep(self.revocation_sync_interval)
+    
+    async def start_revocation_sync(self):
+        """启动吊销表后台同步（仅签名token模式）"""
+        if not self.signed_tokens_enabled or self._revocation_task is not None:
+            return
+        await self.sync_revocations()
+        self._revocation_task = asyncio.create_task(self._revocation_sync_loop())
+        logging.info(f"会话吊销表同步已启动，间隔 {self.revocation_sync_interval} 秒")
+    
+    async def stop_revocation_sync(self):
+        """停止吊销表后台同步"""
+        if self._revocation_task is not None:
+            self._revocation_task.cancel()
+            try:
+                await self._revocation_task
+            except asyncio.CancelledError:
+                pass
+            self._revocation_task = None
+    
+    async def get_user_by_session(self, token: str) -> Optional[Dict[str, Any]]:
+        """根据session token获取用户信息（优先读取进程内缓存）"""
+        if not isinstance(token, str) or not token:
+            return None
+        
+        # 格式不合法的token直接拒绝
+        if not is_well_formed_token(token):
+            self.rejected_malformed += 1
             return None
+        
+        # 签名token：验签与吊销表检查均在内存中完成，无需访问数据库
+        if token.startswith(SIGNED_TOKEN_PREFIX):
+            payload = self._verify_signed_token(token)
+            if not payload:
+                self.rejected_lookup += 1
+                return None
+            user_role = payload.get("role", "user")
+            return {
+                "stuId": payload["sub"],
+                "role": user_role,
+                "name": payload.get("name", ""),
+                "permissions": get_user_permissions(user_role, payload)
+            }
+        
+        cached = self.principal_cache.get(token)
+        if cached is not None:
+            # 返回副本，避免调用方修改缓存内容
+            return dict(cached)
+        
+        token_hash = hashlib.sha256(token.encode()).digest()
+        if self.negative_cache.get(token_hash):
+            self.rejected_cached += 1
+            return None
+        
+        try:
+            session = await self.get_session(token, PRINCIPAL_SESSION_PROJECTION)
+            if not session:
+                # 只缓存确认不存在的token；数据库出错时 get_session 抛出异常，不会写入负缓存
+                self.negative_cache.set(token_hash, True)
+                self.rejected_lookup += 1
+                return None
+            
+            snapshot = session.get("principal")
+            if not snapshot:
+                # 旧会话或快照已失效：从用户文档重建快照并写回
+                snapshot = await self._rebuild_principal_snapshot(token, session["stuId"])
+                if not snapshot:
+                    return None
+            
+            user_role = snapshot.get("role", "user")
+            principal = {
+                "stuId": session["stuId"],
+                "role": user_role,
+                "name": snapshot.get("name", ""),
+                "permissions": build_permissions_from_mask(user_role, snapshot.get("perm", 0))
+            }
+            self.principal_cache.set(token, principal)
+            return dict(principal)
         except Exception as e:
             logging.error(f"根据会话获取用户信息时发生错误: {e}")
             return None
+    
+    async def _rebuild_principal_snapshot(self, token: str, stu_id: str) -> Optional[Dict[str, Any]]:
+        """从用户文档重建主体快照，仅当版本未被并发更新时写回会话"""
+        from Core.User.User import User
+        user_collection = await User().get_collection()
+        user_data = await user_collection.find_one({"stuId": stu_id}, PRINCIPAL_USER_PROJECTION)
+        if not user_data:
+            return None
+        
+        snapshot = build_principal_snapshot(user_data)
+        version = user_data.get("principalVersion", 0)
+        collection = await self._get_collection()
+        await collection.update_one(
+            {"token": token, "principalVersion": {"$in": [version, None]}},
+            {"$set": {"principal": snapshot, "principalVersion": version}}
+        )
+        return snapshot
+    
+    async def refresh_user_principal(self, stu_id: str) -> bool:
+        """
+        使指定用户的会话主体快照失效
+        
+        递增用户文档的 principalVersion，并清除其会话中的快照，
+        下一次请求会按新版本重建。用于成员信息或管理员权限变更后。
+        
+        Args:
+            stu_id: 用户学号
+            
+        Returns:
+            bool: 用户存在且处理成功返回True
+        """
+        if not stu_id:
+            return False
+        self.invalidate_user(stu_id)
+        try:
+            from Core.User.User import User
+            from pymongo import ReturnDocument
+            user_collection = await User().get_collection()
+            user_data = await user_collection.find_one_and_update(
+                {"stuId": stu_id},
+                {"$inc": {"principalVersion": 1}},
+                projection={"_id": 0, "principalVersion": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if not user_data:
+                return False
+            
+            collection = await self._get_collection()
+            await collection.update_many(
+                {"stuId": stu_id},
+                {
+                    "$set": {"principalVersion": user_data["principalVersion"]},
+                    "$unset": {"principal": ""}
+                }
+            )
+            return True
+        except Exception as e:
+            logging.error(f"刷新会话主体快照时发生错误: {e}")
+            return False
+    
+    def invalidate_user(self, stu_id: str) -> int:
+        """
+        失效指定用户的全部缓存主体
+        
+        在角色、积分、密码等变更后调用，使下一次请求重新从数据库加载
+        
+        Args:
+            stu_id: 用户学号
+            
+        Returns:
+            int: 失效的缓存条目数量
+        """
+        if not stu_id:
+            return 0
+        return self.principal_cache.pop_where(lambda _, principal: principal.get("stuId") == stu_id)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取会话主体缓存的命中统计"""
+        return self.principal_cache.stats()
+    
+    def get_token_stats(self) -> Dict[str, Any]:
+        """获取会话token模式、吊销表与无效token拒绝统计"""
+        return {
+            "mode": self.token_mode,
+            "keyId": self.token_key_id if self.signed_tokens_enabled else None,
+            "revocationEntries": len(self._revocations),
+            "lastRevocationSync": self._last_revocation_sync,
+            "rejected": {
+                "malformed": self.rejected_malformed,
+                "negativeCache": self.rejected_cached,
+                "lookup": self.rejected_lookup
+            },
+            "negativeCache": self.negative_cache.stats()
+        }
 
     async def clean_expired_sessions(self):
         """清理过期会话"""
@@ -160,6 +585,29 @@ class Session:
             
         except Exception as e:
             logging.error(f"清理过期会话时发生错误: {e}")
+    
+    async def _sweeper_loop(self):
+        """后台定期清理过期会话"""
+        while True:
+            await asyncio.sleep(self.sweeper_interval)
+            await self.clean_expired_sessions()
+    
+    async def start_sweeper(self):
+        """启动过期会话后台清理（用于无法使用TTL监视器的部署）"""
+        if self.sweeper_interval <= 0 or self._sweeper_task is not None:
+            return
+        self._sweeper_task = asyncio.create_task(self._sweeper_loop())
+        logging.info(f"过期会话清理任务已启动，间隔 {self.sweeper_interval} 秒")
+    
+    async def stop_sweeper(self):
+        """停止过期会话后台清理"""
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            try:
+                await self._sweeper_task
+            except asyncio.CancelledError:
+                pass
+            self._sweeper_task = None
 
 # 全局会话管理器实例
 session_manager = Session()
\ No newline at end of file
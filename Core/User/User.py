@@ -1,19 +1,57 @@
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from pymongo.errors import DuplicateKeyError
 
 import Core.MongoDB.MongoDB as MongoDB
 
+# 登录校验只需要的字段，避免读取 levelProgress 等大字段
+CREDENTIAL_PROJECTION = {
+    "_id": 0,
+    "stuId": 1,
+    "password": 1,
+    "role": 1,
+    "points": 1,
+    "name": 1,
+    "principalVersion": 1
+}
+
+def find_history_record(point_history: List[Dict[str, Any]], record_id: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """在积分历史中查找记录，返回 (下标, 记录)，未找到返回 (-1, None)"""
+    for i, record in enumerate(point_history):
+        if record.get("recordId") == record_id:
+            return i, record
+    return -1, None
+
 class User:
+    # 用户集合索引
+    # - stuId 唯一索引：登录、积分、抽奖等按学号精确查找
+    # - completedLevels 多键索引：关卡参与人数统计与参与者列表
+    # - role 索引：成员列表按角色过滤、管理员列表、用户总数统计
+    # - creatTime 索引：成员分页按创建时间倒序
+    INDEXES = [
+        IndexModel([("stuId", ASCENDING)], name="stuId_unique", unique=True),
+        IndexModel([("completedLevels", ASCENDING)], name="completedLevels"),
+        IndexModel([("role", ASCENDING)], name="role"),
+        IndexModel([("creatTime", DESCENDING)], name="creatTime")
+    ]
+    
     def __init__(self):
         self.collection_name = "user"
+        # 已解析的集合句柄及其所属的连接代数，重连后自动重新解析
+        self._collection = None
+        self._collection_generation = -1
     
     async def _get_collection(self):
         """获取用户集合（私有方法）"""
+        if self._collection is not None and self._collection_generation == MongoDB.mongodb_instance.generation:
+            return self._collection
         try:
             database = await MongoDB.get_mongodb_database()
-            return database[self.collection_name]
+            self._collection = database[self.collection_name]
+            self._collection_generation = MongoDB.mongodb_instance.generation
+            return self._collection
         except Exception as e:
             logging.error(f"获取用户集合失败: {e}")
             raise
@@ -60,6 +98,23 @@ class User:
             logging.error(f"用户创建时发生错误: {e}")
             return None
     
+    async def get_user_credentials(self, stu_id: str) -> Optional[Dict[str, Any]]:
+        """
+        按学号读取登录校验所需的字段（投影查询）
+        
+        Args:
+            stu_id: 学号
+            
+        Returns:
+            Dict: 凭据字段字典，未找到返回None
+        """
+        try:
+            collection = await self._get_collection()
+            return await collection.find_one({"stuId": stu_id}, CREDENTIAL_PROJECTION)
+        except Exception as e:
+            logging.error(f"读取用户凭据时发生错误: {e}")
+            return None
+    
     async def get_user_by_field(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
         """
         根据指定字段获取用户信息
@@ -273,14 +328,7 @@ class User:
             
             # 在用户的积分历史中查找该记录
             point_history = user.get("pointHistory", [])
-            target_record = None
-            record_index = -1
-            
-            for i, record in enumerate(point_history):
-                if record.get("recordId") == record_id:
-                    target_record = record
-                    record_index = i
-                    break
+            record_index, target_record = find_history_record(point_history, record_id)
             
             if not target_record:
                 return {"success": False, "message": "操作记录不存在"}
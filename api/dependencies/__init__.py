@@ -2,6 +2,7 @@
 依赖项初始化文件
 """
 from .auth import require_auth, require_super_admin, get_current_user_optional, require_auth_redirect, require_super_admin_redirect, require_admin_redirect, require_admin
+from .admission import auth_admission, auth_admission_controller
 
 __all__ = [
     "require_auth",
@@ -10,5 +11,7 @@ __all__ = [
     "require_auth_redirect",
     "require_super_admin_redirect",
     "require_admin_redirect",
-    "require_admin"
+    "require_admin",
+    "auth_admission",
+    "auth_admission_controller"
 ]
\ No newline at end of file
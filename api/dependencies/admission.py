@@ -0,0 +1,125 @@
+"""
+准入控制依赖模块
+在登录/注册高峰期限制并发，超出排队上限时快速返回503
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+from fastapi import HTTPException
+
+from Core.Common.Config import Config
+
+class AdmissionController:
+    """
+    并发准入控制器
+    
+    - 同时执行的请求数不超过 concurrency
+    - 等待中的请求数不超过 queue_size，超出立即拒绝
+    - 排队超过 queue_timeout 秒仍未获得执行槽位则拒绝
+    """
+    
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float, retry_after: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(concurrency) if concurrency > 0 else None
+        
+        # 统计指标
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    @property
+    def enabled(self) -> bool:
+        return self._semaphore is not None
+    
+    def _reject(self, reason: str):
+        logging.warning(f"准入控制[{self.name}]拒绝请求: {reason}")
+        raise HTTPException(
+            status_code=503,
+            detail="当前访问人数过多，请稍后重试",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+    
+    async def acquire(self):
+        """获取执行槽位，失败时抛出503"""
+        if not self.enabled:
+            return
+        
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.queue_size:
+                self.rejected_queue_full += 1
+                self._reject(f"排队已满({self.waiting})")
+            
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                self._reject(f"排队超时({self.queue_timeout}秒)")
+            finally:
+                self.waiting -= 1
+                waited = time.perf_counter() - start
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+        
+        self.in_flight += 1
+        self.admitted += 1
+    
+    def release(self):
+        """释放执行槽位"""
+        if not self.enabled:
+            return
+        self.in_flight -= 1
+        self._semaphore.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取准入控制统计信息"""
+        return {
+            "enabled": self.enabled,
+            "concurrency": self.concurrency,
+            "queueSize": self.queue_size,
+            "inFlight": self.in_flight,
+            "queueDepth": self.waiting,
+            "maxQueueDepth": self.max_waiting,
+            "admitted": self.admitted,
+            "rejectedQueueFull": self.rejected_queue_full,
+            "rejectedTimeout": self.rejected_timeout,
+            "avgWaitMs": round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "maxWaitMs": round(self.max_wait * 1000, 2)
+        }
+
+def _load_auth_controller() -> AdmissionController:
+    """从配置文件加载登录/注册准入参数"""
+    config = Config()
+    return AdmissionController(
+        name="auth",
+        concurrency=config.get_int('Admission', 'auth_concurrency', 32),
+        queue_size=config.get_int('Admission', 'auth_queue_size', 256),
+        queue_timeout=config.get_float('Admission', 'auth_queue_timeout', 5.0),
+        retry_after=config.get_int('Admission', 'retry_after', 2)
+    )
+
+# 登录/注册共用的准入控制器
+auth_admission_controller = _load_auth_controller()
+
+async def auth_admission():
+    """登录/注册接口的准入控制依赖"""
+    await auth_admission_controller.acquire()
+    try:
+        yield
+    finally:
+        auth_admission_controller.release()
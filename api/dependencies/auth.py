@@ -109,15 +109,15 @@ async def get_current_user_optional(session_token: Optional[str] = Cookie(None))
     logger = logging.getLogger(__name__)
     
     if not session_token:
-        logger.info("🔍 没有找到session_token cookie")
+        logger.debug("🔍 没有找到session_token cookie")
         return None
     
-    logger.info(f"🔍 检查session_token: {session_token[:10]}...")
+    logger.debug(f"🔍 检查session_token: {session_token[:10]}...")
     
     user_info = await session_manager.get_user_by_session(session_token)
     if user_info:
-        logger.info(f"✅ 用户验证成功: {user_info.get('stuId')} ({user_info.get('role')})")
+        logger.debug(f"✅ 用户验证成功: {user_info.get('stuId')} ({user_info.get('role')})")
     else:
-        logger.warning(f"❌ 用户验证失败: session_token={session_token[:10]}...")
+        logger.debug(f"❌ 用户验证失败: session_token={session_token[:10]}...")
     
     return user_info
\ No newline at end of file
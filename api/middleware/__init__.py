@@ -0,0 +1,12 @@
+"""
+中间件模块
+"""
+from .db_accounting import DbAccountingMiddleware
+from .metrics import MetricsMiddleware
+from .request_id import RequestIdMiddleware
+
+__all__ = [
+    "DbAccountingMiddleware",
+    "MetricsMiddleware",
+    "RequestIdMiddleware"
+]
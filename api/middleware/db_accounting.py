@@ -0,0 +1,52 @@
+"""
+请求级数据库访问统计中间件
+记录每个请求发出的 MongoDB 命令数与耗时，按路由汇总；调试模式下通过响应头输出
+"""
+import time
+
+from Core.MongoDB.Monitoring import RequestDbStats, current_request_db, route_db_stats
+
+class DbAccountingMiddleware:
+    """
+    ASGI 中间件
+    
+    - 为每个 HTTP 请求设置 current_request_db，命令监听器把命令计入该请求
+    - 请求结束后按路由模板（如 /api/admin/levels/{level_id}）汇总
+    - expose_headers 为 True 时添加 Server-Timing 与 X-DB-Ops 响应头
+    """
+    
+    def __init__(self, app, expose_headers: bool = False):
+        self.app = app
+        self.expose_headers = expose_headers
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        stats = RequestDbStats()
+        token = current_request_db.set(stats)
+        start = time.perf_counter()
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                db_ms = stats.total * 1000
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={db_ms:.2f};desc="{stats.ops} ops", '
+                    f'db-slowest;dur={stats.slowest * 1000:.2f};desc="{stats.slowest_command}", '
+                    f'app;dur={total_ms:.2f}'.encode()
+                ))
+                headers.append((b"x-db-ops", str(stats.ops).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_headers if self.expose_headers else send)
+        finally:
+            current_request_db.reset(token)
+            # 路由匹配后 Starlette 会在 scope 中记录命中的路由
+            route = scope.get("route")
+            route_db_stats.record(getattr(route, "path", None) or "<unmatched>", stats)
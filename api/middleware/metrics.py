@@ -0,0 +1,42 @@
+"""
+请求指标中间件
+按路由模板记录请求数、状态码、处理中请求数与耗时直方图
+"""
+import time
+
+from Core.Common.Metrics import http_requests_total, http_requests_in_flight, http_request_duration_seconds
+
+class MetricsMiddleware:
+    """
+    ASGI 中间件
+    
+    标签使用路由模板（如 /api/user/prizes/{stu_id}）而不是原始路径，
+    未匹配任何路由的请求统一计入 <unmatched>，避免时间序列数量随路径无限增长。
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope["method"]
+            http_requests_total.inc(route, method, str(status))
+            http_request_duration_seconds.observe(route, method, value=time.perf_counter() - start)
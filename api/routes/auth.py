@@ -2,7 +2,6 @@
 认证相关路由
 包含登录、设置密码等功能
 """
-import hashlib
 import logging
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Request, Depends, Response
@@ -12,7 +11,8 @@ from pydantic import BaseModel
 
 from Core.User.User import User
 from Core.User.Session import session_manager
-from api.dependencies import get_current_user_optional, require_auth
+from Core.User.Password import password_hasher
+from api.dependencies import get_current_user_optional, require_auth, auth_admission
 from Core.Common.Config import Config
 
 logger = logging.getLogger(__name__)
@@ -37,16 +37,7 @@ class RegisterRequest(BaseModel):
     email: str = None
     phone: str = None
 
-def hash_password(password: str, salt: str = None) -> str:
-    """密码加盐哈希"""
-    if salt is None:
-        try:
-            salt = config.get_value('System', 'salt')
-        except:
-            salt = "nisa_salt_2025"  # 默认盐值
-    return hashlib.sha256((password + salt).encode()).hexdigest()
-
-@router.post("/api/register")
+@router.post("/api/register", dependencies=[Depends(auth_admission)])
 async def api_register(register_data: RegisterRequest):
     """用户注册API"""
     try:
@@ -66,7 +57,7 @@ async def api_register(register_data: RegisterRequest):
             raise HTTPException(status_code=400, detail="密码不能与学号相同")
         
         # 加密密码
-        hashed_password = hash_password(register_data.password)
+        hashed_password = await password_hasher.hash_password(register_data.password)
         
         # 构建用户数据
         user_data = {
@@ -108,7 +99,7 @@ async def api_register(register_data: RegisterRequest):
         logger.error(f"注册错误: {e}")
         raise HTTPException(status_code=500, detail="注册失败")
 
-@router.post("/api/login")
+@router.post("/api/login", dependencies=[Depends(auth_admission)])
 async def api_login(login_data: LoginRequest):
     """用户登录API"""
     try:
@@ -206,8 +197,7 @@ async def api_set_password(request: SetPasswordRequest, current_user: dict = Dep
         # 从session中获取当前用户信息，确保安全性
         stu_id = current_user["stuId"]
         
-        # 验证旧密码（检查是否为默认密码）
-        old_password_hash = hash_password(stu_id)  # 默认密码是学号
+        # 验证旧密码（检查是否为默认密码，默认密码是学号）
         user_info = await verify_user_credentials(stu_id, stu_id)
         if not user_info:
             raise HTTPException(status_code=401, detail="身份验证失败")
@@ -221,7 +211,7 @@ async def api_set_password(request: SetPasswordRequest, current_user: dict = Dep
             raise HTTPException(status_code=400, detail="新密码长度至少为6位")
         
         # 更新密码
-        new_password_hash = hash_password(request.newPassword)
+        new_password_hash = await password_hasher.hash_password(request.newPassword)
         collection = await user_manager.get_collection()
         result = await collection.update_one(
             {"stuId": stu_id},
@@ -231,6 +221,8 @@ async def api_set_password(request: SetPasswordRequest, current_user: dict = Dep
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="用户不存在")
         
+        session_manager.invalidate_user(stu_id)
+        
         return {"message": "密码设置成功"}
         
     except HTTPException:
@@ -258,22 +250,32 @@ async def api_logout(request: Request, current_user: Optional[dict] = Depends(ge
 async def verify_user_credentials(stu_id: str, password: str) -> Optional[dict]:
     """验证用户凭据"""
     try:
-        # 获取用户信息
-        collection = await user_manager.get_collection()
-        user = await collection.find_one({"stuId": stu_id})
+        # 只读取校验所需字段
+        user = await user_manager.get_user_credentials(stu_id)
         if not user:
             return None
         
         # 验证密码
         stored_password = user.get("password", "")
-        input_password_hash = hash_password(password)
+        matched, needs_rehash = await password_hasher.verify_password(password, stored_password)
+        
+        # 旧格式或旧参数的哈希在验证成功后按当前参数重新哈希
+        if needs_rehash:
+            new_hash = await password_hasher.hash_password(password)
+            collection = await user_manager.get_collection()
+            await collection.update_one(
+                {"stuId": stu_id, "password": stored_password},
+                {"$set": {"password": new_hash}}
+            )
         
         # 如果密码为空或者哈希匹配，则验证成功
-        if not stored_password or stored_password == input_password_hash:
+        if not stored_password or matched:
             return {
                 "stuId": user["stuId"],
                 "role": user.get("role", "user"),
-                "points": user.get("points", 0)
+                "points": user.get("points", 0),
+                "name": user.get("name", ""),
+                "principalVersion": user.get("principalVersion", 0)
             }
         
         return None
@@ -10,6 +10,7 @@ from bson import ObjectId
 from Core.User.User import User
 from Core.Level.Level import Level
 from Core.Prize.Prize import Prize
+from Core.Prize.Counters import prize_counters
 from api.dependencies import require_super_admin
 
 logger = logging.getLogger(__name__)
@@ -103,7 +104,7 @@ async def get_prize_draw_stats(current_user: dict = Depends(require_super_admin)
         collection = await prize_manager.get_collection()
         
         # 获取所有奖品及其抽中数量
-        prizes = await collection.find({}).to_list(None)
+        prizes = await prize_counters.overlay(await collection.find({}).to_list(None))
         
         prize_stats = []
         
@@ -215,6 +216,8 @@ async def get_dashboard_overview(current_user: dict = Depends(require_super_admi
         ]
         drawn_result = await prize_collection.aggregate(pipeline).to_list(1)
         total_drawn = drawn_result[0]["totalDrawn"] if drawn_result else 0
+        # 分片奖品的抽中数保存在分片计数器中
+        total_drawn += (await prize_counters.get_totals(prize_collection))["drawn_count"]
         
         return {
             "totalUsers": total_users,
@@ -12,6 +12,8 @@ from bson import ObjectId
 
 from Core.User.User import User
 from Core.Level.Level import Level
+from Core.User.Session import session_manager
+from Core.User.Password import password_hasher
 from api.dependencies import require_super_admin
 
 logger = logging.getLogger(__name__)
@@ -127,13 +129,12 @@ async def create_member(member_data: dict, current_user: dict = Depends(require_
             raise HTTPException(status_code=400, detail="学号已存在")
         
         # 处理密码设置
-        from api.routes.auth import hash_password
         if member_data.get("password"):
             # 如果提供了密码，则进行哈希处理
-            password_hash = hash_password(member_data["password"])
+            password_hash = await password_hasher.hash_password(member_data["password"])
         else:
             # 如果没有提供密码，默认密码为学号
-            password_hash = hash_password(member_data["stuId"])
+            password_hash = await password_hasher.hash_password(member_data["stuId"])
         
         # 创建用户数据
         user_data = {
@@ -249,8 +250,7 @@ async def update_member(member_id: str, member_data: dict, current_user: dict =
         if "password" in update_data:
             if update_data["password"] and update_data["password"].strip():
                 # 如果提供了非空密码，进行哈希处理
-                from api.routes.auth import hash_password
-                update_data["password"] = hash_password(update_data["password"])
+                update_data["password"] = await password_hasher.hash_password(update_data["password"])
             else:
                 # 如果密码为空或只有空白字符，从更新数据中移除密码字段
                 update_data.pop("password", None)
@@ -261,6 +261,17 @@ async def update_member(member_id: str, member_data: dict, current_user: dict =
             {"$set": update_data}
         )
         
+        # 角色/积分/密码可能已变更，刷新该成员的会话主体快照与缓存
+        await session_manager.refresh_user_principal(existing.get("stuId"))
+        if update_data.get("stuId"):
+            session_manager.invalidate_user(update_data["stuId"])
+        
+        # 角色变更、学号变更或密码重置后吊销已签发的会话，要求重新登录
+        role_changed = "role" in update_data and update_data["role"] != existing.get("role")
+        stu_id_changed = bool(update_data.get("stuId")) and update_data["stuId"] != existing.get("stuId")
+        if role_changed or stu_id_changed or "password" in update_data:
+            await session_manager.revoke_user_sessions(existing.get("stuId"))
+        
         return {"message": "成员信息更新成功"}
     except HTTPException:
         # 重新抛出 HTTPException，不要被下面的 Exception 捕获
@@ -294,6 +305,8 @@ async def delete_member(member_id: str, current_user: dict = Depends(require_sup
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="成员不存在")
         
+        await session_manager.revoke_user_sessions(member_to_delete.get("stuId"))
+        
         return {"message": "成员删除成功"}
     except HTTPException:
         # 重新抛出 HTTPException，不要被下面的 Exception 捕获
@@ -302,6 +315,17 @@ async def delete_member(member_id: str, current_user: dict = Depends(require_sup
         logger.error(f"删除成员时发生错误: {str(e)}")
         raise HTTPException(status_code=500, detail=f"删除成员失败: {str(e)}")
 
+def build_member_csv_row(member: dict) -> list:
+    """生成成员导出 CSV 的一行"""
+    return [
+        member.get("_id", ""),
+        member.get("stuId", ""),
+        member.get("role", ""),
+        member.get("points", 0),
+        member.get("creatTime", "").strftime("%Y-%m-%d %H:%M:%S") if isinstance(member.get("creatTime"), datetime) else "",
+        len(member.get("completedLevels", []))
+    ]
+
 @router.get("/export")
 async def export_members(current_user: dict = Depends(require_super_admin)):
     """导出成员数据"""
@@ -324,15 +348,7 @@ async def export_members(current_user: dict = Depends(require_super_admin)):
         
         # 写入数据行
         for member in members:
-            row = [
-                member.get("_id", ""),
-                member.get("stuId", ""),
-                member.get("role", ""),
-                member.get("points", 0),
-                member.get("creatTime", "").strftime("%Y-%m-%d %H:%M:%S") if isinstance(member.get("creatTime"), datetime) else "",
-                len(member.get("completedLevels", []))
-            ]
-            writer.writerow(row)
+            writer.writerow(build_member_csv_row(member))
         
         # 准备响应
         csv_content = output.getvalue().encode('utf-8-sig')
@@ -0,0 +1,64 @@
+"""
+Prometheus 指标路由
+输出请求指标以及缓存、会话、准入控制、连接池等应用级仪表
+"""
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from Core.Common.Config import Config
+from Core.Common.Metrics import registry
+from Core.Common.SystemSettings import system_settings
+from Core.MongoDB.Monitoring import pool_monitor, command_monitor
+from Core.User.Session import session_manager
+from api.dependencies import auth_admission_controller
+
+router = APIRouter()
+
+def collect_app_metrics():
+    """抓取时读取各模块的运行统计"""
+    principal = session_manager.principal_cache.stats()
+    tokens = session_manager.get_token_stats()
+    admission = auth_admission_controller.stats()
+    pool = pool_monitor.stats()
+    commands = command_monitor.stats()
+    return [
+        ("welcome_session_principal_cache_size", "gauge", "会话主体缓存条目数", [({}, principal["size"])]),
+        ("welcome_session_principal_cache_hits_total", "counter", "会话主体缓存命中次数", [({}, principal["hits"])]),
+        ("welcome_session_principal_cache_misses_total", "counter", "会话主体缓存未命中次数", [({}, principal["misses"])]),
+        ("welcome_session_negative_cache_size", "gauge", "无效token缓存条目数", [({}, tokens["negativeCache"]["size"])]),
+        ("welcome_session_rejected_total", "counter", "被拒绝的无效token数",
+         [({"reason": reason}, count) for reason, count in tokens["rejected"].items()]),
+        ("welcome_session_revocation_entries", "gauge", "吊销表条目数", [({}, tokens["revocationEntries"])]),
+        ("welcome_auth_admission_in_flight", "gauge", "正在处理的登录/注册请求数", [({}, admission["inFlight"])]),
+        ("welcome_auth_admission_queue_depth", "gauge", "排队中的登录/注册请求数", [({}, admission["queueDepth"])]),
+        ("welcome_auth_admission_rejected_total", "counter", "准入控制拒绝次数", [
+            ({"reason": "queue_full"}, admission["rejectedQueueFull"]),
+            ({"reason": "timeout"}, admission["rejectedTimeout"])
+        ]),
+        ("welcome_config_reloads_total", "counter", "config.ini 重新加载次数", [({}, Config.reload_count)]),
+        ("welcome_settings_version", "gauge", "本进程已同步的系统设置版本", [({}, system_settings.get_stats()["version"])]),
+        ("welcome_mongodb_pool_connections", "gauge", "MongoDB 连接数", [({}, pool["connections"])]),
+        ("welcome_mongodb_pool_in_use", "gauge", "使用中的 MongoDB 连接数", [({}, pool["inUse"])]),
+        ("welcome_mongodb_pool_checkout_failures_total", "counter", "MongoDB 取连接失败次数", [({}, pool["checkoutFailures"])]),
+        ("welcome_mongodb_pool_checkout_wait_seconds_max", "gauge", "MongoDB 取连接最大等待时间（秒）", [({}, pool["maxCheckoutWaitMs"] / 1000)]),
+        ("welcome_mongodb_commands_total", "counter", "MongoDB 命令数",
+         [({"command": name}, item["count"]) for name, item in commands.items()]),
+        ("welcome_mongodb_command_seconds_max", "gauge", "MongoDB 命令最大耗时（秒）",
+         [({"command": name}, item["maxMs"] / 1000) for name, item in commands.items()])
+    ]
+
+registry.register_collector(collect_app_metrics)
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """Prometheus 抓取端点"""
+    config = Config()
+    if not config.get_bool('Metrics', 'enabled', True):
+        raise HTTPException(status_code=404, detail="Not Found")
+    
+    # 配置了 token 时要求 Authorization: Bearer <token>
+    token = config.get_value('Metrics', 'token')
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="未授权")
+    
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
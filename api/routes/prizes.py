@@ -14,7 +14,9 @@ from fastapi.responses import Response
 from bson import ObjectId
 
 from Core.Prize.Prize import Prize
-from Core.Common.Config import Config
+from Core.Prize.Lottery import lottery_pool
+from Core.Prize.Counters import prize_counters
+from Core.Common.SystemSettings import system_settings
 from api.dependencies import require_super_admin
 
 logger = logging.getLogger(__name__)
@@ -22,7 +24,6 @@ router = APIRouter(prefix="/api/admin/prizes", tags=["奖品管理"])
 
 # 实例化奖品管理器
 prize_manager = Prize()
-config_manager = Config()
 
 def process_prize_photo(prize: dict) -> dict:
     """
@@ -82,6 +83,12 @@ async def get_prizes_stats(current_user: dict = Depends(require_super_admin)):
         available_result = await collection.aggregate(available_pipeline).to_list(1)
         available_quantity = available_result[0]["availableQuantity"] if available_result else 0
         
+        # 分片奖品的库存保存在分片计数器中（默认奖品的分片只记录抽中数）
+        counted = await prize_counters.get_totals(collection)
+        remaining_quantity += counted["total"]
+        total_quantity += counted["total"]
+        available_quantity += counted["available"]
+        
         # 获取抽中和兑换统计
         stats = await prize_manager.get_prize_statistics()
         
@@ -132,7 +139,7 @@ async def get_prizes_list(
         cursor = collection.find(filter_query).skip(skip).limit(limit).sort("createdAt", -1)
         prizes = []
         
-        async for prize in cursor:
+        for prize in await prize_counters.overlay(await cursor.to_list(None)):
             prize["_id"] = str(prize["_id"])
 
             # 处理图片回退逻辑
@@ -221,6 +228,8 @@ async def create_prize(prize_data: dict, current_user: dict = Depends(require_su
         if prize_id:
             # 更新默认奖品的概率
             await prize_manager.update_default_prize_weight()
+            # 通知各 worker 重建抽奖奖品池
+            await lottery_pool.invalidate()
             return {"success": True, "prizeId": prize_id, "message": "奖品创建成功"}
         else:
             raise HTTPException(status_code=500, detail="奖品创建失败")
@@ -243,6 +252,7 @@ async def get_prize(prize_id: str, current_user: dict = Depends(require_super_ad
         prize = await prize_manager.get_prize_by_field("_id", ObjectId(prize_id))
         if not prize:
             raise HTTPException(status_code=404, detail="奖品不存在")
+        await prize_counters.overlay([prize])
         # 格式化返回字段并处理图片回退
         prize["_id"] = str(prize["_id"]) if isinstance(prize.get("_id"), ObjectId) else str(prize.get("_id"))
         process_prize_photo(prize)
@@ -298,8 +308,13 @@ async def update_prize(
                 raise HTTPException(status_code=400, detail="奖品名称已存在")
         
         # 准备更新数据
-        update_data = {key: value for key, value in prize_data.items() if key != "_id"}
+        update_data = {key: value for key, value in prize_data.items() if key not in ("_id", "counterShards", "counterGeneration", "foldedShards")}
         update_data["updatedAt"] = datetime.now()
+        # 分片奖品的库存写入各分片，不直接覆盖奖品文档（默认奖品的库存仍在奖品文档上）
+        shards = prize_counters.shard_count(existing_prize)
+        new_total = None
+        if shards and "total" in update_data and not existing_prize.get("isDefault"):
+            new_total = int(update_data.pop("total"))
         # 如果更新了 weight 字段，需要校验概率总和（排除默认奖品并排除当前奖品）
         if "weight" in update_data:
             try:
@@ -327,9 +342,13 @@ async def update_prize(
 
         # 更新奖品
         success = await prize_manager.update_prize(prize_id, update_data)
+        if success and new_total is not None:
+            success = await prize_counters.set_total(await prize_manager.get_collection(), existing_prize, new_total)
         if success:
             # 更新默认奖品的概率
             await prize_manager.update_default_prize_weight()
+            # 通知各 worker 重建抽奖奖品池
+            await lottery_pool.invalidate()
             return {"success": True, "message": "奖品更新成功"}
         else:
             raise HTTPException(status_code=500, detail="奖品更新失败")
@@ -356,8 +375,11 @@ async def delete_prize(prize_id: str, current_user: dict = Depends(require_super
         # 删除奖品
         success = await prize_manager.delete_prize(prize_id)
         if success:
+            await prize_counters.delete(ObjectId(prize_id))
             # 更新默认奖品的概率
             await prize_manager.update_default_prize_weight()
+            # 通知各 worker 重建抽奖奖品池
+            await lottery_pool.invalidate()
             return {"success": True, "message": "奖品删除成功"}
         else:
             raise HTTPException(status_code=404, detail="奖品不存在")
@@ -402,6 +424,8 @@ async def toggle_prize_active(prize_id: str, current_user: dict = Depends(requir
         if result.modified_count > 0:
             # 更新默认奖品的概率
             await prize_manager.update_default_prize_weight()
+            # 通知各 worker 重建抽奖奖品池
+            await lottery_pool.invalidate()
             
             return {
                 "message": f"奖品已{'激活' if new_status else '停用'}",
@@ -416,6 +440,43 @@ async def toggle_prize_active(prize_id: str, current_user: dict = Depends(requir
         logger.error(f"切换奖品状态错误: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.put("/{prize_id}/shards")
+async def set_prize_shards(prize_id: str, data: dict, current_user: dict = Depends(require_super_admin)):
+    """
+    设置奖品的计数分片数
+    
+    热门奖品的库存与抽中数拆分到多个分片文档，抽奖时随机写入其中一个；shards 为 0 或 1 时合并回奖品文档。
+    调整期间该奖品可能短暂抽不到，但不会丢失库存与计数；失败时重新提交即可完成调整。
+    """
+    try:
+        if not ObjectId.is_valid(prize_id):
+            raise HTTPException(status_code=400, detail="无效的奖品ID")
+        try:
+            shards = int(data.get("shards", 0))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="分片数必须是整数")
+        if shards < 0 or shards > prize_counters.MAX_SHARDS:
+            raise HTTPException(status_code=400, detail=f"分片数必须在 0 到 {prize_counters.MAX_SHARDS} 之间")
+        
+        collection = await prize_manager.get_collection()
+        result = await prize_counters.set_shards(collection, ObjectId(prize_id), shards)
+        if result is None:
+            raise HTTPException(status_code=404, detail="奖品不存在或分片调整失败")
+        # 通知各 worker 重建抽奖奖品池
+        await lottery_pool.invalidate()
+        return {
+            "success": True,
+            "message": f"奖品已拆分为 {shards} 个计数分片" if shards > 1 else "奖品计数已合并",
+            "shards": shards if shards > 1 else 0,
+            "total": result["total"],
+            "drawn_count": result["drawn_count"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"设置奖品分片失败: {e}")
+        raise HTTPException(status_code=500, detail=f"设置奖品分片失败: {str(e)}")
+
 @router.post("/upload-image")
 async def upload_prize_image(
     file: UploadFile = File(...),
@@ -521,9 +582,8 @@ lottery_router = APIRouter(prefix="/api/admin/lottery-config", tags=["抽奖配
 async def get_lottery_config(current_user: dict = Depends(require_super_admin)):
     """获取抽奖配置"""
     try:
-        config = config_manager.get_lottery_config()
         return {
-            "lotteryPoints": config.get('points', 1)
+            "lotteryPoints": system_settings.get_lottery_cost()
         }
     except Exception as e:
         logger.error(f"获取抽奖配置失败: {e}")
@@ -542,10 +602,9 @@ async def update_lottery_config(config_data: dict, current_user: dict = Depends(
         if not isinstance(lottery_points, int) or lottery_points < 1:
             raise HTTPException(status_code=400, detail="抽奖积分必须是大于0的整数")
         
-        # 保存到配置文件
-        config_manager.update_lottery_config({
-            "lotteryPoints": lottery_points
-        })
+        # 保存到系统设置，其他 worker 通过版本轮询同步
+        if not await system_settings.set_lottery_cost(lottery_points):
+            raise HTTPException(status_code=500, detail="更新抽奖配置失败")
         
         return {
             "message": "抽奖配置更新成功",
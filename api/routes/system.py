@@ -0,0 +1,46 @@
+"""
+系统运行状态相关路由
+包含缓存命中率等运行时统计、索引报告
+"""
+import logging
+from fastapi import APIRouter, HTTPException, Depends
+
+from Core.Common.Config import Config
+from Core.Common.SystemSettings import system_settings
+from Core.MongoDB.Indexes import report_indexes
+from Core.MongoDB.Monitoring import get_mongodb_stats
+from Core.Prize.Lottery import lottery_pool, lottery_service
+from Core.Prize.DrawQueue import draw_queue
+from Core.User.Session import session_manager
+from api.dependencies import require_super_admin, auth_admission_controller
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/admin/system", tags=["系统状态"])
+
+@router.get("/stats")
+async def get_system_stats(current_user: dict = Depends(require_super_admin)):
+    """获取系统运行时统计信息"""
+    try:
+        return {
+            "sessionCache": session_manager.get_cache_stats(),
+            "sessionTokens": session_manager.get_token_stats(),
+            "authAdmission": auth_admission_controller.stats(),
+            "config": Config.get_stats(),
+            "settings": system_settings.get_stats(),
+            "lotteryPool": lottery_pool.get_stats(),
+            "lottery": lottery_service.get_stats(),
+            "drawQueue": draw_queue.get_stats(),
+            "mongodb": get_mongodb_stats()
+        }
+    except Exception as e:
+        logger.error(f"获取系统运行统计失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取系统运行统计失败: {str(e)}")
+
+@router.get("/indexes")
+async def get_index_report(current_user: dict = Depends(require_super_admin)):
+    """获取索引报告：缺失、未声明与未使用的索引"""
+    try:
+        return await report_indexes()
+    except Exception as e:
+        logger.error(f"获取索引报告失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取索引报告失败: {str(e)}")
@@ -3,7 +3,6 @@ NISA Welcome System 主应用文件
 简化版 - 使用模块化架构
 """
 import asyncio
-import hashlib
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
@@ -18,6 +17,12 @@ from config import create_app, setup_routes, get_managers
 from api.dependencies import require_auth, get_current_user_optional, require_super_admin, require_auth_redirect, require_super_admin_redirect, require_admin_redirect, require_admin
 from Core.Common.Config import Config
 from Core.User.Session import session_manager
+from Core.User.Permission import get_user_permissions
+from Core.User.Password import password_hasher
+from Core.Common.Metrics import lottery_draws_total
+from Core.Prize.Lottery import lottery_pool
+from Core.Prize.Counters import prize_counters
+from Core.Prize.DrawQueue import draw_queue
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -40,70 +45,8 @@ class LevelPointsRequest(BaseModel):
     stuId: str
     levelId: str
 
-# 工具函数
-def hash_password(password: str, salt: str = None) -> str:
-    """密码加盐哈希"""
-    if salt is None:
-        try:
-            salt = config.get_value('System', 'salt')
-        except:
-            salt = "nisa_salt_2025"  # 默认盐值
-    return hashlib.sha256((password + salt).encode()).hexdigest()
-
-def get_user_permissions(user_role: str, user_info: dict) -> dict:
-    """
-    获取用户的具体权限信息
-    
-    Args:
-        user_role: 用户角色
-        user_info: 用户信息字典
-    
-    Returns:
-        dict: 用户权限信息
-    """
-    permissions = {
-        "pages": [],
-        "features": {}
-    }
-    
-    # 基础页面权限
-    if user_role == "user":
-        # 普通成员: 个人信息 + 抽奖 + 关卡查看
-        permissions["pages"] = ["info", "lottery", "levelintroduction", "login", "setpassword"]
-        permissions["features"] = {
-            "canLottery": True,
-            "canModifyPoints": False,
-            "canViewMembers": False,
-            "canManageMembers": False,
-            "canManageLevels": False,
-            "canManagePrizes": False
-        }
-    elif user_role == "admin":
-        # 管理员: 个人信息 + 分发积分
-        permissions["pages"] = ["info", "modifypoints", "login", "setpassword"]
-        permissions["features"] = {
-            "canLottery": False,
-            "canModifyPoints": True,
-            "canViewMembers": False,
-            "canManageMembers": False,
-            "canManageLevels": False,
-            "canManagePrizes": False
-        }
-            
-    elif user_role == "super_admin":
-        # 超级管理员: 个人信息 + 分发积分 + 成员管理 + 关卡管理 + 奖品管理 + 汇总看板
-        permissions["pages"] = ["info", "modifypoints", "membermanagement", "levelmanagement", 
-                               "prizemanagement", "dashboard", "login", "setpassword"]
-        permissions["features"] = {
-            "canLottery": False,
-            "canModifyPoints": True,
-            "canViewMembers": True,
-            "canManageMembers": True,
-            "canManageLevels": True,
-            "canManagePrizes": True
-        }
-    
-    return permissions
+class BatchDrawRequest(BaseModel):
+    count: int
 
 # ========== 前端页面路由 ==========
 
@@ -313,7 +256,7 @@ async def create_default_admin():
             "points": admin_exists.get("points", 0) if admin_exists else 0,
             "completedLevels": admin_exists.get("completedLevels", []) if admin_exists else [],
             "role": default_role,
-            "password": hash_password(default_password)
+            "password": await password_hasher.hash_password(default_password)
         }
         
         if admin_exists:
@@ -327,6 +270,9 @@ async def create_default_admin():
             )
             
             logger.info(f"更新结果 - matched: {result.matched_count}, modified: {result.modified_count}")
+            # 角色与密码已按配置重置：刷新会话主体快照，并吊销重置前签发的会话
+            await session_manager.refresh_user_principal(default_stu_id)
+            await session_manager.revoke_user_sessions(default_stu_id)
             
             if result.matched_count > 0:
                 return {
@@ -381,8 +327,9 @@ async def reset_admin_password(stuId: str = "admin"):
         # 重置密码
         result = await collection.update_one(
             {"stuId": stuId},
-            {"$set": {"password": hash_password(default_password)}}
+            {"$set": {"password": await password_hasher.hash_password(default_password)}}
         )
+        await session_manager.revoke_user_sessions(stuId)
         
         if result.modified_count > 0:
             return {
@@ -428,6 +375,7 @@ async def update_admin_permissions(request: dict, current_user: dict = Depends(r
         )
         
         if result.modified_count > 0:
+            await session_manager.refresh_user_principal(stu_id)
             return {"message": "权限更新成功", "stuId": stu_id, "permissions": permissions}
         else:
             raise HTTPException(status_code=500, detail="权限更新失败")
@@ -787,7 +735,7 @@ async def get_lottery_prizes():
         prizes = []
         
         logger.info("遍历奖品数据")
-        async for prize in cursor:
+        for prize in await prize_counters.overlay(await cursor.to_list(None)):
             # 转换字段名以匹配前端期望的格式
             # 处理图片：如果数据库中有 photo 字段且文件存在则使用之，否则回退到 default.png
             photo_name = prize.get('photo') or 'default.png'
@@ -819,11 +767,10 @@ async def get_lottery_prizes():
 async def get_lottery_cost():
     """获取抽奖消耗积分"""
     try:
-        # 从配置文件中获取抽奖消耗
-        lottery_config = config.get_lottery_config()
+        # 从系统设置缓存中获取抽奖消耗
         return {
             "success": True,
-            "cost": lottery_config['points']
+            "cost": managers["system_settings"].get_lottery_cost()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取抽奖配置失败: {str(e)}")
@@ -831,142 +778,23 @@ async def get_lottery_cost():
 @app.post("/api/lottery/draw")
 async def draw_lottery(current_user: dict = Depends(require_auth)):
     """执行抽奖"""
-    import random
-    from datetime import datetime, timedelta
-    
     try:
         # 检查用户权限（只有普通会员可以抽奖）
         from Core.User.Permission import Permission
         if not Permission.can_lottery(current_user["role"]):
             raise HTTPException(status_code=403, detail="权限不足，只有普通会员可以抽奖")
         
-        # 获取抽奖配置
-        lottery_config = config.get_lottery_config()
-        
-        # 检查用户积分是否足够
-        user_collection = await managers["user_manager"].get_collection()
-        user = await user_collection.find_one({"stuId": current_user["stuId"]})
-        if not user:
-            raise HTTPException(status_code=404, detail="用户不存在")
-        
-        user_points = user.get("points", 0)
-        lottery_cost = lottery_config['points']
+        # 条件扣减库存 + 条件扣分（失败时归还库存），见 LotteryService；mode = queue 时经组提交队列合并写入
+        lottery_cost = managers["system_settings"].get_lottery_cost()
+        result = await draw_queue.draw(current_user["stuId"], lottery_cost)
+        if not result["success"]:
+            if result["reason"] == "insufficient_points":
+                lottery_draws_total.inc("insufficient_points")
+            raise HTTPException(status_code=result["status"], detail=result["message"])
         
-        if user_points < lottery_cost:
-            raise HTTPException(status_code=400, detail=f"积分不足，需要 {lottery_cost} 积分")
-        
-        # 获取可抽奖的奖品
-        prize_collection = await managers["prize_manager"].get_collection()
-        all_prizes = await prize_collection.find({"isActive": True}).to_list(None)
-        
-        if not all_prizes:
-            raise HTTPException(status_code=400, detail="当前没有可抽奖的奖品")
-        
-        # 分离默认奖品（谢谢惠顾）和普通奖品
-        default_prize = next((p for p in all_prizes if p.get("isDefault", False)), None)
-        normal_prizes = [p for p in all_prizes if not p.get("isDefault", False)]
-        
-        # 过滤出有库存的普通奖品
-        available_prizes = [p for p in normal_prizes if p.get("total", 0) > 0]
-        
-        # 如果没有可用的普通奖品，只能抽中默认奖品
-        if not available_prizes:
-            if default_prize:
-                selected_prize = default_prize
-            else:
-                raise HTTPException(status_code=400, detail="所有奖品库存已空，且没有默认奖品")
-        else:
-            # 将默认奖品也加入抽奖池（如果存在）
-            if default_prize:
-                available_prizes.append(default_prize)
-            
-            # 在进行抽奖前校验权重总和：不允许总权重超过100
-            # 这里的业务规则：权重字段表示百分比（0-100），整体不应超过100%
-            total_weight = sum(float(prize.get("weight", 0) or 0) for prize in available_prizes)
-            if total_weight > 100.0:
-                # 记录错误并阻止抽奖
-                logger.error(f"抽奖失败：奖品权重总和超过100%，当前总和={total_weight}")
-                raise HTTPException(status_code=400, detail=f"奖品概率总和超过100%（{total_weight}），请调整奖品权重后重试。")
-
-            # 基于权重的概率抽奖
-            # 计算总权重（所有有库存的奖品 + 默认奖品）
-            
-            # 生成随机数
-            rand_value = random.uniform(0, total_weight) if total_weight > 0 else 0
-            
-            # 根据权重选择奖品
-            current_weight = 0
-            selected_prize = None
-            for prize in available_prizes:
-                current_weight += prize.get("weight", 1)
-                if rand_value <= current_weight:
-                    selected_prize = prize
-                    break
-            
-            # 如果没有选中（理论上不会发生），则选择第一个
-            if selected_prize is None:
-                selected_prize = available_prizes[0]
-        
-        # 检查选中的奖品是否是默认奖品
-        is_default_prize = selected_prize.get("isDefault", False)
-        
-        # 创建奖品记录
-        prize_id = str(selected_prize["_id"])
-        prize_record = {
-            "prizeId": prize_id,
-            "prizeName": selected_prize.get("Name", selected_prize.get("name", "未知奖品")),
-            "prizePhoto": selected_prize.get("photo", ""),
-            "drawTime": datetime.now(),
-            "redeemed": False,  # 核销状态
-            "redeemedBy": None,
-            "redeemedAt": None
-        }
-        
-        # 创建积分消耗历史记录
-        lottery_history_record = {
-            "recordId": str(ObjectId()),
-            "type": "lottery_draw",
-            "pointsChange": -lottery_config['points'],  # 负数表示消耗
-            "reason": f"抽奖消耗: 获得{selected_prize.get('Name', selected_prize.get('name', '未知奖品'))}",
-            "prizeId": prize_id,
-            "prizeName": selected_prize.get("Name", selected_prize.get("name", "未知奖品")),
-            "operator": current_user.get("stuId", "system"),
-            "timestamp": datetime.now(),
-            "revoked": False,
-            "revokedBy": None,
-            "revokedAt": None
-        }
-        
-        # 扣除用户积分并添加奖品记录和积分历史记录
-        await user_collection.update_one(
-            {"stuId": current_user["stuId"]},
-            {
-                "$inc": {"points": -lottery_config['points']},
-                "$push": {
-                    "prizes": prize_record,
-                    "pointHistory": lottery_history_record
-                }
-            }
-        )
-        
-        # 更新奖品库存（默认奖品不减库存）
-        # 更新drawn_count统计
-        if not is_default_prize:
-            await prize_collection.update_one(
-                {"_id": selected_prize["_id"]},
-                {
-                    "$inc": {
-                        "total": -1,
-                        "drawn_count": 1
-                    }
-                }
-            )
-        else:
-            # 默认奖品只增加抽中次数统计
-            await prize_collection.update_one(
-                {"_id": selected_prize["_id"]},
-                {"$inc": {"drawn_count": 1}}
-            )
+        selected_prize = result["prize"]
+        is_default_prize = result["isDefault"]
+        lottery_draws_total.inc("default" if is_default_prize else "prize")
         
         return {
             "success": True,
@@ -977,8 +805,8 @@ async def draw_lottery(current_user: dict = Depends(require_auth)):
                 "image": selected_prize.get("photo", selected_prize.get("image", "")),
                 "rarity": selected_prize.get("rarity", "common")
             },
-            "pointsUsed": lottery_config['points'],
-            "remainingPoints": user_points - lottery_config['points'],
+            "pointsUsed": lottery_cost,
+            "remainingPoints": result["remainingPoints"],
             "message": f"恭喜获得 {selected_prize.get('Name', selected_prize.get('name', '未知奖品'))}！"
         }
         
@@ -988,6 +816,53 @@ async def draw_lottery(current_user: dict = Depends(require_auth)):
         logger.error(f"抽奖执行失败: {e}")
         raise HTTPException(status_code=500, detail=f"抽奖执行失败: {str(e)}")
 
+@app.post("/api/lottery/draw/batch")
+async def draw_lottery_batch(request: BatchDrawRequest, current_user: dict = Depends(require_auth)):
+    """连续抽奖（一次请求抽 count 次，积分不足时一次也不抽）"""
+    try:
+        from Core.User.Permission import Permission
+        if not Permission.can_lottery(current_user["role"]):
+            raise HTTPException(status_code=403, detail="权限不足，只有普通会员可以抽奖")
+        
+        max_count = Config().get_int('Lottery', 'max_batch_draws', 10)
+        if request.count < 1 or request.count > max_count:
+            raise HTTPException(status_code=400, detail=f"连抽次数需在 1 到 {max_count} 之间")
+        
+        lottery_cost = managers["system_settings"].get_lottery_cost()
+        result = await draw_queue.draw_many(current_user["stuId"], lottery_cost, request.count)
+        if not result["success"]:
+            if result["reason"] == "insufficient_points":
+                lottery_draws_total.inc("insufficient_points")
+            raise HTTPException(status_code=result["status"], detail=result["message"])
+        
+        prizes = []
+        for prize in result["prizes"]:
+            is_default_prize = prize.get("isDefault", False)
+            lottery_draws_total.inc("default" if is_default_prize else "prize")
+            prizes.append({
+                "id": str(prize["_id"]),
+                "name": prize.get("Name", prize.get("name", "未知奖品")),
+                "description": prize.get("description", ""),
+                "image": prize.get("photo", prize.get("image", "")),
+                "rarity": prize.get("rarity", "common"),
+                "isDefault": is_default_prize
+            })
+        won = sum(1 for prize in prizes if not prize["isDefault"])
+        
+        return {
+            "success": True,
+            "prizes": prizes,
+            "pointsUsed": lottery_cost * request.count,
+            "remainingPoints": result["remainingPoints"],
+            "message": f"{request.count} 连抽完成，获得 {won} 个奖品"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"连续抽奖执行失败: {e}")
+        raise HTTPException(status_code=500, detail=f"连续抽奖执行失败: {str(e)}")
+
 @app.get("/api/debug/session")
 async def debug_session(request: Request, session_token: Optional[str] = Cookie(None)):
     """调试会话信息 - 用于导航栏获取用户信息和权限"""
@@ -1281,7 +1156,7 @@ async def init_system(current_user: Optional[dict] = Depends(get_current_user_op
                 "pointHistory": admin_exists.get("pointHistory", []) if admin_exists else [],
                 "prizes": admin_exists.get("prizes", []) if admin_exists else [],
                 "role": default_role,
-                "password": hash_password(default_password)
+                "password": await password_hasher.hash_password(default_password)
             }
             
             if admin_exists:
@@ -1290,6 +1165,9 @@ async def init_system(current_user: Optional[dict] = Depends(get_current_user_op
                     {"stuId": default_stu_id},
                     {"$set": admin_data}
                 )
+                # 角色与密码已按配置重置：刷新会话主体快照，并吊销重置前签发的会话
+                await session_manager.refresh_user_principal(default_stu_id)
+                await session_manager.revoke_user_sessions(default_stu_id)
                 result["details"]["admin_status"] = f"管理员账户已更新: {default_stu_id}"
                 logger.info(f"✓ 管理员账户已更新: {default_stu_id}")
             else:
@@ -1514,6 +1392,9 @@ async def init_system(current_user: Optional[dict] = Depends(get_current_user_op
         
         logger.info(f"✓ 奖品数据迁移完成，处理了 {result['details']['prizes_migrated']} 个奖品")
         
+        # 奖品数据可能已变更，通知各 worker 重建抽奖奖品池
+        await lottery_pool.invalidate()
+        
         # ========== 完成 ==========
         if len(result["details"]["errors"]) > 0:
             result["message"] = f"系统初始化完成，但有 {len(result['details']['errors'])} 个警告"
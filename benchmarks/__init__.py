@@ -0,0 +1,6 @@
+"""
+性能基准与压测脚本
+
+在项目根目录下以模块方式运行，例如:
+    python -m benchmarks.password_kdf
+"""
@@ -0,0 +1,265 @@
+"""
+规模测试数据集生成器
+
+按可配置规模向 MongoDB 写入贴近真实形态的合成数据，用于复现看板、导出等接口在大数据量下的表现：
+- 关卡：M 个，积分 5~30，少量停用
+- 奖品：K 种普通奖品，权重之和不超过 100，另加权重为剩余概率的默认奖品（谢谢惠顾）
+- 用户：N 名，学号形如 12xxxxxxxx；completedLevels 取自真实关卡ID；
+  pointHistory 为关卡完成 / 手动调整 / 抽奖消耗记录（可配置平均长度），prizes 与抽奖记录一一对应，
+  points 与历史记录保持一致；另含少量管理员
+- 系统设置：__version__ 与 lottery_cost
+
+用户按批次生成并以 insert_many 批量写入，内存占用与批次大小成正比而与 N 无关。
+所有用户共用同一密码（只计算一次哈希），可用学号 + --password 登录。
+默认写入独立的数据库；写入 config.ini 中配置的数据库需显式 --force。
+
+用法:
+    python -m benchmarks.dataset --users 20000 --levels 30 --prizes 12
+    python -m benchmarks.dataset --users 200000 --history 120 --batch-size 5000 --drop
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+import Core.MongoDB.MongoDB as MongoDB
+from Core.MongoDB.Indexes import ensure_all_indexes
+from Core.User.Password import password_hasher
+
+REASONS = ["活动签到", "志愿服务", "表现优秀", "补录积分", "违规扣分"]
+
+def generate_levels(count: int, now: datetime) -> List[Dict[str, Any]]:
+    """生成关卡文档"""
+    return [{
+        "_id": ObjectId(),
+        "name": f"关卡{i + 1:03d}",
+        "info": f"第 {i + 1} 个关卡的介绍",
+        "points": random.choice([5, 10, 10, 15, 20, 30]),
+        "isActive": random.random() > 0.1,
+        "createdAt": now - timedelta(days=7, minutes=i),
+        "updatedAt": now - timedelta(days=7, minutes=i),
+        "createdBy": "super_admin"
+    } for i in range(count)]
+
+def generate_prizes(count: int, total_weight: float, now: datetime) -> List[Dict[str, Any]]:
+    """生成奖品文档（普通奖品权重之和不超过 total_weight，最后一个为默认奖品）"""
+    total_weight = max(0.0, min(100.0, total_weight))
+    # 稀有奖品与常见奖品的相对概率差异较大
+    raw = [random.paretovariate(1.5) for _ in range(count)]
+    scale = total_weight / sum(raw) if raw else 0
+    # 保留两位小数并向下取整，保证总和不超过上限
+    weights = [int(value * scale * 100) / 100 for value in raw]
+    
+    prizes = [{
+        "_id": ObjectId(),
+        "Name": f"奖品{i + 1:02d}",
+        "total": random.randint(20, 500),
+        "weight": weight,
+        "photo": "",
+        "isActive": True,
+        "drawn_count": 0,
+        "redeemed_count": 0,
+        "createdAt": now - timedelta(days=7),
+        "updatedAt": now - timedelta(days=7)
+    } for i, weight in enumerate(weights)]
+    prizes.append({
+        "_id": ObjectId(),
+        "Name": "谢谢惠顾",
+        "total": 999999,
+        "weight": max(0, round(100 - sum(weights), 2)),
+        "photo": "",
+        "isActive": True,
+        "isDefault": True,
+        "drawn_count": 0,
+        "redeemed_count": 0,
+        "created_at": now - timedelta(days=7),
+        "updated_at": now - timedelta(days=7)
+    })
+    return prizes
+
+def history_record(record_type: str, change: int, reason: str, operator: str, timestamp: datetime, **extra) -> Dict[str, Any]:
+    """生成一条积分历史记录（字段与接口写入的一致）"""
+    return {
+        "recordId": str(ObjectId()),
+        "type": record_type,
+        "pointsChange": change,
+        "reason": reason,
+        **extra,
+        "operator": operator,
+        "timestamp": timestamp,
+        "revoked": False,
+        "revokedBy": None,
+        "revokedAt": None
+    }
+
+def generate_user(index: int, levels: List[Dict[str, Any]], prizes: List[Dict[str, Any]], history: int,
+                  lottery_cost: int, password_hash: str, now: datetime, drawn: Dict[ObjectId, int]) -> Dict[str, Any]:
+    """生成一名普通用户，drawn 累计各奖品被抽中的次数"""
+    stu_id = f"12{index:08d}"
+    start = now - timedelta(hours=8) + timedelta(seconds=index)
+    timestamp = start
+    points = 0
+    records = []
+    user_prizes = []
+    
+    completed = random.sample(levels, k=random.randint(0, len(levels)))
+    target = max(len(completed), int(random.expovariate(1 / history))) if history > 0 else len(completed)
+    pending = [("level", level) for level in completed] + [("other", None)] * (target - len(completed))
+    random.shuffle(pending)
+    
+    weights = [prize["weight"] for prize in prizes]
+    for kind, level in pending:
+        timestamp += timedelta(seconds=random.randint(5, 600))
+        operator = f"admin{random.randint(1, 8):02d}"
+        if kind == "level":
+            points += level["points"]
+            records.append(history_record(
+                "level_completion", level["points"], f"完成关卡: {level['name']}", operator, timestamp,
+                levelId=str(level["_id"]), levelName=level["name"]
+            ))
+        elif points >= lottery_cost and random.random() < 0.5:
+            prize = random.choices(prizes, weights=weights)[0]
+            points -= lottery_cost
+            drawn[prize["_id"]] = drawn.get(prize["_id"], 0) + 1
+            records.append(history_record(
+                "lottery_draw", -lottery_cost, f"抽奖消耗: 获得{prize['Name']}", stu_id, timestamp,
+                prizeId=str(prize["_id"]), prizeName=prize["Name"]
+            ))
+            user_prizes.append({
+                "prizeId": str(prize["_id"]),
+                "prizeName": prize["Name"],
+                "prizePhoto": prize["photo"],
+                "drawTime": timestamp,
+                "redeemed": False,
+                "redeemedBy": None,
+                "redeemedAt": None
+            })
+        else:
+            change = random.choice([1, 2, 5, -1])
+            if points + change < 0:
+                change = -change
+            points += change
+            records.append(history_record("manual", change, random.choice(REASONS), operator, timestamp))
+    
+    return {
+        "stuId": stu_id,
+        "name": f"新生{index:05d}",
+        "role": "user",
+        "points": points,
+        "password": password_hash,
+        "completedLevels": [str(level["_id"]) for level in completed],
+        "pointHistory": records,
+        "prizes": user_prizes,
+        "creatTime": start,
+        "createdBy": "register"
+    }
+
+async def insert_batches(collection, docs, batch_size: int) -> int:
+    """按批次写入文档，返回写入数量"""
+    inserted = 0
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+async def main():
+    parser = argparse.ArgumentParser(description="规模测试数据集生成器")
+    parser.add_argument("--users", type=int, default=20000, help="普通用户数 N")
+    parser.add_argument("--admins", type=int, default=8, help="管理员数")
+    parser.add_argument("--levels", type=int, default=30, help="关卡数 M")
+    parser.add_argument("--prizes", type=int, default=12, help="普通奖品种类数")
+    parser.add_argument("--prize-weight", type=float, default=60.0, help="普通奖品权重之和（不超过 100）")
+    parser.add_argument("--history", type=int, default=40, help="每名用户积分历史的平均条数")
+    parser.add_argument("--lottery-cost", type=int, default=1, help="单次抽奖消耗积分")
+    parser.add_argument("--batch-size", type=int, default=1000, help="insert_many 每批文档数")
+    parser.add_argument("--password", default="welcome-2025", help="所有合成账号的登录密码")
+    parser.add_argument("--database", default="welcome_dataset", help="写入的数据库名")
+    parser.add_argument("--drop", action="store_true", help="写入前删除该数据库")
+    parser.add_argument("--force", action="store_true", help="允许写入 config.ini 中配置的数据库")
+    parser.add_argument("--seed", type=int, default=2025, help="随机种子")
+    args = parser.parse_args()
+    
+    db = MongoDB.mongodb_instance
+    if args.database == db.dbName and not args.force:
+        raise SystemExit(f"数据库 {args.database} 为 config.ini 中配置的业务库，如确需写入请加 --force")
+    
+    random.seed(args.seed)
+    db.dbName = args.database
+    database = await MongoDB.get_mongodb_database()
+    if args.drop:
+        await database.client.drop_database(args.database)
+    
+    now = datetime.now()
+    start = time.perf_counter()
+    password_hash = await password_hasher.hash_password(args.password)
+    
+    levels = generate_levels(args.levels, now)
+    prizes = generate_prizes(args.prizes, args.prize_weight, now)
+    if levels:
+        await database["level"].insert_many(levels)
+    await database["prize"].insert_many(prizes)
+    await database["system_settings"].update_one(
+        {"key": "lottery_cost"},
+        {"$set": {"value": args.lottery_cost, "version": 1, "updatedAt": now}},
+        upsert=True
+    )
+    await database["system_settings"].update_one({"key": "__version__"}, {"$max": {"version": 1}}, upsert=True)
+    
+    admins = [{
+        "stuId": f"11{i:08d}",
+        "name": f"管理员{i:02d}",
+        "role": "admin",
+        "points": 0,
+        "password": password_hash,
+        "completedLevels": [],
+        "pointHistory": [],
+        "prizes": [],
+        "creatTime": now - timedelta(days=7),
+        "createdBy": "super_admin"
+    } for i in range(1, args.admins + 1)]
+    
+    drawn: Dict[ObjectId, int] = {}
+    users = (
+        generate_user(i, levels, prizes, args.history, args.lottery_cost, password_hash, now, drawn)
+        for i in range(args.users)
+    )
+    user_collection = database["user"]
+    inserted = await insert_batches(user_collection, admins, args.batch_size)
+    inserted += await insert_batches(user_collection, users, args.batch_size)
+    
+    # 同步奖品的抽中次数与剩余库存
+    for prize in prizes:
+        count = drawn.get(prize["_id"], 0)
+        if count:
+            change = {"drawn_count": count} if prize.get("isDefault") else {"drawn_count": count, "total": -min(count, prize["total"])}
+            await database["prize"].update_one({"_id": prize["_id"]}, {"$inc": change})
+    
+    created = await ensure_all_indexes()
+    elapsed = time.perf_counter() - start
+    
+    stats = await database.command("dbStats")
+    print(f"数据库:       {args.database}")
+    print(f"用户:         {inserted}（含管理员 {len(admins)}）")
+    print(f"关卡/奖品:    {len(levels)} / {len(prizes)}（普通奖品权重和 {sum(p['weight'] for p in prizes[:-1]):.2f}）")
+    print(f"抽奖记录:     {sum(drawn.values())}")
+    print(f"新建索引:     {sum(len(names) for names in created.values())}")
+    print(f"数据大小:     {stats.get('dataSize', 0) / 1024 / 1024:.1f} MB")
+    print(f"耗时:         {elapsed:.1f}s（{inserted / elapsed:.0f} 用户/秒）")
+    print(f"登录示例:     学号 12{0:08d} / 密码 {args.password}")
+    
+    await db.disconnect()
+    password_hasher.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,231 @@
+"""
+热点查询执行计划回归检查
+
+在独立的数据库中写入合成数据并创建声明的索引，然后对项目中实际使用的查询形状执行 explain，
+检查获胜计划：
+- 计划树中出现 COLLSCAN 即失败（明确标注 allow_collscan 的全量列表查询除外）
+- find 查询的 docsExamined / nReturned 超过 max_ratio 即失败
+
+新增路由的查询应在 QUERY_SHAPES 中登记；检查失败时以非零状态码退出，可作为上线前的门禁。
+需要可连接的 MongoDB（读取 config.ini 的连接串），基准数据库在开始前与结束后删除；使用 config.ini 中配置的数据库需显式 --force。
+
+用法:
+    python -m benchmarks.explain_plans
+    python -m benchmarks.explain_plans --users 5000 --keep
+"""
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+import Core.MongoDB.MongoDB as MongoDB
+from Core.MongoDB.Indexes import ensure_all_indexes
+
+def build_shapes(sample: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    项目中的热点查询形状
+    
+    每项: name 查询来源, collection 集合, command 传给 explain 的命令,
+    allow_collscan 是否允许全表扫描, max_ratio docsExamined/nReturned 上限
+    """
+    stu_id = sample["stuId"]
+    level_id = sample["levelId"]
+    prize_id = sample["prizeId"]
+    token = sample["token"]
+    return [
+        # 登录 / 会话
+        {"name": "login: 凭据查询", "command": {"find": "user", "filter": {"stuId": stu_id}, "limit": 1}},
+        {"name": "login: 会话替换", "command": {"update": "session", "updates": [
+            {"q": {"stuId": stu_id}, "u": {"stuId": stu_id, "token": "x"}, "upsert": True}]}},
+        {"name": "get_session", "command": {"find": "session", "filter": {
+            "token": token, "active": True, "expireTime": {"$gt": datetime.now()}}, "limit": 1}},
+        {"name": "sync_revocations", "command": {"find": "session", "filter": {
+            "expireTime": {"$gt": datetime.now()},
+            "updateTime": {"$gte": datetime.now() - timedelta(seconds=5)}}, "sort": {"updateTime": 1}}},
+        {"name": "revoke_user_sessions", "command": {"update": "session", "updates": [
+            {"q": {"stuId": stu_id}, "u": {"$set": {"active": False}}, "multi": True}]}},
+        
+        # 抽奖
+        {"name": "draw_lottery: 用户查询", "command": {"find": "user", "filter": {"stuId": stu_id}, "limit": 1}},
+        {"name": "draw_lottery: 可抽奖品", "command": {"find": "prize", "filter": {"isActive": True}}, "max_ratio": 1.5},
+        {"name": "draw_lottery: 扣除积分", "command": {"update": "user", "updates": [
+            {"q": {"stuId": stu_id}, "u": {"$inc": {"points": -1}}}]}},
+        {"name": "draw_lottery: 扣减库存", "command": {"update": "prize", "updates": [
+            {"q": {"_id": prize_id}, "u": {"$inc": {"total": -1, "drawn_count": 1}}}]}},
+        {"name": "ensure_default_prize", "command": {"find": "prize", "filter": {"isDefault": True}, "limit": 1}},
+        
+        # 关卡积分
+        {"name": "add_level_points: 关卡查询", "command": {"find": "level", "filter": {"_id": level_id}, "limit": 1}},
+        {"name": "add_level_points: 发放积分", "command": {"update": "user", "updates": [
+            {"q": {"stuId": stu_id}, "u": {"$inc": {"points": 1}}}]}},
+        {"name": "get_level_completion: 计数", "command": {"count": "user", "query": {"completedLevels": str(level_id)}}},
+        {"name": "get_level_completion: 参与者", "command": {"find": "user", "filter": {
+            "completedLevels": str(level_id)}, "projection": {"password": 0}, "limit": 20}},
+        {"name": "levels: 启用关卡", "command": {"find": "level", "filter": {"isActive": True}}, "max_ratio": 1.5},
+        {"name": "levels: 重名检查", "command": {"find": "level", "filter": {"name": "关卡1"}, "limit": 1}},
+        {"name": "levels: 列表分页", "command": {"find": "level", "filter": {}, "sort": {"createdAt": -1}, "limit": 10}},
+        
+        # 成员管理
+        {"name": "get_members_list: 按角色", "command": {"find": "user", "filter": {"role": "admin"}, "limit": 10}},
+        {"name": "get_members_list: 计数", "command": {"count": "user", "query": {"role": "user"}}},
+        {"name": "get_members_list: 全部", "command": {"find": "user", "filter": {}, "limit": 10}, "allow_collscan": True},
+        {"name": "get_all_users: 分页", "command": {"find": "user", "filter": {}, "sort": {"creatTime": -1}, "limit": 10}},
+        {"name": "admin_list: 管理员", "command": {"find": "user", "filter": {
+            "role": {"$in": ["admin", "super_admin"]}}}},
+        {"name": "super_admin 计数", "command": {"count": "user", "query": {"role": "super_admin"}}},
+        
+        # 奖品管理
+        {"name": "prizes: 重名检查", "command": {"find": "prize", "filter": {"Name": "奖品1"}, "limit": 1}},
+        {"name": "prizes: 列表分页", "command": {"find": "prize", "filter": {}, "sort": {"createdAt": -1}, "limit": 10}},
+        
+        # 系统设置
+        {"name": "settings: 读取", "command": {"find": "system_settings", "filter": {"key": "lottery_cost"}, "limit": 1}},
+        {"name": "settings: 增量同步", "command": {"find": "system_settings", "filter": {
+            "version": {"$gt": 0}, "key": {"$ne": "__version__"}}}},
+    ]
+
+def collect_stages(plan: Any) -> List[str]:
+    """递归收集计划树中的所有 stage 名称"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key in ("inputStage", "inputStages", "queryPlan", "winningPlan", "shards", "thenStage", "elseStage"):
+                stages.extend(collect_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(collect_stages(item))
+    return stages
+
+async def seed(database, users: int, levels: int, prizes: int) -> Dict[str, Any]:
+    """写入合成数据，返回用于构造查询的样本值"""
+    now = datetime.now()
+    level_ids = [ObjectId() for _ in range(levels)]
+    await database["level"].insert_many([{
+        "_id": level_id,
+        "name": f"关卡{i}",
+        "points": 10,
+        "isActive": i % 4 != 0,
+        "createdAt": now - timedelta(minutes=i)
+    } for i, level_id in enumerate(level_ids)])
+    
+    prize_ids = [ObjectId() for _ in range(prizes)]
+    await database["prize"].insert_many([{
+        "_id": prize_id,
+        "Name": f"奖品{i}",
+        "weight": 1,
+        "total": 10,
+        "isActive": i % 3 != 0,
+        "isDefault": i == 0,
+        "createdAt": now - timedelta(minutes=i)
+    } for i, prize_id in enumerate(prize_ids)])
+    
+    roles = ["user"] * 97 + ["admin"] * 2 + ["super_admin"]
+    user_docs = []
+    session_docs = []
+    for i in range(users):
+        stu_id = f"2025{i:06d}"
+        user_docs.append({
+            "stuId": stu_id,
+            "password": "x",
+            "role": random.choice(roles),
+            "points": random.randint(0, 100),
+            "completedLevels": [str(level_id) for level_id in random.sample(level_ids, k=random.randint(0, 3))],
+            "creatTime": now - timedelta(seconds=i)
+        })
+        session_docs.append({
+            "token": str(uuid.uuid4()),
+            "stuId": stu_id,
+            "active": True,
+            "updateTime": now - timedelta(hours=1),
+            "expireTime": now + timedelta(days=7)
+        })
+    await database["user"].insert_many(user_docs)
+    await database["session"].insert_many(session_docs)
+    await database["system_settings"].insert_many([
+        {"key": "__version__", "version": 1},
+        {"key": "lottery_cost", "value": 1, "version": 1}
+    ])
+    
+    return {
+        "stuId": user_docs[users // 2]["stuId"],
+        "token": session_docs[users // 2]["token"],
+        "levelId": level_ids[0],
+        "prizeId": prize_ids[1]
+    }
+
+async def check_shape(database, shape: Dict[str, Any]) -> Dict[str, Any]:
+    """执行 explain 并判断是否通过"""
+    explain = await database.command({"explain": shape["command"], "verbosity": "executionStats"})
+    stages = collect_stages(explain.get("queryPlanner", {}))
+    stats = explain.get("executionStats", {})
+    examined = stats.get("totalDocsExamined", 0)
+    returned = stats.get("nReturned", 0)
+    
+    problems = []
+    if "COLLSCAN" in stages and not shape.get("allow_collscan"):
+        problems.append("COLLSCAN")
+    if "find" in shape["command"] and not shape.get("allow_collscan"):
+        max_ratio = shape.get("max_ratio", 1.0)
+        if examined > max(returned, 1) * max_ratio:
+            problems.append(f"docsExamined/nReturned={examined}/{returned}")
+    
+    return {
+        "name": shape["name"],
+        "stages": "→".join(reversed(stages)),
+        "examined": examined,
+        "returned": returned,
+        "problems": problems
+    }
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="热点查询执行计划回归检查")
+    parser.add_argument("--users", type=int, default=3000, help="合成用户数")
+    parser.add_argument("--levels", type=int, default=20, help="合成关卡数")
+    parser.add_argument("--prizes", type=int, default=30, help="合成奖品数")
+    parser.add_argument("--database", default="welcome_explain", help="检查使用的数据库名")
+    parser.add_argument("--keep", action="store_true", help="结束后保留数据库")
+    parser.add_argument("--force", action="store_true", help="允许使用 config.ini 中配置的数据库（会被删除）")
+    args = parser.parse_args()
+    
+    db = MongoDB.mongodb_instance
+    if args.database == db.dbName and not args.force:
+        raise SystemExit(f"数据库 {args.database} 为 config.ini 中配置的业务库，会被删除，如确需使用请加 --force")
+    
+    random.seed(20250901)
+    db.dbName = args.database
+    database = await MongoDB.get_mongodb_database()
+    await database.client.drop_database(args.database)
+    
+    try:
+        failed_indexes = await ensure_all_indexes()
+        if any(failed_indexes.values()):
+            print(f"索引创建失败: {failed_indexes}")
+            return 1
+        sample = await seed(database, args.users, args.levels, args.prizes)
+        
+        failures = 0
+        print(f"{'查询':<28}{'结果':<8}{'examined/returned':>20}   计划")
+        for shape in build_shapes(sample):
+            result = await check_shape(database, shape)
+            status = "FAIL" if result["problems"] else "ok"
+            failures += bool(result["problems"])
+            ratio = f"{result['examined']}/{result['returned']}"
+            print(f"{result['name']:<28}{status:<8}{ratio:>20}   {result['stages']}")
+            for problem in result["problems"]:
+                print(f"{'':<28}  - {problem}")
+        
+        print(f"\n{failures} 个查询未通过" if failures else "\n全部查询通过")
+        return 1 if failures else 0
+    finally:
+        if not args.keep:
+            await database.client.drop_database(args.database)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,180 @@
+"""
+纯函数热点微基准
+
+对请求路径上不依赖数据库的热点函数做 timeit 微基准：
+- 抽奖加权选择：线性扫描 select_weighted_prize 与别名表 PoolSnapshot.draw
+- get_user_permissions / Permission.check_permission
+- process_prize_photo（含一次文件存在性检查）
+- 撤销积分时的积分历史查找 find_history_record
+- 成员导出 CSV 行构建 build_member_csv_row
+- 用户文档的 JSON 序列化（jsonable_encoder + json.dumps）
+
+结果以“每次调用纳秒数”（多轮取最小值）表示，并换算为相对值：同一次运行中测得的参照函数 reference
+（固定的纯 Python 工作量）耗时的倍数。基线只保存相对值，对比时抵消机器快慢的差异，可以在不同机器之间共用（Python 版本不同时仍应重新 --save）；
+--save 将相对值写入基线文件，默认模式与基线对比，相对值变大超过阈值的用例标记为回归并以非零状态退出，可用于 CI。
+reference 的实现不能修改，否则需要重新 --save。
+
+用法:
+    python -m benchmarks.hot_functions                 # 与基线对比
+    python -m benchmarks.hot_functions --save          # 更新基线
+    python -m benchmarks.hot_functions --filter lottery --threshold 0.3
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from Core.Prize.Lottery import PoolSnapshot, select_weighted_prize
+from Core.User.Permission import Permission, get_user_permissions
+from Core.User.User import find_history_record
+from api.routes.members import build_member_csv_row
+from api.routes.prizes import process_prize_photo
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "hot_functions.json")
+
+# 参照函数的输入，与 reference 一起保持不变
+REFERENCE_ITEMS = [{"id": i, "name": f"item-{i}"} for i in range(100)]
+
+def reference():
+    """参照工作量：字典、列表与字符串操作，结果以它的耗时为单位"""
+    index = {}
+    for item in REFERENCE_ITEMS:
+        index[item["name"].upper()] = item["id"] * 2
+    return sorted(index, key=index.get)[:10]
+
+def make_user(history_size: int) -> dict:
+    """构造一个典型的用户文档（含较长的积分历史）"""
+    now = datetime(2025, 9, 1, 9, 0, 0)
+    return {
+        "_id": str(ObjectId()),
+        "stuId": "1234567890",
+        "name": "测试成员",
+        "role": "user",
+        "points": 42,
+        "creatTime": now,
+        "completedLevels": [str(ObjectId()) for _ in range(8)],
+        "prizes": [{"prizeId": str(ObjectId()), "name": "纪念徽章", "time": now} for _ in range(3)],
+        "pointHistory": [
+            {
+                "recordId": f"record-{i}",
+                "change": random.randint(-5, 5),
+                "reason": "关卡完成",
+                "operator": "admin",
+                "time": now + timedelta(minutes=i)
+            }
+            for i in range(history_size)
+        ]
+    }
+
+def build_cases() -> dict:
+    """返回 {用例名: 无参可调用对象}"""
+    random.seed(2025)
+    prizes = [{"name": f"奖品{i}", "weight": random.randint(1, 10)} for i in range(20)]
+    total_weight = sum(p["weight"] for p in prizes)
+    rand_values = [random.uniform(0, total_weight) for _ in range(64)]
+    user = make_user(200)
+    history = user["pointHistory"]
+    super_admin = {"stuId": "super_admin", "role": "super_admin", "points": 0}
+    
+    snapshot = PoolSnapshot(None, [{**p, "total": 10, "weight": p["weight"] * 100 / total_weight / 2} for p in prizes])
+    
+    def lottery_select():
+        for value in rand_values:
+            select_weighted_prize(prizes, value)
+    
+    def lottery_alias():
+        for _ in rand_values:
+            snapshot.draw()
+    
+    return {
+        "lottery.select_weighted_prize[20x64]": lottery_select,
+        "lottery.alias_draw[20x64]": lottery_alias,
+        "permission.get_user_permissions": lambda: get_user_permissions("super_admin", super_admin),
+        "permission.check_permission": lambda: Permission.check_permission("admin", "ModifyPoints"),
+        "prizes.process_prize_photo": lambda: process_prize_photo({"photo": "missing.png"}),
+        "user.find_history_record[200,last]": lambda: find_history_record(history, "record-199"),
+        "members.build_member_csv_row": lambda: build_member_csv_row(user),
+        "user.json_serialize[200]": lambda: json.dumps(jsonable_encoder(user), ensure_ascii=False)
+    }
+
+def measure(func, repeat: int) -> float:
+    """返回每次调用的纳秒数（多轮取最小值以降低噪声）"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e9
+
+def measure_reference(repeat: int) -> float:
+    """参照函数每次调用的纳秒数"""
+    return measure(reference, repeat)
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="纯函数热点微基准")
+    parser.add_argument("--save", action="store_true", help="将本次结果写入基线文件")
+    parser.add_argument("--threshold", type=float, default=0.5, help="判定回归的变慢比例，默认 0.5 即 50%%")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的测量轮数")
+    parser.add_argument("--filter", default="", help="仅运行名称包含该子串的用例")
+    args = parser.parse_args()
+    
+    baseline = load_baseline().get("ratios", {})
+    cases = {name: func for name, func in build_cases().items() if not args.filter or args.filter in name}
+    results = {}
+    regressions = []
+    
+    # 参照函数在每个用例前后穿插测量，取全部轮次的最小值作为单位（与用例耗时同样取最小值），不受个别轮次抖动影响
+    references = [measure_reference(args.repeat)]
+    timings = {}
+    for name, func in cases.items():
+        timings[name] = measure(func, args.repeat)
+        references.append(measure_reference(args.repeat))
+    unit = min(references)
+    
+    print(f"参照函数: {unit:.1f} ns/次")
+    print(f"{'用例':<40}{'ns/次':>12}{'相对值':>10}{'基线':>10}{'变化':>10}")
+    for name, ns in timings.items():
+        ratio = ns / unit
+        results[name] = round(ratio, 4)
+        base = baseline.get(name)
+        if base:
+            change = ratio / base - 1
+            mark = "  回归" if change > args.threshold else ""
+            if mark:
+                regressions.append(name)
+            print(f"{name:<40}{ns:>12.1f}{ratio:>10.4f}{base:>10.4f}{change:>+9.1%}{mark}")
+        else:
+            print(f"{name:<40}{ns:>12.1f}{ratio:>10.4f}{'-':>10}{'-':>10}")
+    
+    if args.save:
+        data = load_baseline()
+        # 旧格式的绝对耗时与机器相关，不再保留
+        data.pop("results", None)
+        data.update({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "ratios": {**data.get("ratios", {}), **results}
+        })
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"基线已保存: {BASELINE_PATH}")
+        return
+    
+    if regressions:
+        print(f"发现 {len(regressions)} 个回归（阈值 {args.threshold:.0%}）: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
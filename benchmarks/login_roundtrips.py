@@ -0,0 +1,134 @@
+"""
+登录数据库往返次数基准
+
+通过 pymongo 命令监听器统计每次登录发出的数据库命令数与返回字节数，
+对比旧实现（完整读取用户文档 + delete_many + insert_one）与当前实现
+（投影读取凭据 + 按学号 upsert 替换会话）。
+
+需要可连接的 MongoDB（读取 config.ini 的连接串），数据写入独立的基准数据库并在开始前与结束后删除；使用 config.ini 中配置的数据库需显式 --force。
+
+用法:
+    python -m benchmarks.login_roundtrips --logins 200
+    python -m benchmarks.login_roundtrips --database welcome_bench --level-count 40
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import bson
+from pymongo import monitoring
+
+# 命令监听器必须在客户端创建之前注册
+IGNORED_COMMANDS = {"ping", "hello", "ismaster", "isMaster", "endSessions", "buildInfo", "listIndexes"}
+
+class CommandCounter(monitoring.CommandListener):
+    """统计业务命令数与返回字节数"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.commands = {}
+        self.reply_bytes = 0
+
+    def started(self, event):
+        if event.command_name not in IGNORED_COMMANDS:
+            self.commands[event.command_name] = self.commands.get(event.command_name, 0) + 1
+
+    def succeeded(self, event):
+        if event.command_name not in IGNORED_COMMANDS:
+            self.reply_bytes += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+counter = CommandCounter()
+monitoring.register(counter)
+
+import Core.MongoDB.MongoDB as MongoDB
+from Core.MongoDB.Indexes import ensure_collection_indexes
+from Core.User.Password import password_hasher
+from Core.User.Session import session_manager
+from api.routes.auth import verify_user_credentials
+
+PASSWORD = "benchmark-password"
+
+async def legacy_login(database, stu_id: str):
+    """旧实现：完整读取用户文档，删除旧会话后插入新会话"""
+    user = await database["user"].find_one({"stuId": stu_id})
+    matched, _ = await password_hasher.verify_password(PASSWORD, user["password"])
+    assert matched
+    now = datetime.now()
+    await database["session"].delete_many({"stuId": stu_id})
+    await database["session"].insert_one({
+        "token": str(uuid.uuid4()),
+        "stuId": stu_id,
+        "role": user.get("role", "user"),
+        "createTime": now,
+        "expireTime": now + timedelta(hours=168),
+        "active": True
+    })
+
+async def current_login(database, stu_id: str):
+    """当前实现：与 /api/login 使用相同的函数"""
+    user_info = await verify_user_credentials(stu_id, PASSWORD)
+    assert user_info
+    assert await session_manager.create_session(user_info)
+
+async def run(label: str, login, database, users: list, logins: int):
+    counter.reset()
+    start = time.perf_counter()
+    for i in range(logins):
+        await login(database, users[i % len(users)])
+    elapsed = time.perf_counter() - start
+    total = sum(counter.commands.values())
+    detail = ", ".join(f"{name}={count / logins:.2f}" for name, count in sorted(counter.commands.items()))
+    print(f"{label:<10}{total / logins:>10.2f}{counter.reply_bytes / logins:>14.0f}{elapsed / logins * 1000:>12.2f}   {detail}")
+    return total / logins
+
+async def main():
+    parser = argparse.ArgumentParser(description="登录数据库往返次数基准")
+    parser.add_argument("--logins", type=int, default=200, help="每种实现的登录次数")
+    parser.add_argument("--users", type=int, default=50, help="预置用户数")
+    parser.add_argument("--level-count", type=int, default=20, help="每个用户 levelProgress 中的关卡数")
+    parser.add_argument("--database", default="welcome_bench", help="基准使用的数据库名（结束后删除）")
+    parser.add_argument("--force", action="store_true", help="允许使用 config.ini 中配置的数据库（会被删除）")
+    args = parser.parse_args()
+
+    db = MongoDB.mongodb_instance
+    if args.database == db.dbName and not args.force:
+        raise SystemExit(f"数据库 {args.database} 为 config.ini 中配置的业务库，会被删除，如确需使用请加 --force")
+
+    db.dbName = args.database
+    database = await MongoDB.get_mongodb_database()
+    await database.client.drop_database(args.database)
+    await ensure_collection_indexes(database[session_manager.collection_name], session_manager.INDEXES)
+
+    stored = await password_hasher.hash_password(PASSWORD)
+    users = [f"bench{i:05d}" for i in range(args.users)]
+    await database["user"].insert_many([{
+        "stuId": stu_id,
+        "password": stored,
+        "role": "user",
+        "points": 0,
+        "name": f"用户{stu_id}",
+        "levelProgress": {
+            f"level{j}": {"completed": True, "points": 10, "completedTime": datetime.now()}
+            for j in range(args.level_count)
+        }
+    } for stu_id in users])
+    await database["user"].create_index("stuId", unique=True)
+
+    try:
+        print(f"{'实现':<10}{'命令/登录':>10}{'返回字节/登录':>14}{'延迟(ms)':>12}   命令明细")
+        legacy = await run("旧实现", legacy_login, database, users, args.logins)
+        current = await run("当前实现", current_login, database, users, args.logins)
+        print(f"\n每次登录减少 {legacy - current:.2f} 次数据库往返")
+    finally:
+        await database.client.drop_database(args.database)
+        password_hasher.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
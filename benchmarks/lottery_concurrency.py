@@ -0,0 +1,201 @@
+"""
+抽奖并发一致性检查
+
+在独立的数据库中对限量奖品并发发起大量抽奖（直接调用 LotteryService.draw_many，--batch 为每个请求的连抽次数；
+--queue 时经过组提交队列 DrawQueue；--shards 时全部奖品拆分为分片计数器），结束后校验：
+- 限量奖品库存不为负，且 初始库存 - 剩余库存 = drawn_count = 用户奖品记录数
+- 默认奖品 drawn_count = 用户奖品记录数
+- 用户积分不为负，且 初始积分 - 剩余积分 = 抽奖消耗 × 奖品记录数 = 抽奖历史消耗之和
+- 成功次数 = 全部用户奖品记录数
+
+默认参数下总积分不足以支撑全部抽奖、限量奖品库存远小于中奖次数，用于覆盖超扣积分、库存为负与补偿路径。
+任一校验失败时以非零状态退出。需要可连接的 MongoDB（读取 config.ini 的连接串），检查数据库在开始前与结束后删除；使用 config.ini 中配置的数据库需显式 --force。
+
+用法:
+    python -m benchmarks.lottery_concurrency --draws 1000
+    python -m benchmarks.lottery_concurrency --draws 5000 --users 500 --points 8 --stock 5,10,20
+    python -m benchmarks.lottery_concurrency --draws 1000 --batch 10 --points 25
+    python -m benchmarks.lottery_concurrency --draws 5000 --users 1000 --queue --window-ms 5
+    python -m benchmarks.lottery_concurrency --draws 5000 --users 1000 --shards 8 --stock 50,100,200
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List
+
+from bson import ObjectId
+
+import Core.MongoDB.MongoDB as MongoDB
+from Core.Prize.Counters import prize_counters
+from Core.Prize.DrawQueue import draw_queue
+from Core.Prize.Lottery import lottery_service
+
+async def seed(database, users: int, points: int, stocks: List[int], weight: float):
+    """写入限量奖品、默认奖品与用户，返回 (奖品列表, 学号列表)"""
+    now = datetime.now()
+    prizes = [{
+        "_id": ObjectId(),
+        "Name": f"限量奖品{i + 1}",
+        "total": stock,
+        "weight": weight,
+        "photo": "",
+        "isActive": True,
+        "drawn_count": 0,
+        "redeemed_count": 0,
+        "createdAt": now
+    } for i, stock in enumerate(stocks)]
+    prizes.append({
+        "_id": ObjectId(),
+        "Name": "谢谢惠顾",
+        "total": 999999,
+        "weight": max(0, 100 - weight * len(stocks)),
+        "photo": "",
+        "isActive": True,
+        "isDefault": True,
+        "drawn_count": 0,
+        "redeemed_count": 0,
+        "created_at": now
+    })
+    await database["prize"].insert_many(prizes)
+    
+    stu_ids = [f"12{i:08d}" for i in range(users)]
+    await database["user"].insert_many([{
+        "stuId": stu_id,
+        "role": "user",
+        "points": points,
+        "password": "",
+        "completedLevels": [],
+        "pointHistory": [],
+        "prizes": [],
+        "creatTime": now
+    } for stu_id in stu_ids])
+    return prizes, stu_ids
+
+async def verify(database, prizes, points: int, cost: int, successes: int) -> List[str]:
+    """校验库存、计数与积分的一致性，返回问题列表"""
+    problems = []
+    records = Counter()
+    total_records = 0
+    async for user in database["user"].find({}, {"stuId": 1, "points": 1, "prizes": 1, "pointHistory": 1}):
+        user_prizes = user.get("prizes", [])
+        total_records += len(user_prizes)
+        records.update(p["prizeId"] for p in user_prizes)
+        spent = -sum(r.get("pointsChange", 0) for r in user.get("pointHistory", []))
+        if user["points"] < 0:
+            problems.append(f"用户 {user['stuId']} 积分为负: {user['points']}")
+        if points - user["points"] != cost * len(user_prizes) or spent != cost * len(user_prizes):
+            problems.append(f"用户 {user['stuId']} 积分与记录不一致: 剩余 {user['points']}，记录 {len(user_prizes)}，历史消耗 {spent}")
+    
+    for prize in prizes:
+        current = (await prize_counters.overlay([await database["prize"].find_one({"_id": prize["_id"]})]))[0]
+        drawn = current.get("drawn_count", 0)
+        count = records.get(str(prize["_id"]), 0)
+        print(f"{prize['Name']:<12}{prize['total']:>10}{current['total']:>10}{drawn:>10}{count:>10}")
+        if drawn != count:
+            problems.append(f"{prize['Name']} drawn_count={drawn}，用户记录 {count}")
+        if not prize.get("isDefault"):
+            if current["total"] < 0:
+                problems.append(f"{prize['Name']} 库存为负: {current['total']}")
+            if prize["total"] - current["total"] != drawn:
+                problems.append(f"{prize['Name']} 库存扣减 {prize['total'] - current['total']} 与 drawn_count {drawn} 不一致")
+    
+    if total_records != successes:
+        problems.append(f"成功抽奖 {successes} 次，用户奖品记录 {total_records} 条")
+    return problems
+
+async def main():
+    parser = argparse.ArgumentParser(description="抽奖并发一致性检查")
+    parser.add_argument("--draws", type=int, default=1000, help="并发抽奖次数")
+    parser.add_argument("--users", type=int, default=200, help="参与抽奖的用户数")
+    parser.add_argument("--points", type=int, default=4, help="每名用户的初始积分")
+    parser.add_argument("--cost", type=int, default=1, help="单次抽奖消耗积分")
+    parser.add_argument("--batch", type=int, default=1, help="每个请求的连抽次数")
+    parser.add_argument("--queue", action="store_true", help="经过组提交队列抽奖（等同 [Lottery] mode = queue）")
+    parser.add_argument("--window-ms", type=float, default=None, help="组提交合并窗口（毫秒），默认读取配置")
+    parser.add_argument("--stock", default="3,5,10", help="各限量奖品的初始库存（逗号分隔）")
+    parser.add_argument("--shards", type=int, default=0, help="每个奖品的计数分片数（0 为不分片）")
+    parser.add_argument("--weight", type=float, default=25.0, help="每个限量奖品的权重")
+    parser.add_argument("--database", default="welcome_lottery_check", help="检查使用的数据库名（结束后删除）")
+    parser.add_argument("--keep", action="store_true", help="结束后保留数据库")
+    parser.add_argument("--force", action="store_true", help="允许使用 config.ini 中配置的数据库（会被删除）")
+    parser.add_argument("--seed", type=int, default=2025, help="随机种子")
+    args = parser.parse_args()
+    
+    db = MongoDB.mongodb_instance
+    if args.database == db.dbName and not args.force:
+        raise SystemExit(f"数据库 {args.database} 为 config.ini 中配置的业务库，会被删除，如确需使用请加 --force")
+    
+    stocks = [int(s) for s in args.stock.split(",") if s.strip()]
+    if args.weight * len(stocks) > 100:
+        raise SystemExit("限量奖品权重之和不能超过 100")
+    
+    random.seed(args.seed)
+    db.dbName = args.database
+    database = await MongoDB.get_mongodb_database()
+    await database.client.drop_database(args.database)
+    
+    problems = []
+    try:
+        prizes, stu_ids = await seed(database, args.users, args.points, stocks, args.weight)
+        if args.shards > 1:
+            for prize in prizes:
+                await prize_counters.set_shards(database["prize"], prize["_id"], args.shards)
+        batch = max(1, args.batch)
+        targets = [stu_ids[i % len(stu_ids)] for i in range(args.draws // batch)]
+        random.shuffle(targets)
+    
+        if args.queue:
+            draw_queue.mode = "queue"
+            if args.window_ms is not None:
+                draw_queue.window = args.window_ms / 1000
+            await draw_queue.start()
+    
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(draw_queue.draw_many(stu_id, args.cost, batch) for stu_id in targets),
+            return_exceptions=True
+        )
+        elapsed = time.perf_counter() - start
+        await draw_queue.stop()
+    
+        outcomes = Counter()
+        for result in results:
+            if isinstance(result, Exception):
+                outcomes[f"异常 {type(result).__name__}"] += 1
+            elif result["success"]:
+                for prize in result["prizes"]:
+                    outcomes["默认奖品" if prize.get("isDefault") else "中奖"] += 1
+            else:
+                outcomes[result["reason"]] += batch
+        successes = outcomes["默认奖品"] + outcomes["中奖"]
+    
+        draws = len(targets) * batch
+        print(f"{draws} 次并发抽奖（{len(targets)} 个请求），耗时 {elapsed:.2f}s（{draws / elapsed:.0f} 次/秒）")
+        for name, count in outcomes.most_common():
+            print(f"  {name:<20}{count:>8}")
+        print(f"  {'库存冲突 / 补偿':<20}{lottery_service.reserve_conflicts:>8} / {lottery_service.compensations}")
+        if args.queue:
+            stats = draw_queue.get_stats()
+            print(f"  {'提交批次 / 平均批大小':<20}{stats['batches']:>8} / {stats['avgBatch']}（最大 {stats['maxBatch']}）")
+        print()
+        print(f"{'奖品':<12}{'初始库存':>10}{'剩余库存':>10}{'抽中数':>10}{'用户记录':>10}")
+        problems += await verify(database, prizes, args.points, args.cost, successes)
+        if any(isinstance(result, Exception) for result in results):
+            problems.append("抽奖过程中出现异常")
+    finally:
+        if not args.keep:
+            await database.client.drop_database(args.database)
+        await MongoDB.mongodb_instance.disconnect()
+    
+    print()
+    if problems:
+        for problem in problems[:20]:
+            print(f"✗ {problem}")
+        raise SystemExit(f"一致性检查失败，共 {len(problems)} 个问题")
+    print("✓ 一致性检查通过")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""
+MongoDB 访问路径吞吐基准
+
+在 N 个并发协程下对比两种获取集合的方式：
+- 加锁路径（旧实现）：每次调用都进入 MongoDB._lock 再返回数据库
+- 快速路径（当前实现）：管理器复用已解析的集合句柄，已连接时不加锁
+
+分别测量只解析集合（纯开销）与解析后执行一次 find_one（含一次往返）的 ops/秒。
+需要可连接的 MongoDB（读取 config.ini 的连接串）。
+
+用法:
+    python -m benchmarks.mongo_fastpath --concurrency 200 --ops 50000
+"""
+import argparse
+import asyncio
+import time
+
+import Core.MongoDB.MongoDB as MongoDB
+from Core.User.User import User
+
+async def locked_get_collection(name: str):
+    """旧实现：每次调用都经过连接锁"""
+    db = MongoDB.mongodb_instance
+    async with db._lock:
+        if db._client is None or not db._initialized:
+            raise ConnectionError("MongoDB未连接")
+    return db._database[name]
+
+async def run(label: str, get_collection, ops: int, concurrency: int, round_trip: bool) -> float:
+    remaining = ops
+    
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            collection = await get_collection()
+            if round_trip:
+                await collection.find_one({"stuId": "benchmark-missing"}, {"_id": 1})
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    rate = ops / elapsed
+    print(f"{label:<28}{rate:>14.0f}{elapsed:>10.2f}")
+    return rate
+
+async def main():
+    parser = argparse.ArgumentParser(description="MongoDB 访问路径吞吐基准")
+    parser.add_argument("--concurrency", type=int, default=200, help="并发协程数")
+    parser.add_argument("--ops", type=int, default=50000, help="只解析集合时的操作次数")
+    parser.add_argument("--query-ops", type=int, default=5000, help="含 find_one 往返时的操作次数")
+    args = parser.parse_args()
+    
+    if not await MongoDB.mongodb_instance.connect():
+        raise SystemExit("MongoDB连接失败")
+    user_manager = User()
+    
+    print(f"{'路径':<28}{'ops/秒':>14}{'耗时(s)':>10}")
+    before = await run("加锁路径 (解析集合)", lambda: locked_get_collection("user"), args.ops, args.concurrency, False)
+    after = await run("快速路径 (解析集合)", user_manager._get_collection, args.ops, args.concurrency, False)
+    print(f"{'':<28}{after / before:>13.1f}x")
+    before = await run("加锁路径 (find_one)", lambda: locked_get_collection("user"), args.query_ops, args.concurrency, True)
+    after = await run("快速路径 (find_one)", user_manager._get_collection, args.query_ops, args.concurrency, True)
+    print(f"{'':<28}{after / before:>13.1f}x")
+    
+    await MongoDB.mongodb_instance.disconnect()
+
+if __name__ == "__main__":
+    asyncio.run(main())
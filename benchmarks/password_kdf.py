@@ -0,0 +1,101 @@
+"""
+密码哈希登录吞吐基准
+
+对每一档 KDF 成本参数模拟一次登录风暴：并发执行 N 次密码校验，
+统计吞吐量、延迟分位数以及事件循环最大停顿时间（衡量 KDF 是否阻塞其他协程）。
+
+用法:
+    python -m benchmarks.password_kdf --logins 200 --concurrency 50
+    python -m benchmarks.password_kdf --executor process --workers 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from Core.User.Password import PasswordHasher, legacy_sha256
+
+COST_SETTINGS = [
+    ("sha256 (旧版)", "sha256", {}),
+    ("pbkdf2 60k", "pbkdf2_sha256", {"iterations": 60000}),
+    ("pbkdf2 120k", "pbkdf2_sha256", {"iterations": 120000}),
+    ("pbkdf2 310k", "pbkdf2_sha256", {"iterations": 310000}),
+    ("scrypt n=2^14", "scrypt", {"n": 16384, "r": 8, "p": 1}),
+    ("scrypt n=2^15", "scrypt", {"n": 32768, "r": 8, "p": 1}),
+]
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """在后台测量事件循环的最大调度延迟（秒）"""
+    max_lag = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - start - interval)
+    return max_lag
+
+async def run_setting(hasher: PasswordHasher, logins: int, concurrency: int) -> dict:
+    stored = await hasher.hash_password("benchmark-password")
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def login():
+        async with semaphore:
+            start = time.perf_counter()
+            matched, _ = await hasher.verify_password("benchmark-password", stored)
+            assert matched
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    max_lag = await lag_task
+
+    latencies.sort()
+    return {
+        "throughput": logins / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_lag": max_lag * 1000
+    }
+
+async def run_inline_baseline(logins: int) -> dict:
+    """旧实现：在事件循环内直接计算 sha256"""
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    for _ in range(logins):
+        legacy_sha256("benchmark-password", "salt")
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return {"throughput": logins / elapsed, "p50": 0.0, "p95": 0.0, "max_lag": await lag_task * 1000}
+
+async def main():
+    parser = argparse.ArgumentParser(description="密码哈希登录吞吐基准")
+    parser.add_argument("--logins", type=int, default=200, help="每档模拟的登录次数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发登录数")
+    parser.add_argument("--workers", type=int, default=4, help="哈希工作池大小")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    args = parser.parse_args()
+
+    print(f"{'成本档位':<16}{'登录/秒':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'最大循环停顿(ms)':>18}")
+    result = await run_inline_baseline(args.logins)
+    print(f"{'sha256 内联':<16}{result['throughput']:>10.1f}{result['p50']:>10.2f}{result['p95']:>10.2f}{result['max_lag']:>18.2f}")
+
+    for label, algorithm, params in COST_SETTINGS:
+        hasher = PasswordHasher()
+        hasher.algorithm = algorithm
+        hasher.params.update(params)
+        hasher.workers = args.workers
+        hasher.executor_type = args.executor
+        try:
+            result = await run_setting(hasher, args.logins, args.concurrency)
+        finally:
+            hasher.shutdown()
+        print(f"{label:<16}{result['throughput']:>10.1f}{result['p50']:>10.2f}{result['p95']:>10.2f}{result['max_lag']:>18.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,296 @@
+"""
+迎新日负载模拟
+
+在独立的数据库中按迎新当天的流量形态驱动应用（直接调用 ASGI 应用，不经过网络与 uvicorn）：
+1. 批量注册：N 名新生并发调用 /api/register
+2. 登录潮：全部新生并发调用 /api/login
+3. 混合阶段（持续 --duration 秒）：
+   - 管理员在关卡点扫码发放积分  POST /api/points/level
+   - 新生轮询个人信息            GET  /api/user/info
+   - 新生抽奖                    POST /api/lottery/draw
+   - 超级管理员轮询看板          GET  /api/admin/dashboard/stats/overview
+
+输出每个接口的吞吐量、p50/p95/p99 延迟与错误率。业务性拒绝（已完成关卡、积分不足等 400）单独计数，不算作错误。
+结果是单进程上限，多 worker 部署的容量约为该结果乘以 worker 数（受 MongoDB 限制）。
+需要可连接的 MongoDB（读取 config.ini 的连接串），基准数据库在开始前与结束后删除；使用 config.ini 中配置的数据库需显式 --force。
+
+用法:
+    python -m benchmarks.welcome_day --students 500 --duration 30
+    python -m benchmarks.welcome_day --students 2000 --concurrency 200 --seed 7
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+import Core.MongoDB.MongoDB as MongoDB
+from Core.User.Password import password_hasher
+
+PASSWORD = "welcome-2025"
+
+class Recorder:
+    """按接口记录延迟与状态码"""
+    
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+        self.elapsed: Dict[str, float] = {}
+    
+    def record(self, name: str, latency: float, status: int):
+        self.latencies.setdefault(name, []).append(latency)
+        counts = self.statuses.setdefault(name, {})
+        counts[status] = counts.get(status, 0) + 1
+    
+    def report(self, phase_elapsed: Dict[str, float]):
+        print(f"{'接口':<32}{'请求数':>8}{'req/s':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'4xx业务':>9}{'错误率':>8}")
+        for name, latencies in self.latencies.items():
+            latencies.sort()
+            count = len(latencies)
+            statuses = self.statuses[name]
+            rejected = sum(n for status, n in statuses.items() if status == 400)
+            errors = sum(n for status, n in statuses.items() if status != 400 and status >= 400)
+            elapsed = phase_elapsed.get(name, 1.0)
+            print(
+                f"{name:<32}{count:>8}{count / elapsed:>9.1f}"
+                f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}"
+                f"{rejected:>9}{errors / count:>8.1%}"
+            )
+            if errors:
+                print(f"{'':<32}状态码分布: {dict(sorted(statuses.items()))}")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index] * 1000
+
+class AsgiClient:
+    """直接调用 ASGI 应用的最小 HTTP 客户端"""
+    
+    def __init__(self, app, recorder: Recorder):
+        self.app = app
+        self.recorder = recorder
+    
+    async def request(self, name: str, method: str, path: str, body: Optional[dict] = None,
+                      token: Optional[str] = None) -> Tuple[int, Dict[str, str], Any]:
+        path, _, query = path.partition("?")
+        payload = json.dumps(body).encode() if body is not None else b""
+        headers = [(b"host", b"bench"), (b"content-type", b"application/json"),
+                   (b"content-length", str(len(payload)).encode())]
+        if token:
+            headers.append((b"cookie", f"session_token={token}".encode()))
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": query.encode(), "root_path": "", "headers": headers,
+            "client": ("127.0.0.1", 50000), "server": ("bench", 80), "app": self.app
+        }
+        sent = False
+        
+        async def receive():
+            nonlocal sent
+            if sent:
+                await asyncio.sleep(3600)
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        
+        status = 0
+        response_headers: Dict[str, str] = {}
+        chunks = []
+        
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for key, value in message.get("headers", []):
+                    response_headers.setdefault(key.decode().lower(), value.decode())
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+        
+        start = time.perf_counter()
+        await self.app(scope, receive, send)
+        self.recorder.record(name, time.perf_counter() - start, status)
+        
+        content = b"".join(chunks)
+        try:
+            data = json.loads(content) if content else None
+        except ValueError:
+            data = None
+        return status, response_headers, data
+
+class Lifespan:
+    """通过 ASGI lifespan 协议执行应用的启动与关闭钩子"""
+    
+    def __init__(self, app):
+        self.app = app
+        self._receive: asyncio.Queue = asyncio.Queue()
+        self._send: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _call(self, event: str):
+        await self._receive.put({"type": f"lifespan.{event}"})
+        message = await self._send.get()
+        if message["type"] != f"lifespan.{event}.complete":
+            raise RuntimeError(f"应用 {event} 失败: {message.get('message', message['type'])}")
+    
+    async def startup(self):
+        self._task = asyncio.create_task(self.app(
+            {"type": "lifespan", "asgi": {"version": "3.0"}}, self._receive.get, self._send.put
+        ))
+        await self._call("startup")
+    
+    async def shutdown(self):
+        if self._task is not None:
+            await self._call("shutdown")
+            await self._task
+
+def extract_token(headers: Dict[str, str]) -> Optional[str]:
+    cookie = headers.get("set-cookie", "")
+    if cookie.startswith("session_token="):
+        return cookie.split(";", 1)[0].split("=", 1)[1].strip('"')
+    return None
+
+async def run_bounded(concurrency: int, coroutines):
+    """以固定并发执行一组协程"""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+    
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+async def seed_event(database, levels: int, prizes: int) -> Tuple[List[str], str]:
+    """写入关卡、奖品与超级管理员，返回关卡ID列表与管理员学号（默认奖品由启动钩子创建）"""
+    now = datetime.now()
+    level_ids = [ObjectId() for _ in range(levels)]
+    await database["level"].insert_many([{
+        "_id": level_id, "name": f"关卡{i + 1}", "points": random.choice([1, 2, 3]),
+        "isActive": True, "createdAt": now
+    } for i, level_id in enumerate(level_ids)])
+    
+    weights = [round(60 / prizes, 2)] * prizes
+    await database["prize"].insert_many([{
+        "Name": f"奖品{i + 1}", "weight": weight, "total": 50, "drawn_count": 0,
+        "isActive": True, "isDefault": False, "createdAt": now
+    } for i, weight in enumerate(weights)])
+    
+    admin_stu_id = "admin-bench"
+    await database["user"].insert_one({
+        "stuId": admin_stu_id, "password": await password_hasher.hash_password(PASSWORD),
+        "role": "super_admin", "name": "压测管理员", "points": 0, "creatTime": now
+    })
+    return [str(level_id) for level_id in level_ids], admin_stu_id
+
+async def main():
+    parser = argparse.ArgumentParser(description="迎新日负载模拟")
+    parser.add_argument("--students", type=int, default=500, help="新生人数")
+    parser.add_argument("--admins", type=int, default=8, help="关卡点扫码管理员数（并发）")
+    parser.add_argument("--levels", type=int, default=8, help="关卡数")
+    parser.add_argument("--prizes", type=int, default=6, help="奖品种类数")
+    parser.add_argument("--concurrency", type=int, default=100, help="注册/登录阶段并发数")
+    parser.add_argument("--pollers", type=int, default=50, help="混合阶段轮询个人信息的并发新生数")
+    parser.add_argument("--drawers", type=int, default=20, help="混合阶段抽奖的并发新生数")
+    parser.add_argument("--dashboards", type=int, default=2, help="轮询看板的并发管理员数")
+    parser.add_argument("--duration", type=float, default=30.0, help="混合阶段持续时间（秒）")
+    parser.add_argument("--database", default="welcome_loadtest", help="压测使用的数据库名（结束后删除）")
+    parser.add_argument("--force", action="store_true", help="允许使用 config.ini 中配置的数据库（会被删除）")
+    parser.add_argument("--seed", type=int, default=2025, help="随机种子")
+    args = parser.parse_args()
+    
+    db = MongoDB.mongodb_instance
+    if args.database == db.dbName and not args.force:
+        raise SystemExit(f"数据库 {args.database} 为 config.ini 中配置的业务库，会被删除，如确需使用请加 --force")
+    
+    random.seed(args.seed)
+    db.dbName = args.database
+    database = await MongoDB.get_mongodb_database()
+    await database.client.drop_database(args.database)
+    
+    from app import app
+    lifespan = Lifespan(app)
+    await lifespan.startup()
+    recorder = Recorder()
+    client = AsgiClient(app, recorder)
+    phase_elapsed: Dict[str, float] = {}
+    
+    try:
+        level_ids, admin_stu_id = await seed_event(database, args.levels, args.prizes)
+        students = [f"12{2025000000 + i}" for i in range(args.students)]
+        
+        # 1. 批量注册
+        start = time.perf_counter()
+        await run_bounded(args.concurrency, (
+            client.request("POST /api/register", "POST", "/api/register",
+                           {"stuId": stu_id, "password": PASSWORD, "name": f"新生{stu_id[-4:]}"})
+            for stu_id in students
+        ))
+        phase_elapsed["POST /api/register"] = time.perf_counter() - start
+        
+        # 2. 登录潮
+        start = time.perf_counter()
+        results = await run_bounded(args.concurrency, (
+            client.request("POST /api/login", "POST", "/api/login", {"stuId": stu_id, "password": PASSWORD})
+            for stu_id in students
+        ))
+        phase_elapsed["POST /api/login"] = time.perf_counter() - start
+        tokens = {stu_id: extract_token(headers) for stu_id, (_, headers, _) in zip(students, results)}
+        tokens = {stu_id: token for stu_id, token in tokens.items() if token}
+        _, headers, _ = await client.request("POST /api/login (admin)", "POST", "/api/login",
+                                             {"stuId": admin_stu_id, "password": PASSWORD})
+        admin_token = extract_token(headers)
+        if not tokens or not admin_token:
+            raise SystemExit("登录阶段没有获得会话，无法继续")
+        logged_in = list(tokens)
+        
+        # 3. 混合阶段
+        deadline = time.perf_counter() + args.duration
+        
+        async def level_station():
+            while time.perf_counter() < deadline:
+                await client.request("POST /api/points/level", "POST", "/api/points/level",
+                                     {"stuId": random.choice(logged_in), "levelId": random.choice(level_ids)},
+                                     token=admin_token)
+        
+        async def info_poller():
+            while time.perf_counter() < deadline:
+                stu_id = random.choice(logged_in)
+                await client.request("GET /api/user/info", "GET", "/api/user/info", token=tokens[stu_id])
+                await asyncio.sleep(random.uniform(0.5, 1.5))
+        
+        async def drawer():
+            while time.perf_counter() < deadline:
+                stu_id = random.choice(logged_in)
+                await client.request("POST /api/lottery/draw", "POST", "/api/lottery/draw", token=tokens[stu_id])
+        
+        async def dashboard():
+            while time.perf_counter() < deadline:
+                await client.request("GET /api/admin/dashboard/stats/overview", "GET",
+                                     "/api/admin/dashboard/stats/overview", token=admin_token)
+                await asyncio.sleep(2.0)
+        
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(level_station() for _ in range(args.admins)),
+            *(info_poller() for _ in range(args.pollers)),
+            *(drawer() for _ in range(args.drawers)),
+            *(dashboard() for _ in range(args.dashboards))
+        )
+        mixed_elapsed = time.perf_counter() - start
+        for name in ("POST /api/points/level", "GET /api/user/info", "POST /api/lottery/draw",
+                     "GET /api/admin/dashboard/stats/overview"):
+            phase_elapsed[name] = mixed_elapsed
+        
+        print(f"\n新生 {args.students} 人，混合阶段 {mixed_elapsed:.1f} 秒，随机种子 {args.seed}\n")
+        recorder.report(phase_elapsed)
+    finally:
+        await lifespan.shutdown()
+        await database.client.drop_database(args.database)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,14 +9,20 @@ from fastapi.responses import RedirectResponse
 
 from Core.User.User import User
 from Core.User.Session import session_manager
+from Core.User.Password import password_hasher
 from Core.User.Permission import Permission
 from Core.Prize.Prize import Prize
+from Core.Prize.DrawQueue import draw_queue
 from Core.Level.Level import Level
 from Core.Common.SystemSettings import system_settings
 from Core.MongoDB.MongoDB import mongodb_instance
+from Core.MongoDB.Indexes import ensure_all_indexes
+from Core.Common.Config import Config
+from Core.Common.Logging import setup_logging, stop_logging
+from api.middleware import DbAccountingMiddleware, MetricsMiddleware, RequestIdMiddleware
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
+# 配置日志（后台线程输出，见 [Logging] 配置段）
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # 实例化各个管理器
@@ -32,6 +38,18 @@ def create_app() -> FastAPI:
         version="1.0.0",
     )
     
+    # 请求级数据库访问统计，调试模式下输出 Server-Timing / X-DB-Ops 响应头
+    app.add_middleware(
+        DbAccountingMiddleware,
+        expose_headers=Config().get_bool('System', 'debug', False)
+    )
+    
+    # 按路由模板记录请求数、状态码与耗时直方图，由 /metrics 输出
+    app.add_middleware(MetricsMiddleware)
+    
+    # 最外层：为每个请求分配 request_id，写入日志与 X-Request-ID 响应头
+    app.add_middleware(RequestIdMiddleware)
+    
     # 静态文件托管
     app.mount("/Pages", StaticFiles(directory="Pages"), name="pages")
     app.mount("/Assest", StaticFiles(directory="Assest"), name="assets")
@@ -41,12 +59,43 @@ def create_app() -> FastAPI:
     async def startup_event():
         """应用启动时执行的初始化任务"""
         logger.info("正在初始化系统...")
+        
+        # 启动时建立连接，之后的数据库访问不再经过连接锁
+        if not await mongodb_instance.connect():
+            logger.error("MongoDB连接失败，将在首次访问数据库时重试")
+        
         try:
             # 确保默认奖品存在
             await prize_manager.ensure_default_prize()
             logger.info("默认奖品初始化完成")
         except Exception as e:
             logger.error(f"初始化默认奖品失败: {e}")
+        
+        # 创建各集合声明的索引（见各管理器的 INDEXES）
+        await ensure_all_indexes()
+        
+        # 过期会话清理
+        await session_manager.start_sweeper()
+        
+        # 签名会话模式下启动吊销表同步
+        await session_manager.start_revocation_sync()
+        
+        # 系统设置：补齐默认值、加载缓存并启动版本轮询
+        await system_settings.initialize_default_settings()
+        await system_settings.start_sync()
+        
+        # [Lottery] mode = queue 时启动抽奖组提交队列
+        await draw_queue.start()
+    
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """应用关闭时停止后台任务"""
+        await draw_queue.stop()
+        await system_settings.stop_sync()
+        await session_manager.stop_revocation_sync()
+        await session_manager.stop_sweeper()
+        password_hasher.shutdown()
+        stop_logging()
     
     return app
 
@@ -55,6 +104,8 @@ def setup_routes(app: FastAPI):
     from api import auth_router, members_router, levels_router, prizes_router
     from api.routes.prizes import lottery_router
     from api.routes.dashboard import router as dashboard_router
+    from api.routes.system import router as system_router
+    from api.routes.metrics import router as metrics_router
     
     # 注册API路由
     app.include_router(auth_router, tags=["认证"])
@@ -63,6 +114,8 @@ def setup_routes(app: FastAPI):
     app.include_router(prizes_router, tags=["奖品管理"])
     app.include_router(lottery_router, tags=["抽奖配置"])
     app.include_router(dashboard_router, tags=["汇总看板"])
+    app.include_router(system_router, tags=["系统状态"])
+    app.include_router(metrics_router, tags=["系统状态"])
 
 def get_managers():
     """获取管理器实例"""
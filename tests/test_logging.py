@@ -0,0 +1,29 @@
+"""
+日志队列启停测试
+
+确认 stop_logging 之后根日志器不再挂着无人消费的 QueueHandler，后续记录仍能输出。运行: python -m pytest -q
+"""
+import logging
+
+from Core.Common import Logging
+
+def test_records_after_stop_logging_are_written(capsys):
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    try:
+        Logging.setup_logging()
+        assert Logging._listener is not None
+        logging.warning("before stop")
+        Logging.stop_logging()
+        logging.warning("after stop")
+
+        assert not any(isinstance(handler, logging.handlers.QueueHandler) for handler in root.handlers)
+        output = capsys.readouterr().err
+        assert "before stop" in output
+        assert "after stop" in output
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
@@ -0,0 +1,187 @@
+"""
+抽奖测试
+
+- 加权选择：线性扫描 select_weighted_prize 与别名表 PoolSnapshot 对缺省权重的口径一致
+- 库存与积分：用内存中的 prize、user 集合并发抽奖，确认不超卖，积分不足或不存在的用户不预留库存
+
+运行: python -m pytest -q
+"""
+import asyncio
+import copy
+import random
+from types import SimpleNamespace
+
+from Core.Prize.DrawQueue import DrawQueue, DrawRequest
+from Core.Prize.Lottery import LotteryService, PoolSnapshot, select_weighted_prize
+
+class MemoryCollection:
+    """抽奖用到的最小集合接口；每次操作让出一次事件循环以交错并发请求，writes 记录写操作次数"""
+
+    def __init__(self, docs):
+        self.docs = copy.deepcopy(docs)
+        self.writes = 0
+
+    def _match(self, doc, query):
+        for field, condition in query.items():
+            value = doc.get(field)
+            if isinstance(condition, dict):
+                if "$gte" in condition and not (value is not None and value >= condition["$gte"]):
+                    return False
+                if "$in" in condition and value not in condition["$in"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def _first(self, query):
+        return next((doc for doc in self.docs if self._match(doc, query)), None)
+
+    def _apply(self, doc, update):
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        for field, values in update.get("$push", {}).items():
+            doc.setdefault(field, []).extend(copy.deepcopy(values["$each"]))
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(0)
+        doc = self._first(query)
+        return copy.deepcopy(doc) if doc else None
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=False):
+        await asyncio.sleep(0)
+        self.writes += 1
+        doc = self._first(query)
+        if doc is None:
+            return None
+        self._apply(doc, update)
+        return copy.deepcopy(doc)
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(0)
+        self.writes += 1
+        doc = self._first(query)
+        if doc is not None:
+            self._apply(doc, update)
+        return SimpleNamespace(matched_count=1 if doc else 0)
+
+    def find(self, query, projection=None):
+        docs = [copy.deepcopy(doc) for doc in self.docs if self._match(doc, query)]
+
+        async def iterate():
+            await asyncio.sleep(0)
+            for doc in docs:
+                yield doc
+        return iterate()
+
+class MemoryPool:
+    """LotteryService 用到的奖品池接口，快照在创建时构建一次"""
+
+    def __init__(self, prizes):
+        self.collection = MemoryCollection(prizes)
+        self.snapshot = PoolSnapshot(1, copy.deepcopy(prizes))
+
+    async def get_collection(self):
+        return self.collection
+
+    async def get_snapshot(self):
+        return self.snapshot
+
+    async def mark_depleted(self, snapshot, prize_id):
+        snapshot.depleted.add(prize_id)
+
+    async def invalidate(self, broadcast=True):
+        pass
+
+def make_service(prizes, users):
+    """创建使用内存集合的抽奖服务"""
+    service = LotteryService(MemoryPool(prizes))
+    user_collection = MemoryCollection(users)
+
+    async def get_collection():
+        return user_collection
+    service.user_manager.get_collection = get_collection
+    return service, service.pool.collection, user_collection
+
+def stock(collection, prize_id):
+    return next(doc for doc in collection.docs if doc["_id"] == prize_id)
+
+PRIZES = [
+    {"_id": "p1", "name": "限量奖品1", "weight": 40, "total": 3, "drawn_count": 0},
+    {"_id": "p2", "name": "限量奖品2", "weight": 40, "total": 5, "drawn_count": 0},
+    {"_id": "default", "name": "谢谢惠顾", "weight": 20, "total": 999999, "drawn_count": 0, "isDefault": True},
+]
+
+def test_missing_weight_counts_as_zero():
+    prizes = [{"_id": "a"}, {"_id": "b", "weight": None}, {"_id": "c", "weight": 30}]
+    assert [select_weighted_prize(prizes, value)["_id"] for value in (0.0, 0.5, 30)] == ["c", "c", "c"]
+
+    snapshot = PoolSnapshot(None, [{**prize, "total": 1} for prize in prizes])
+    assert snapshot.total_weight == 30
+    rng = random.Random(2025)
+    assert {snapshot.draw(rng)["_id"] for _ in range(200)} == {"c"}
+
+def test_linear_fallback_matches_alias_table_weights():
+    prizes = [{"_id": "a", "total": 1}, {"_id": "b", "weight": 10, "total": 1},
+              {"_id": "c", "weight": 30, "total": 1}, {"_id": "d", "weight": 60, "total": 1}]
+    snapshot = PoolSnapshot(None, prizes)
+    rng = random.Random(2025)
+    # 排除 d 后走线性扫描：a 的权重按0计，不会被抽中，b:c 约为 1:3
+    drawn = [snapshot.draw(rng, exclude={"d"})["_id"] for _ in range(4000)]
+    assert "a" not in drawn
+    assert 0.2 < drawn.count("b") / len(drawn) < 0.3
+
+def test_users_without_points_do_not_reserve_stock():
+    async def scenario():
+        service, prizes, users = make_service(
+            [{"_id": "p1", "name": "限量奖品1", "weight": 100, "total": 1, "drawn_count": 0}],
+            [{"stuId": "poor", "points": 2}, {"stuId": "rich", "points": 3}]
+        )
+        results = await asyncio.gather(
+            service.draw_many("poor", 1, 3),
+            service.draw("nobody", 1),
+            *(service.draw("poor", 3) for _ in range(5))
+        )
+        assert [result["reason"] for result in results] == ["insufficient_points", "user_not_found"] + ["insufficient_points"] * 5
+        assert prizes.writes == 0 and users.writes == 0
+        assert stock(prizes, "p1")["total"] == 1
+
+        result = await service.draw("rich", 3)
+        assert result["success"] and result["prize"]["_id"] == "p1"
+        assert stock(prizes, "p1")["total"] == 0
+        assert service.compensations == 0
+
+    asyncio.run(scenario())
+
+def test_queue_batch_skips_users_without_points():
+    async def scenario():
+        service, prizes, users = make_service(PRIZES, [{"stuId": "poor", "points": 0}])
+        queue = DrawQueue(service)
+        loop = asyncio.get_running_loop()
+        batch = [DrawRequest("poor", 1, 2, loop.create_future()), DrawRequest("nobody", 1, 1, loop.create_future())]
+        await queue._commit(batch)
+        assert [request.future.result()["reason"] for request in batch] == ["insufficient_points", "user_not_found"]
+        assert prizes.writes == 0 and users.writes == 0
+
+    asyncio.run(scenario())
+
+def test_concurrent_draws_do_not_oversell():
+    async def scenario():
+        users = [{"stuId": f"u{i:02d}", "points": 2} for i in range(30)] + [{"stuId": f"poor{i}", "points": 0} for i in range(10)]
+        service, prizes, user_collection = make_service(PRIZES, users)
+        requests = [(user["stuId"], 1) for user in users for _ in range(2)]
+        random.Random(2025).shuffle(requests)
+        results = await asyncio.gather(*(service.draw(stu_id, cost) for stu_id, cost in requests))
+
+        succeeded = [result for result in results if result["success"]]
+        assert len(succeeded) == 60
+        assert {result["reason"] for result in results if not result["success"]} == {"insufficient_points"}
+        for prize in PRIZES:
+            doc = stock(prizes, prize["_id"])
+            records = sum(1 for user in user_collection.docs for record in user.get("prizes", []) if record["prizeId"] == prize["_id"])
+            assert doc["total"] >= 0
+            assert doc["drawn_count"] == records
+            if not prize.get("isDefault"):
+                assert doc["total"] + records == prize["total"]
+        assert all(user["points"] >= 0 for user in user_collection.docs)
+
+    asyncio.run(scenario())
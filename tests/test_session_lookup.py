@@ -0,0 +1,58 @@
+"""
+会话查找负缓存测试
+
+数据库短暂出错时不能把有效token写入负缓存，只有确认不存在的token才会被缓存拒绝。运行: python -m pytest -q
+"""
+import asyncio
+
+from Core.User.Session import Session
+
+TOKEN = "0f8fad5b-d9cb-469f-a165-70867728950e"
+
+class FlakyCollection:
+    """按 token 查找会话，failures 次调用前抛出异常"""
+
+    def __init__(self, sessions, failures=0):
+        self.sessions = sessions
+        self.failures = failures
+        self.lookups = 0
+
+    async def find_one(self, query, projection=None):
+        self.lookups += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        session = self.sessions.get(query["token"])
+        return dict(session) if session else None
+
+def make_manager(collection):
+    manager = Session()
+
+    async def get_collection():
+        return collection
+    manager._get_collection = get_collection
+    return manager
+
+SESSION = {"stuId": "2025000001", "principal": {"role": "user", "perm": 0, "name": "测试成员"}, "principalVersion": 0}
+
+def test_database_error_does_not_negative_cache_valid_token():
+    async def scenario():
+        collection = FlakyCollection({TOKEN: SESSION}, failures=1)
+        manager = make_manager(collection)
+        assert await manager.get_user_by_session(TOKEN) is None
+        principal = await manager.get_user_by_session(TOKEN)
+        assert principal["stuId"] == SESSION["stuId"]
+        assert collection.lookups == 2
+
+    asyncio.run(scenario())
+
+def test_missing_token_is_negative_cached():
+    async def scenario():
+        collection = FlakyCollection({})
+        manager = make_manager(collection)
+        assert await manager.get_user_by_session(TOKEN) is None
+        assert await manager.get_user_by_session(TOKEN) is None
+        assert collection.lookups == 1
+        assert manager.rejected_cached == 1
+
+    asyncio.run(scenario())
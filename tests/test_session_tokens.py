@@ -0,0 +1,126 @@
+"""
+签名会话token吊销测试
+
+两个 Session 实例共用内存中的 session 集合，模拟多 worker：一个 worker 新签发的token在其他 worker 同步前即可使用，
+登录、登出后早于吊销时间签发的旧token在同步后被拒绝。运行: python -m pytest -q
+"""
+import asyncio
+import copy
+from datetime import datetime
+from types import SimpleNamespace
+
+from Core.User.Session import Session, to_millis
+
+class MemoryCollection:
+    """session 集合用到的最小接口"""
+
+    def __init__(self):
+        self.docs = []
+
+    def _match(self, doc, query):
+        for field, condition in query.items():
+            value = doc.get(field)
+            if isinstance(condition, dict):
+                if "$gt" in condition and not (value is not None and value > condition["$gt"]):
+                    return False
+                if "$gte" in condition and not (value is not None and value >= condition["$gte"]):
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def replace_one(self, query, document, upsert=False):
+        self.docs = [doc for doc in self.docs if not self._match(doc, query)]
+        self.docs.append(copy.deepcopy(document))
+        return SimpleNamespace(matched_count=1)
+
+    async def update_many(self, query, update):
+        matched = [doc for doc in self.docs if self._match(doc, query)]
+        for doc in matched:
+            doc.update(update.get("$set", {}))
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched))
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if self._match(doc, query):
+                doc.update(update.get("$set", {}))
+                return SimpleNamespace(matched_count=1)
+        return SimpleNamespace(matched_count=0)
+
+    def find(self, query, projection=None):
+        docs = [copy.deepcopy(doc) for doc in self.docs if self._match(doc, query)]
+
+        class Cursor:
+            def sort(self, field, direction):
+                docs.sort(key=lambda doc: doc[field])
+                return self
+
+            def __aiter__(self):
+                self._iter = iter(docs)
+                return self
+
+            async def __anext__(self):
+                try:
+                    return next(self._iter)
+                except StopIteration:
+                    raise StopAsyncIteration
+        return Cursor()
+
+def make_worker(collection):
+    """创建使用签名token与内存集合的会话管理器（相当于一个 worker）"""
+    worker = Session()
+    worker.token_mode = "signed"
+    worker._token_keys = {worker.token_key_id: b"0123456789abcdef0123456789abcdef"}
+
+    async def get_collection():
+        return collection
+    worker._get_collection = get_collection
+    return worker
+
+async def next_millisecond():
+    """等到墙上时钟进入下一毫秒，保证之后的登录或吊销时间晚于此前签发的token"""
+    start = to_millis(datetime.now())
+    while to_millis(datetime.now()) <= start:
+        await asyncio.sleep(0.0005)
+
+USER = {"stuId": "2025000001", "role": "user", "name": "测试成员"}
+
+def test_new_token_is_accepted_by_other_workers_before_sync():
+    async def scenario():
+        collection = MemoryCollection()
+        issuer, other = make_worker(collection), make_worker(collection)
+        first = await issuer.create_session(USER)
+        await other.sync_revocations()
+        assert await other.get_user_by_session(first)
+
+        # 再次登录：新token在 other 同步前即可使用，旧token在同步后被拒绝
+        await next_millisecond()
+        second = await issuer.create_session(USER)
+        principal = await other.get_user_by_session(second)
+        assert principal["stuId"] == USER["stuId"]
+        assert principal["name"] == USER["name"]
+        assert await issuer.get_user_by_session(first) is None
+        await other.sync_revocations()
+        assert await other.get_user_by_session(first) is None
+        assert await other.get_user_by_session(second)
+
+    asyncio.run(scenario())
+
+def test_logout_and_revocation_reach_other_workers_after_sync():
+    async def scenario():
+        collection = MemoryCollection()
+        issuer, other = make_worker(collection), make_worker(collection)
+        token = await issuer.create_session(USER)
+        await issuer.delete_session(token)
+        assert await issuer.get_user_by_session(token) is None
+        await other.sync_revocations()
+        assert await other.get_user_by_session(token) is None
+
+        # 登出后立即重新登录，新token可用
+        token = await issuer.create_session(USER)
+        assert await issuer.get_user_by_session(token)
+        await other.revoke_user_sessions(USER["stuId"])
+        await issuer.sync_revocations()
+        assert await issuer.get_user_by_session(token) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,126 @@
+"""
+系统设置版本同步测试
+
+用内存中的集合模拟 system_settings，在写入方“已递增版本号、尚未写入设置文档”时插入其他写入与同步，
+确认其他 worker 最终能加载到全部设置。运行: python -m pytest -q
+"""
+import asyncio
+import copy
+from types import SimpleNamespace
+
+from Core.Common.SystemSettings import VERSION_KEY, SystemSettings
+
+class MemoryCollection:
+    """system_settings 用到的最小集合接口；hold 中的 key 在写入设置文档前等待对应事件"""
+
+    def __init__(self):
+        self.docs = []
+        self.hold = {}
+
+    def _match(self, doc, query):
+        for field, condition in query.items():
+            value = doc.get(field)
+            if isinstance(condition, dict):
+                if "$gt" in condition and not (value is not None and value > condition["$gt"]):
+                    return False
+                if "$ne" in condition and value == condition["$ne"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def _first(self, query):
+        return next((doc for doc in self.docs if self._match(doc, query)), None)
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(0)
+        doc = self._first(query)
+        return copy.deepcopy(doc) if doc else None
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False):
+        await asyncio.sleep(0)
+        doc = self._first(query)
+        if doc is None:
+            doc = dict(query)
+            self.docs.append(doc)
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        return copy.deepcopy(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        if query.get("key") in self.hold:
+            await self.hold[query["key"]].wait()
+        await asyncio.sleep(0)
+        doc = self._first(query)
+        if doc is None:
+            doc = dict(query)
+            self.docs.append(doc)
+        doc.update(update.get("$set", {}))
+        return SimpleNamespace(upserted_id=None, matched_count=1)
+
+    def find(self, query, projection=None):
+        docs = [copy.deepcopy(doc) for doc in self.docs if self._match(doc, query)]
+
+        async def iterate():
+            for doc in docs:
+                yield doc
+        return iterate()
+
+def make_settings(collection):
+    """创建使用内存集合的设置实例（相当于一个 worker）"""
+    settings = SystemSettings()
+
+    async def get_collection():
+        return collection
+    settings._get_collection = get_collection
+    return settings
+
+async def settle(task):
+    """让任务运行到阻塞点"""
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert not task.done()
+
+def test_sync_picks_up_setting_written_after_version_bump():
+    async def scenario():
+        collection = MemoryCollection()
+        writer, reader = make_settings(collection), make_settings(collection)
+        await reader.load_all()
+
+        # 写入方已递增版本号，设置文档尚未写入
+        collection.hold["lottery_cost"] = asyncio.Event()
+        pending = asyncio.create_task(writer.set_setting("lottery_cost", 3))
+        await settle(pending)
+        await reader.sync()
+
+        collection.hold["lottery_cost"].set()
+        assert await pending
+        await reader.sync()
+        assert reader.get_cached("lottery_cost") == 3
+
+    asyncio.run(scenario())
+
+def test_sync_with_two_writers_finishing_out_of_order():
+    async def scenario():
+        collection = MemoryCollection()
+        first, second, reader = make_settings(collection), make_settings(collection), make_settings(collection)
+        await reader.load_all()
+
+        # first 拿到版本 1 后停住，second 拿到版本 2 并先写完，此时 reader 同步
+        collection.hold["lottery_cost"] = asyncio.Event()
+        pending = asyncio.create_task(first.set_setting("lottery_cost", 3))
+        await settle(pending)
+        assert await second.set_setting("system_name", "Welcome")
+        await reader.sync()
+        assert reader.get_cached("system_name") == "Welcome"
+
+        collection.hold["lottery_cost"].set()
+        assert await pending
+        await reader.sync()
+        assert reader.get_cached("lottery_cost") == 3
+
+        # 全部写入可见后水位追上版本文档，之后的同步不再加载设置
+        await reader.sync()
+        assert reader._version == collection._first({"key": VERSION_KEY})["version"]
+
+    asyncio.run(scenario())